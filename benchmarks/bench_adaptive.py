@@ -0,0 +1,50 @@
+"""
+Time of a compiled matcher, with and without `adaptive=True`, on events whose kind is nested in a dict,
+where the decision tree can't help, and the most frequent kind is handled by the last pattern.
+
+    $ python -m benchmarks.bench_adaptive
+"""
+import random
+import timeit
+
+from pampy import compile, _
+
+KINDS = ['open', 'close', 'resize', 'scroll', 'focus', 'blur', 'key', 'click']
+
+SIZE = 100000
+
+
+def patterns():
+    args = []
+    for kind in KINDS:
+        args += [{'event': {'kind': kind, 'x': int}}, kind]
+    return args + [_, None]
+
+
+def events(weights):
+    rng = random.Random(0)
+    kinds = rng.choices(KINDS, weights=weights, k=SIZE)
+    return [{'event': {'kind': kind, 'x': 1}} for kind in kinds]
+
+
+CASES = [
+    ('uniform',         [1] * len(KINDS)),
+    ('90% last',        [1] * (len(KINDS) - 1) + [63]),
+    ('90% first',       [63] + [1] * (len(KINDS) - 1)),
+]
+
+
+def main():
+    print('%-16s %12s %12s' % ('distribution', 'static', 'adaptive'))
+    for title, weights in CASES:
+        values = events(weights)
+        row = '%-16s' % title
+        for adaptive in (False, True):
+            matcher = compile(*patterns(), adaptive=adaptive)
+            elapsed = min(timeit.repeat(lambda: list(matcher.map(values)), number=1, repeat=3))
+            row += ' %9.1f ms' % (elapsed * 1e3)
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
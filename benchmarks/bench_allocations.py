@@ -0,0 +1,68 @@
+"""
+Memory allocated while matching nested patterns with `match_value`, measured with tracemalloc.
+
+    $ python -m benchmarks.bench_allocations
+
+For every case this prints the peak of the memory allocated during one call, above what was allocated before it,
+and the time of a call. The peak grows with the captured values that are alive at the same time, so it shows
+the lists of captures that are built level by level and thrown away.
+"""
+import timeit
+import tracemalloc
+
+from pampy import match_value, _, HEAD, TAIL
+
+
+def nested_list(depth):
+    pattern, value = [int, _], [1, 2]
+    for i in range(depth):
+        pattern, value = [int, pattern, _], [i, value, i]
+    return pattern, value
+
+
+def nested_dict(depth):
+    pattern, value = {'leaf': int}, {'leaf': 1}
+    for i in range(depth):
+        pattern, value = {'level': int, 'child': pattern, 1: _}, {'level': i, 'child': value, 1: i}
+    return pattern, value
+
+
+CASES = [
+    ('flat tuple',      (int, str, float, _),                       (1, 'a', 2.5, None)),
+    ('HEAD/TAIL',       [HEAD, int, TAIL],                          list(range(100))),
+    ('nested list 5',   *nested_list(5)),
+    ('nested list 20',  *nested_list(20)),
+    ('nested dict 5',   *nested_dict(5)),
+    ('nested dict 20',  *nested_dict(20)),
+    ('mismatch deep',   nested_list(20)[0],                         nested_list(19)[1]),
+]
+
+
+def peak_allocated(function):
+    """
+    Return the peak of the memory allocated by `function()` in bytes, above the memory allocated before it.
+    """
+    function()
+    tracemalloc.start()
+    try:
+        before, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    print('%-16s %12s %10s' % ('pattern', 'peak', 'time'))
+    number = 10000
+    for name, pattern, value in CASES:
+        function = lambda: match_value(pattern, value)
+        peak = peak_allocated(function)
+        elapsed = min(timeit.repeat(function, number=number, repeat=5)) / number
+        print('%-16s %10d B %7.2f us' % (name, peak, elapsed * 1e6))
+
+
+if __name__ == '__main__':
+    main()
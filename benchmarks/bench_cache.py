@@ -0,0 +1,76 @@
+"""
+Time of a compiled matcher on values that repeat, without a cache, with `cache=1024`,
+and with `cache=1024, cache_results=True`.
+
+    $ python -m benchmarks.bench_cache
+
+Every case matches 100000 values drawn from 100 distinct ones. The cache only pays off when matching a value
+costs more than computing its key: the patterns of the 'frozen dataclass' case are cheap to match, and only
+`cache_results=True`, which skips the actions too, makes it faster.
+"""
+import random
+import re
+import timeit
+from dataclasses import dataclass
+
+from pampy import compile, _, pure
+
+
+@dataclass(frozen=True)
+class Event:
+    kind: str
+    level: int
+
+
+@pure
+def is_even(x):
+    return x % 2 == 0
+
+
+CASES = [
+    ('literal', (
+        1,      'one',
+        2,      'two',
+        _,      'other',
+    ), lambda i: i % 4),
+    ('tuple', (
+        ('add', int, int),  lambda a, b: a + b,
+        ('neg', int),       lambda a: -a,
+        ('mul', int, int),  lambda a, b: a * b,
+        _,                  'other',
+    ), lambda i: ('mul', i, i + 1)),
+    ('nested tuple', (
+        ('user', (str, int), ('admin', _)),     lambda name, age, rights: rights,
+        ('user', (str, int), _),                lambda name, age, rest: name,
+        _,                                      'other',
+    ), lambda i: ('user', ('bob%d' % i, i), ('guest', i))),
+    ('regex', (
+        re.compile(r'^ERROR (\w+): (.*)$'),     lambda where, what: what,
+        re.compile(r'^WARN (\w+): (.*)$'),      lambda where, what: what,
+        re.compile(r'(\d+) ms'),                lambda ms: int(ms),
+        _,                                      'other',
+    ), lambda i: 'request %d served in %d ms' % (i, i * 3)),
+    ('frozen dataclass', (
+        Event('error', _),  lambda level: level,
+        Event(_, 0),        lambda kind: kind,
+        Event(_, is_even),  lambda kind, level: kind,
+        _,                  'other',
+    ), lambda i: Event('info', i)),
+]
+
+
+def main():
+    print('%-18s %12s %12s %12s' % ('case', 'no cache', 'cache', 'results'))
+    random.seed(0)
+    for name, args, make_value in CASES:
+        pool = [make_value(i) for i in range(100)]
+        values = [random.choice(pool) for _i in range(100000)]
+        times = []
+        for options in ({}, {'cache': 1024}, {'cache': 1024, 'cache_results': True}):
+            matcher = compile(*args, **options)
+            times.append(min(timeit.repeat(lambda: list(matcher.map(values)), number=1, repeat=3)) / len(values))
+        print('%-18s %9.0f ns %9.0f ns %9.0f ns' % (name, times[0] * 1e9, times[1] * 1e9, times[2] * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Time of matching functions against `Callable[...]` patterns, as done when dispatching to plugins.
+
+    $ python -m benchmarks.bench_callable
+"""
+import timeit
+from typing import Callable
+
+from pampy import match, _
+
+
+def parse(text: str) -> int:
+    return int(text)
+
+
+def render(value: int, indent: int) -> str:
+    return ' ' * indent + str(value)
+
+
+def untyped(a, b, c):
+    pass
+
+
+PATTERNS = (
+    Callable[[str], int],       'parser',
+    Callable[[int, int], str],  'renderer',
+    _,                          'other',
+)
+
+
+def main():
+    print('%-10s %10s' % ('function', 'time'))
+    number = 20000
+    for function in (parse, render, untyped):
+        elapsed = timeit.timeit(lambda: match(function, *PATTERNS), number=number) / number
+        print('%-10s %7.2f us' % (function.__name__, elapsed * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Time of a function dispatching on its arguments with `dispatch`, compared to the same function calling
+`match` on every call, and to the same function calling a compiled `Matcher`.
+
+    $ python -m benchmarks.bench_dispatch
+"""
+import timeit
+
+from pampy import dispatch, match, compile, Obj, _
+from benchmarks.fixtures import Account, Point
+
+
+def with_match(*args):
+    return match(args,
+        (Obj(Account, admin=True, name=_), str),    lambda name, action: 'admin %s %s' % (name, action),
+        (Obj(Account, name=_), str),                lambda name, action: '%s %s' % (name, action),
+        (Point, Point),                             lambda a, b: (a.x + b.x, a.y + b.y),
+        (int, int),                                 lambda a, b: a + b,
+        _,                                          None,
+    )
+
+
+matcher = compile(
+    (Obj(Account, admin=True, name=_), str),    lambda name, action: 'admin %s %s' % (name, action),
+    (Obj(Account, name=_), str),                lambda name, action: '%s %s' % (name, action),
+    (Point, Point),                             lambda a, b: (a.x + b.x, a.y + b.y),
+    (int, int),                                 lambda a, b: a + b,
+    _,                                          None,
+)
+
+
+def with_matcher(*args):
+    return matcher(args)
+
+
+@dispatch
+def with_dispatch(*args):
+    return None
+
+
+@with_dispatch.register(Obj(Account, admin=True, name=_), str)
+def admin_action(name, action):
+    return 'admin %s %s' % (name, action)
+
+
+@with_dispatch.register(Obj(Account, name=_), str)
+def user_action(name, action):
+    return '%s %s' % (name, action)
+
+
+@with_dispatch.register(Point, Point)
+def add_points(a, b):
+    return a.x + b.x, a.y + b.y
+
+
+@with_dispatch.register(int, int)
+def add(a, b):
+    return a + b
+
+
+CALLS = [
+    ('account', (Account('bob'), 'login')),
+    ('points', (Point(1, 2), Point(3, 4))),
+    ('ints', (1, 2)),
+    ('none', ('a', 'b')),
+]
+
+
+def main():
+    print('%-10s %12s %12s %12s' % ('arguments', 'match', 'matcher', 'dispatch'))
+    for name, args in CALLS:
+        times = [min(timeit.repeat(lambda: function(*args), number=10000, repeat=5)) / 10000
+                 for function in (with_match, with_matcher, with_dispatch)]
+        print('%-10s %9.2f us %9.2f us %9.2f us' % (name, times[0] * 1e6, times[1] * 1e6, times[2] * 1e6))
+
+
+if __name__ == '__main__':
+    main()
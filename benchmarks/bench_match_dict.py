@@ -0,0 +1,26 @@
+"""
+How matching a dict pattern scales with the number of keys in the matched dict.
+
+    $ python -m benchmarks.bench_match_dict
+"""
+import timeit
+
+from pampy import match_dict, compile, _
+
+
+def main():
+    print('%8s %16s %16s' % ('width', 'match_dict', 'compiled'))
+    for width in (10, 100, 1000, 10000):
+        value = {'key%d' % i: i for i in range(width)}
+        value.update({'type': 'event', 'id': 7, 'user': 'bob'})
+        pattern = {'type': 'event', 'id': int, 'user': _, 'key%d' % (width - 1): _}
+        matcher = compile(pattern, True)
+
+        number = 2000
+        interpreted = timeit.timeit(lambda: match_dict(pattern, value), number=number) / number
+        compiled = timeit.timeit(lambda: matcher(value), number=number) / number
+        print('%8d %13.2f us %13.2f us' % (width, interpreted * 1e6, compiled * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Time of a single `match_value` call for each kind of pattern.
+
+    $ python -m benchmarks.bench_match_value
+"""
+import re
+import timeit
+from enum import Enum
+from typing import List, Optional, Union
+
+from pampy import match_value, _
+
+
+class Color(Enum):
+    RED = 1
+
+
+def positive(x):
+    return x > 0
+
+
+SCALAR = Union[int, float, str, bytes]
+
+CASES = [
+    ('int literal',     3,                      3),
+    ('str literal',     'hello',                'hello'),
+    ('enum literal',    Color.RED,              Color.RED),
+    ('None',            None,                   None),
+    ('class',           int,                    3),
+    ('_',               _,                      3),
+    ('tuple',           (int, str),             (1, 'a')),
+    ('dict',            {'a': int},             {'a': 1}),
+    ('callable',        positive,               3),
+    ('regex',           re.compile('h(.)'),     'hello'),
+    ('Union',           Union[int, str],        3),
+    ('Optional, None',  Optional[int],          None),
+    ('Union of 4, 4th', SCALAR,                 b'x'),
+    ('Union, no match', SCALAR,                 []),
+    ('List[int]',       List[int],              [1, 2, 3]),
+]
+
+
+def main():
+    print('%-16s %10s' % ('pattern', 'time'))
+    number = 100000
+    for name, pattern, value in CASES:
+        elapsed = timeit.timeit(lambda: match_value(pattern, value), number=number) / number
+        print('%-16s %7.0f ns' % (name, elapsed * 1e9))
+
+
+if __name__ == '__main__':
+    main()
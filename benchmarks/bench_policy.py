@@ -0,0 +1,41 @@
+"""
+Time of matching `List[...]` and `Dict[...]` patterns against 1M elements with each validation policy.
+
+    $ python -m benchmarks.bench_policy
+"""
+import timeit
+from typing import Dict, List, Optional
+
+from pampy import match_value, sample
+
+SIZE = 1000000
+
+POLICIES = ('first', sample(100), 'all', 'all-with-early-exit')
+
+CASES = [
+    ('List[int], ints',         List[int],              list(range(SIZE))),
+    ('List[int], str last',     List[int],              list(range(SIZE - 1)) + ['x']),
+    ('List[int], str first',    List[int],              ['x'] + list(range(SIZE - 1))),
+    ('List[Optional[int]]',     List[Optional[int]],    list(range(SIZE))),
+    ('Dict[str, int]',          Dict[str, int],         {str(i): i for i in range(SIZE)}),
+]
+
+
+def name(policy):
+    return 'sample(%d)' % policy.size if isinstance(policy, tuple) else policy
+
+
+def main():
+    print('%-22s' % 'pattern' + ''.join('%22s' % name(policy) for policy in POLICIES))
+    for title, pattern, value in CASES:
+        row = '%-22s' % title
+        for policy in POLICIES:
+            number = 3
+            elapsed = timeit.timeit(lambda: match_value(pattern, value, policy=policy), number=number) / number
+            matched = match_value(pattern, value, policy=policy)[0]
+            row += '%16.3f ms %-3s' % (elapsed * 1e3, 'ok' if matched else 'no')
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Time of a compiled matcher routing log lines with many regular expressions, merged or tried one at a time.
+
+    $ python -m benchmarks.bench_regex
+
+Regular expressions anchored at the start are merged into a single alternation when there are at least
+`MIN_MERGED_REGEXES` of them in a row; the 'sequential' column turns that off to time the previous behaviour,
+where each one is searched in turn.
+"""
+import re
+import timeit
+
+import pampy.matcher
+from pampy import compile, _
+
+VERBS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
+RESOURCES = ['users', 'orders', 'items', 'carts', 'payments', 'invoices', 'sessions', 'tokens', 'reports', 'logs']
+ROUTES = [r'^%s /api/%s/(\d+)(?:/(\w+))?' % (verb, resource) for resource in RESOURCES for verb in VERBS]
+
+
+def router(count, merged):
+    args = []
+    for index, route in enumerate(ROUTES[:count]):
+        args += [re.compile(route), lambda *groups, index=index: (index, groups)]
+    args += [_, None]
+    minimum = pampy.matcher.MIN_MERGED_REGEXES
+    if not merged:
+        pampy.matcher.MIN_MERGED_REGEXES = len(ROUTES) + 1
+    try:
+        matcher = compile(*args)
+        matcher('')         # the decision tree for str is built here
+    finally:
+        pampy.matcher.MIN_MERGED_REGEXES = minimum
+    return matcher
+
+
+def main():
+    print('%-8s %-10s %12s %12s' % ('routes', 'line', 'sequential', 'merged'))
+    for count in (2, 3, 5, 10, 50):
+        last = ROUTES[count - 1].lstrip('^').replace(r'(\d+)(?:/(\w+))?', '42/details')
+        for name, line in [('first', 'GET /api/users/7'), ('last', last), ('none', 'HEAD /index.html'),
+                           ('int', 42)]:
+            times = []
+            for merged in (False, True):
+                matcher = router(count, merged)
+                times.append(min(timeit.repeat(lambda: matcher(line), number=10000, repeat=5)) / 10000)
+            print('%-8d %-10s %9.2f us %9.2f us' % (count, name, times[0] * 1e6, times[1] * 1e6))
+
+
+if __name__ == '__main__':
+    main()
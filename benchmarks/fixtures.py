@@ -0,0 +1,31 @@
+"""
+Values shared by `benchmarks.suite` and `benchmarks.native_match`.
+"""
+from dataclasses import dataclass
+from typing import NewType
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+@dataclass
+class SlottedPoint:
+    __slots__ = ('x', 'y')
+    x: int
+    y: int
+
+
+class Account:
+    def __init__(self, name, admin=False):
+        self.name = name
+        self.admin = admin
+
+
+UserId = NewType('UserId', int)
+
+
+def is_even(x):
+    return x % 2 == 0
@@ -0,0 +1,131 @@
+"""
+The cases of `benchmarks.suite` written with the `match` statement of Python 3.10, to compare pampy with it.
+Only imported on Python >= 3.10.
+"""
+from benchmarks.fixtures import Account, Point, is_even
+
+
+def literal(value):
+    match value:
+        case 1:
+            return 'one'
+        case 2:
+            return 'two'
+        case 3:
+            return 'three'
+        case _:
+            return 'other'
+
+
+def type_(value):
+    match value:
+        case str():
+            return 'str'
+        case float():
+            return 'float'
+        case int():
+            return value
+        case _:
+            return 'other'
+
+
+def tuple_(value):
+    match value:
+        case ('add', a, b):
+            return a + b
+        case ('neg', a):
+            return -a
+        case ('mul', int(a), int(b)):
+            return a * b
+        case _:
+            return 'other'
+
+
+def head_tail(value):
+    match value:
+        case []:
+            return 'empty'
+        case [0, *rest]:
+            return rest
+        case [head, *tail]:
+            return head
+        case _:
+            return 'other'
+
+
+def nested_dict(value):
+    match value:
+        case {'type': 'ping'}:
+            return 'pong'
+        case {'type': 'user', 'user': {'name': str(name), 'age': int(age)}}:
+            return name, age
+        case _:
+            return 'other'
+
+
+def dataclass(value):
+    match value:
+        case Point(x=0, y=0):
+            return 'origin'
+        case Point(x=0, y=y):
+            return y
+        case Point(x=x, y=0):
+            return x
+        case _:
+            return 'other'
+
+
+def obj(value):
+    match value:
+        case Account(name=name, admin=True):
+            return name
+        case Account(name='root'):
+            return 'root'
+        case _:
+            return 'other'
+
+
+def union(value):
+    match value:
+        case bytes() | bytearray():
+            return 'binary'
+        case int() | float() | str():
+            return 'scalar'
+        case _:
+            return 'other'
+
+
+def callable_(value):
+    match value:
+        case str():
+            return 'str'
+        case int() if is_even(value):
+            return 'even'
+        case _:
+            return 'other'
+
+
+def fallback(value):
+    match value:
+        case 1:
+            return 'one'
+        case str():
+            return 'str'
+        case (_, _):
+            return 'pair'
+        case _:
+            return 'other'
+
+
+NATIVE = {
+    'literal': literal,
+    'type': type_,
+    'tuple': tuple_,
+    'list HEAD/TAIL': head_tail,
+    'nested dict': nested_dict,
+    'dataclass': dataclass,
+    'Obj': obj,
+    'Union': union,
+    'callable': callable_,
+    '_ fallback': fallback,
+}
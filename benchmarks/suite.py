@@ -0,0 +1,241 @@
+"""
+Benchmark suite covering every kind of pattern, at several input sizes.
+
+Every case is timed with `match`, with a compiled `Matcher` ('compiled', or 'source' with unrolled checks),
+and, on Python >= 3.10, with a Matcher generating a `match` statement ('generated') and with an equivalent
+hand written `match` statement ('native') when there is one. Results can be saved and compared with a previous run:
+
+    $ python -m benchmarks.suite --save baseline.json
+    $ python -m benchmarks.suite --compare baseline.json
+
+With `--compare`, the exit status is 1 if any timing got slower than the baseline by more than `--threshold`.
+"""
+import argparse
+import json
+import platform
+import re
+import sys
+import timeit
+from collections import namedtuple
+from typing import Dict, List, Union
+
+from pampy import __version__, match, compile, HEAD, TAIL, _, Obj
+from pampy.codegen import native_available
+from benchmarks.fixtures import Account, Point, SlottedPoint, UserId, is_even
+
+# Sizes of the values of the cases that depend on a size: lengths of lists, numbers of keys of dicts
+SIZES = (1, 100, 10000)
+
+Case = namedtuple('Case', ['name', 'args', 'make_value', 'sized'])
+
+
+CASES = [
+    Case('literal', (
+        1,      'one',
+        2,      'two',
+        3,      'three',
+        _,      'other',
+    ), lambda size: 3, False),
+    Case('type', (
+        str,    'str',
+        float,  'float',
+        int,    lambda x: x,
+        _,      'other',
+    ), lambda size: 42, False),
+    Case('tuple', (
+        ('add', _, _),      lambda a, b: a + b,
+        ('neg', _),         lambda a: -a,
+        ('mul', int, int),  lambda a, b: a * b,
+        _,                  'other',
+    ), lambda size: ('mul', 6, 7), False),
+    Case('list HEAD/TAIL', (
+        [],             'empty',
+        [0, TAIL],      lambda rest: rest,
+        [HEAD, TAIL],   lambda head, tail: head,
+        _,              'other',
+    ), lambda size: list(range(1, size + 1)), True),
+    Case('nested dict', (
+        {'type': 'ping'},                                       'pong',
+        {'type': 'user', 'user': {'name': str, 'age': int}},    lambda name, age: (name, age),
+        _,                                                      'other',
+    ), lambda size: dict({'key%d' % i: i for i in range(size)}, type='user', user={'name': 'bob', 'age': 7}), True),
+    Case('regex', (
+        re.compile(r'^(\d+)$'),         lambda number: number,
+        re.compile(r'^(\w+)@(\w+)$'),   lambda user, host: (user, host),
+        _,                              'other',
+    ), lambda size: 'a' * size + '@example', True),
+    Case('dataclass', (
+        Point(0, 0),    'origin',
+        Point(0, _),    lambda y: y,
+        Point(_, 0),    lambda x: x,
+        _,              'other',
+    ), lambda size: Point(5, 0), False),
+    Case('slotted dataclass', (
+        SlottedPoint(0, 0),     'origin',
+        SlottedPoint(0, _),     lambda y: y,
+        SlottedPoint(_, 0),     lambda x: x,
+        _,                      'other',
+    ), lambda size: SlottedPoint(5, 0), False),
+    Case('Obj', (
+        Obj(Account, name=_, admin=True),   lambda name: name,
+        Obj(Account, name='root'),          'root',
+        _,                                  'other',
+    ), lambda size: Account('bob'), False),
+    Case('List[int]', (
+        List[str],  'strings',
+        List[int],  'ints',
+        _,          'other',
+    ), lambda size: list(range(size)), True),
+    Case('Dict[str, int]', (
+        Dict[str, str], 'strings',
+        Dict[str, int], 'ints',
+        _,              'other',
+    ), lambda size: {str(i): i for i in range(size)}, True),
+    Case('Union', (
+        Union[bytes, bytearray],    'binary',
+        Union[int, float, str],     'scalar',
+        _,                          'other',
+    ), lambda size: 'x', False),
+    Case('NewType', (
+        UserId,     lambda user: user,
+        _,          'other',
+    ), lambda size: UserId(7), False),
+    Case('callable', (
+        str,                                            'str',
+        lambda x: isinstance(x, int) and is_even(x),    'even',
+        _,                                              'other',
+    ), lambda size: 42, False),
+    Case('_ fallback', (
+        1,          'one',
+        str,        'str',
+        (_, _),     'pair',
+        _,          'other',
+    ), lambda size: 2.5, False),
+]
+
+
+def native_functions():
+    if not native_available():
+        return {}
+    from benchmarks.native_match import NATIVE
+    return NATIVE
+
+
+def measure(function, min_time):
+    """
+    Return the best time of a call to `function` in seconds, or None if it raises.
+    """
+    try:
+        function()
+    except Exception:
+        return None
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    return min([elapsed] + timer.repeat(repeat=4, number=number)) / number
+
+
+def run_suite(sizes, min_time, pattern=None):
+    """
+    Return a dict mapping 'case[size]/engine' to the time of a call in seconds, None for errors.
+    """
+    native = native_functions()
+    results = {}
+    for case in CASES:
+        for size in sizes if case.sized else (None,):
+            name = case.name if size is None else '%s[%d]' % (case.name, size)
+            if pattern is not None and pattern not in name:
+                continue
+            value = case.make_value(size)
+            matcher = compile(*case.args)
+            unrolled = compile(*case.args, backend='source')
+            engines = [('match', lambda: match(value, *case.args)), ('compiled', lambda: matcher(value)),
+                       ('source', lambda: unrolled(value))]
+            if native_available():
+                generated = compile(*case.args, backend='native')
+                engines.append(('generated', lambda: generated(value)))
+            if case.name in native:
+                engines.append(('native', lambda: native[case.name](value)))
+            for engine, function in engines:
+                key = '%s/%s' % (name, engine)
+                results[key] = measure(function, min_time)
+                print(format_row(key, results[key]), flush=True)
+    return results
+
+
+def format_time(seconds):
+    if seconds is None:
+        return 'error'
+    elif seconds < 1e-6:
+        return '%.0f ns' % (seconds * 1e9)
+    elif seconds < 1e-3:
+        return '%.2f us' % (seconds * 1e6)
+    return '%.2f ms' % (seconds * 1e3)
+
+
+def format_row(key, seconds, baseline=None, threshold=None):
+    row = '%-36s %12s' % (key, format_time(seconds))
+    if threshold is not None:
+        row += ' %12s' % format_time(baseline)
+        if seconds is not None and baseline is not None:
+            ratio = seconds / baseline
+            row += ' %7.2fx' % ratio
+            if ratio > 1 + threshold:
+                row += '  slower'
+    return row
+
+
+def compare(results, baseline, threshold):
+    """
+    Print `results` next to the ones of `baseline`, returning the keys that got slower by more than `threshold`.
+    """
+    print()
+    print('%-36s %12s %12s %8s' % ('benchmark', 'now', 'baseline', 'ratio'))
+    slower = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        print(format_row(key, seconds, before, threshold))
+        if seconds is not None and before is not None and seconds > before * (1 + threshold):
+            slower.append(key)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--save', metavar='FILE', help='save the results as JSON in FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with the JSON saved in FILE')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression by --compare (default 0.1)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='sizes of the sized cases')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimum duration of a timing, in seconds (default 0.05)')
+    parser.add_argument('-k', dest='pattern', help='only run the benchmarks whose name contains PATTERN')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.min_time, args.pattern)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'pampy': __version__,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline['results'], args.threshold)
+        if slower:
+            print('\n%d benchmarks slower than the baseline (pampy %s, Python %s)'
+                  % (len(slower), baseline['pampy'], baseline['python']))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
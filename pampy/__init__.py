@@ -10,6 +10,8 @@ elif minor < 6:
     sys.exit("Sorry, You need Python >= 3.6 for Pampy.")
 
 
-from pampy.pampy import match, _, ANY, HEAD, TAIL, REST, MatchError
+from pampy.pampy import match, _, ANY, HEAD, TAIL, REST, MatchError, sample, pure, Obj
 from pampy.pampy import match_value, match_iterable, match_dict
-
+from pampy.matcher import Matcher, compile, match_many
+from pampy.aio import amatch, amatch_many
+from pampy.dispatching import dispatch
@@ -0,0 +1,131 @@
+"""
+Pattern matching for asyncio: guards and actions can be async functions, and their results are awaited.
+"""
+import inspect
+from collections import deque
+from collections.abc import Iterator
+
+from pampy.helpers import BoxedArgs, NoDefault, Replay, pairwise, pattern_kind
+from pampy.pampy import (
+    _,
+    MatchError,
+    AwaitGuard,
+    guard_replay,
+    check_tail_mode,
+    check_policy,
+    match_value,
+    run,
+)
+
+
+async def amatch_value(pattern, value, tail='list', policy='first'):
+    """
+    Same as `match_value`, but awaiting the results of async guards.
+
+    When `match_value` calls an async guard whose result isn't known yet, it gives up; the result is
+    awaited here, and the pattern is matched again from the start, reusing the results awaited so far.
+    """
+    results = []
+    while True:
+        guard_replay.results, guard_replay.position = results, 0
+        try:
+            return match_value(pattern, value, tail=tail, policy=policy)
+        except AwaitGuard as pending:
+            awaitable = pending.awaitable
+        finally:
+            guard_replay.results = None
+
+        if isinstance(value, Iterator):
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()
+            raise MatchError("Async guards can't be used to match iterators, which can only be read once.")
+        results.append(await awaitable)
+
+
+async def amatch(var, *args, default=NoDefault, strict=True, tail='list', policy='first'):
+    """
+    Same as `match`, but to be awaited: guards and actions can be async functions.
+    ```
+    await amatch(message,
+        {'type': 'chat', 'user': is_logged_in},     async_send_chat,
+        {'type': 'ping'},                           "pong",
+    )
+    ```
+    The async guards of a pattern are awaited one at a time, in order. Each time one of them is awaited,
+    the pattern is matched again from the start, so the sync guards before it run more than once.
+    """
+    if len(args) % 2 != 0:
+        raise MatchError("Every guard must have an action.")
+
+    check_tail_mode(tail)
+    check_policy(policy)
+
+    if default is NoDefault and strict is False:
+        default = False
+
+    pairs = list(pairwise(args))
+    patterns = [patt for (patt, action) in pairs]
+
+    replay = Replay(var) if len(pairs) > 1 and isinstance(var, Iterator) else None
+
+    for patt, action in pairs:
+        value = var if replay is None else replay.subject(pattern_kind(patt))
+        matched_as_value, args = await amatch_value(patt, value, tail=tail, policy=policy)
+
+        if matched_as_value:
+            if replay is not None:
+                replay.stop()
+            lambda_args = args if len(args) > 0 else BoxedArgs(value)
+            result = run(action, lambda_args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+    if default is NoDefault:
+        if _ not in patterns:
+            raise MatchError("'_' not provided. This case is not handled:\n%s" % str(var))
+    else:
+        return default
+
+
+async def aiterate(values):
+    if hasattr(values, '__aiter__'):
+        async for value in values:
+            yield value
+    else:
+        for value in values:
+            yield value
+
+
+async def amatch_many(values, *args, default=NoDefault, strict=True, tail='list', policy='first',
+                      concurrency=1):
+    """
+    Match every element of `values`, an async or a sync iterable, with `amatch`, yielding the results
+    in the same order. Up to `concurrency` values are matched at the same time.
+    ```
+    async for reply in amatch_many(websocket,
+        {'type': 'chat', 'text': str},  async_handle_chat,
+        _,                              None,
+        concurrency=10
+    ):
+        ...
+    ```
+    """
+    import asyncio
+
+    if type(concurrency) is not int or concurrency < 1:
+        raise MatchError("concurrency must be a positive integer, not %r." % (concurrency,))
+
+    pending = deque()
+    try:
+        async for var in aiterate(values):
+            matching = amatch(var, *args, default=default, strict=strict, tail=tail, policy=policy)
+            pending.append(asyncio.ensure_future(matching))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            if not task.cancel() and not task.cancelled():
+                task.exception()
@@ -0,0 +1,323 @@
+"""
+Cache of matchers created with `cache=size`.
+
+A cached matcher remembers which pattern matched the values it has seen, and what it extracted, so that
+equal values don't go through the patterns again. Only values that can't change are cached: strings,
+bytes, numbers, None, enums, and tuples, frozensets and frozen dataclasses of them. Two values share
+an entry only if they're equal and of the same types all the way down, since `1`, `1.0` and `True`
+don't match the same patterns, and frozen dataclasses only if all their fields are equal, even the ones
+that don't take part in comparisons. Matchers created without `cache=size` don't run any of this code.
+
+Equal values share what was extracted from the first of them: `_` and classes extract the very object
+that was first seen, which is equal to the value being matched but not always the same object.
+"""
+from collections import OrderedDict
+from enum import Enum
+from functools import partial
+from operator import attrgetter
+
+from pampy.helpers import (
+    BoxedArgs,
+    is_union,
+    dataclass_fields,
+    record_items,
+    slot_names,
+    IdentityCache,
+    MAX_CACHED_KINDS,
+    pattern_kind,
+    KIND_CALLABLE,
+    KIND_SEQUENCE,
+    KIND_DICT,
+    KIND_DATACLASS,
+    KIND_OBJECT,
+    KIND_TYPING,
+)
+from pampy.pampy import HEAD, TAIL, MatchError, run, is_pure_function
+from pampy.matcher import Matcher
+
+NoneType = type(None)
+
+# Values of these exact types are cached along with their type, except strings and bytes: they're never equal
+# to values of the other types, so they are their own keys
+FLAT_TYPES = frozenset((str, bytes, int, bool, NoneType))
+
+# The result of an action that isn't cached
+NoResult = object()
+
+# Entry of the values that didn't match any pattern
+NOT_MATCHED = (None, None, NoResult)
+
+
+def cache_key(value):
+    """
+    Return the key of `value` in the cache of a matcher, or None if it can't be cached.
+    """
+    type_ = type(value)
+    if type_ is str or type_ is bytes:
+        return value
+    elif type_ in FLAT_TYPES:
+        return type_, value
+    elif type_ is tuple:
+        return fields_key(type_, value)
+    elif type_ is float:
+        return float, value.hex()      # -0.0 == 0.0, but `_` would extract the wrong one
+
+    entry = key_functions.entries.get(id(type_))
+    if entry is not None and entry[0]() is type_:
+        return entry[1](value)
+    type_key = key_function(type_)
+    key_functions.put(type_, type_key)
+    return type_key(value)
+
+
+# For each of the other types seen so far: the function returning the keys of its values
+key_functions = IdentityCache(MAX_CACHED_KINDS)
+
+
+def key_function(type_):
+    """
+    Return the function returning the keys of the values of type `type_`, for the types not handled
+    by `cache_key` itself.
+    """
+    if issubclass(type_, tuple):
+        # Namedtuples have empty __slots__, but the instances of other subclasses can have a __dict__ that changes
+        return partial(fields_key, type_) if type_.__dictoffset__ == 0 else no_key
+    elif type_ is frozenset:
+        return frozenset_key
+    elif issubclass(type_, Enum):
+        return partial(enum_key, type_)
+    params = getattr(type_, '__dataclass_params__', None)
+    if params is not None and params.frozen:
+        return dataclass_key_function(type_)
+    return no_key
+
+
+def no_key(value):
+    return None
+
+
+def frozenset_key(value):
+    keys = frozenset(map(cache_key, value))
+    return None if None in keys else (frozenset, keys)
+
+
+def enum_key(type_, value):
+    return type_, value
+
+
+def dataclass_key_function(type_):
+    """
+    Return the function returning the keys of the instances of the frozen dataclass `type_`, made of all their
+    fields, even the ones that don't take part in comparisons: patterns can still extract them.
+    Instances with fields that aren't set, or with attributes that aren't fields, aren't cached.
+    """
+    slots = slot_names(type_)
+    names = dataclass_key_names(type_)
+    get_fields = attrgetter(*names) if names else None
+    # How many attributes are in the __dict__ of an instance that only has its fields
+    in_dict = len([name for name in names if name not in slots]) if type_.__dictoffset__ != 0 else None
+
+    def dataclass_key(value):
+        try:
+            values = get_fields(value) if get_fields is not None else ()
+        except AttributeError:
+            return None
+        if len(names) == 1:
+            values = (values,)
+        if in_dict is not None and len(value.__dict__) != in_dict:
+            return None
+        return fields_key(type_, values)
+    return dataclass_key
+
+
+def dataclass_key_names(type_):
+    """
+    Return the names of the attributes making the keys of the instances of the frozen dataclass `type_`.
+    """
+    names = tuple(field.name for field in dataclass_fields(type_))
+    return names + tuple(name for name in slot_names(type_) if name not in names)
+
+
+def key_attributes(type_):
+    """
+    Return the names of the attributes that are part of the keys of the values of type `type_`:
+    the fields of namedtuples and of frozen dataclasses. Any other attribute can change, or be computed
+    from something that isn't in the key.
+    """
+    if issubclass(type_, tuple):
+        return getattr(type_, '_fields', ()) if type_.__dictoffset__ == 0 else ()
+    params = getattr(type_, '__dataclass_params__', None)
+    if params is not None and params.frozen:
+        return dataclass_key_names(type_)
+    return ()
+
+
+def fields_key(type_, values):
+    """
+    Return the key of a value of type `type_` made of the tuple `values`.
+    """
+    types = tuple(map(type, values))
+    if FLAT_TYPES.issuperset(types):
+        return type_, types, values
+    keys = tuple(map(cache_key, values))
+    return None if None in keys else (type_, keys)
+
+
+def is_cacheable(pattern):
+    """
+    Return True if whether `pattern` matches a value that can't change, and what it extracts from it,
+    only depend on the value: that's true of every pattern, except functions not marked with `pure`,
+    and `Obj` patterns reading attributes that aren't part of the keys of the values.
+    """
+    kind = pattern_kind(pattern)
+    if kind == KIND_CALLABLE:
+        return is_pure_function(pattern)
+    elif kind == KIND_SEQUENCE:
+        return all(patt is HEAD or patt is TAIL or is_cacheable(patt) for patt in pattern)
+    elif kind == KIND_DICT:
+        return all(is_cacheable(pkey) and is_cacheable(pval) for pkey, pval in pattern.items())
+    elif kind == KIND_DATACLASS:
+        return all(is_cacheable(pval) for _name, pval in record_items(pattern))
+    elif kind == KIND_OBJECT:
+        return set(pattern.names).issubset(key_attributes(pattern.cls)) \
+            and all(is_cacheable(pval) for pval in pattern.patterns)
+    elif kind == KIND_TYPING and is_union(pattern):
+        return all(is_cacheable(member) for member in pattern.__args__)
+    return True
+
+
+def has_tail(pattern):
+    kind = pattern_kind(pattern)
+    if kind == KIND_SEQUENCE:
+        return any(patt is TAIL or patt is not HEAD and has_tail(patt) for patt in pattern)
+    elif kind == KIND_DICT:
+        return any(has_tail(pval) for pval in pattern.values())
+    elif kind == KIND_DATACLASS:
+        return any(has_tail(pval) for _name, pval in record_items(pattern))
+    elif kind == KIND_OBJECT:
+        return any(has_tail(pval) for pval in pattern.patterns)
+    return False
+
+
+class MatchCache:
+    """
+    The least recently used entries of a cached matcher, at most `maxsize` of them, and how often they're used.
+
+    `hits` and `misses` count the values looked up in the cache; `skipped` counts the values that
+    couldn't be cached at all, like lists and dicts.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    @property
+    def currsize(self):
+        return len(self.entries)
+
+    def put(self, key, entry):
+        entries = self.entries
+        entries[key] = entry
+        if len(entries) > self.maxsize:
+            try:
+                entries.popitem(last=False)
+            except KeyError:
+                pass
+
+    def clear(self):
+        """
+        Forget every entry and reset the counters.
+        """
+        self.entries.clear()
+        self.hits = self.misses = self.skipped = 0
+
+    def __repr__(self):
+        return '<MatchCache hits=%d misses=%d skipped=%d maxsize=%d currsize=%d>' \
+            % (self.hits, self.misses, self.skipped, self.maxsize, self.currsize)
+
+
+class CachedMatcher(Matcher):
+    """
+    Matcher remembering the patterns matched by the last values it has seen, created by `Matcher(..., cache=size)`.
+    Only values matched in this process, with the 'python' engine, use the cache.
+
+    Actions still run every time, unless `cache_results=True`: then the result of the action is cached too,
+    and the action only runs the first time a value is seen. Either way, values equal to one seen before get
+    the values extracted from it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for pattern in self.patterns:
+            if not is_cacheable(pattern):
+                raise MatchError("Pattern %r can't be cached: mark the functions it uses with pure(), and only "
+                                 "match the fields of namedtuples and frozen dataclasses with Obj." % (pattern,))
+        self.cache = MatchCache(kwargs['cache'])
+        # Values extracted by TAIL are new lists or iterators every time, so they're extracted again on every hit
+        self._extract_again = self.tail != 'view' and any(map(has_tail, self.patterns))
+
+    def __call__(self, var):
+        return self._result(var, self.default)
+
+    def _map(self, values, default, index):
+        for var in values:
+            if not index:
+                yield self._result(var, default)
+                continue
+            key = cache_key(var)
+            if key is not None:
+                found = self._entry(var, key)
+            else:
+                self.cache.skipped += 1
+                found = self._lookup(var) or NOT_MATCHED
+            yield found[0] if found[0] is not None else self._not_matched(var, default)
+
+    def _result(self, var, default):
+        key = cache_key(var)
+        if key is None:
+            self.cache.skipped += 1
+            found = self._lookup(var)
+            if found is None:
+                return self._not_matched(var, default)
+            index, captures = found
+            return run(self.actions[index], captures if len(captures) > 0 else BoxedArgs(var))
+
+        index, captures, result = self._entry(var, key)
+        if result is not NoResult:
+            return result
+        elif index is None:
+            return self._not_matched(var, default)
+        if captures is None:
+            captures = []
+            self._cases[index].check(var, captures)
+        return run(self.actions[index], captures if len(captures) > 0 else BoxedArgs(var))
+
+    def _entry(self, var, key):
+        """
+        Return `(index, captures, result)` for `var`, looking it up in the cache first.
+        """
+        cache = self.cache
+        entry = cache.entries.get(key)
+        if entry is not None:
+            cache.hits += 1
+            try:
+                cache.entries.move_to_end(key)
+            except KeyError:    # evicted by another thread in the meantime
+                pass
+            return entry
+
+        cache.misses += 1
+        found = self._lookup(var)
+        if found is None:
+            entry = NOT_MATCHED
+        else:
+            index, captures = found
+            if not self.cache_results:
+                entry = (index, None if self._extract_again else captures, NoResult)
+            else:
+                entry = (index, None, run(self.actions[index], captures if len(captures) > 0 else BoxedArgs(var)))
+        cache.put(key, entry)
+        return entry
@@ -0,0 +1,448 @@
+"""
+Translation of pampy patterns into Python source, compiled once into a lookup function.
+
+`native_lookup` uses the `match` statement of Python >= 3.10. The parts of a pattern that the `match`
+statement can express with the same semantics are translated: literals, None, classes, `_`, lists and
+tuples with HEAD and TAIL, and dicts with string keys. Every other part, like callables, regular
+expressions or typing patterns, becomes a guard calling the check that the compiled `Matcher` would use
+for it. The structure of a pattern is checked before its guards, so a guard may be called less often
+than with `match`, but the first matching pattern and the extracted values are the same.
+
+`source_lookup` works with any Python: every pattern becomes a block of unrolled checks, like
+`type(value) is tuple and len(value) == 3`, in the same order as the compiled `Matcher`.
+"""
+import linecache
+import sys
+from collections.abc import Iterator
+from functools import partial
+from itertools import count, islice
+from keyword import iskeyword
+from math import isfinite
+from weakref import finalize
+
+from pampy.helpers import (
+    tail_view,
+    record_items,
+    NotSet,
+    pattern_kind,
+    KIND_LITERAL,
+    KIND_NONE,
+    KIND_CLASS,
+    KIND_SEQUENCE,
+    KIND_DICT,
+    KIND_ANY,
+    KIND_DATACLASS,
+    KIND_OBJECT,
+    KIND_NEVER,
+)
+from pampy.pampy import HEAD, TAIL, MatchError
+
+
+def native_available():
+    return sys.version_info >= (3, 10)
+
+
+class CaseWriter:
+    """
+    Translate a pattern into the source of a native pattern, of the guards that complete it,
+    and of the expressions building the list of extracted values.
+    Objects used by the generated code are stored in `namespace`, and the names of its local variables
+    are numbered with `names`.
+    """
+
+    def __init__(self, namespace, names, tail, policy):
+        self.namespace = namespace
+        self.names = names
+        self.tail = tail
+        self.policy = policy
+        self.guards = []
+        self.captures = []
+        # Set when the native pattern only matches lists and tuples, while the pampy one matches any iterable
+        self.iterables = False
+
+    def new_name(self, prefix='_v'):
+        return '%s%d' % (prefix, next(self.names))
+
+    def constant(self, value):
+        name = '_k%d' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def capture(self):
+        name = self.new_name()
+        self.captures.append(name)
+        return name
+
+    def write(self, pattern, nested=True, check=None):
+        kind = pattern_kind(pattern)
+        if kind == KIND_ANY:
+            return self.capture()
+        elif kind == KIND_NONE:
+            return 'None'
+        elif kind == KIND_LITERAL:
+            return self.write_literal(pattern, check)
+        elif kind == KIND_CLASS:
+            return '%s() as %s' % (self.constant(pattern), self.capture())
+        elif kind == KIND_SEQUENCE and not nested:
+            return self.write_sequence(pattern, check)
+        elif kind == KIND_DICT and all(type(pkey) is str for pkey in pattern):
+            return self.write_dict(pattern, nested)
+        elif kind == KIND_OBJECT and all(name.isidentifier() and not iskeyword(name) for name in pattern.names):
+            items = ', '.join('%s=%s' % (name, self.write(pval)) for name, pval in zip(pattern.names, pattern.patterns))
+            return '%s(%s)' % (self.constant(pattern.cls), items)
+        return self.write_check(pattern, check)
+
+    def write_literal(self, pattern, check):
+        type_ = type(pattern)
+        if type_ is bool:
+            return repr(pattern)
+        elif type_ in (int, str) or (type_ is float and isfinite(pattern)):
+            name = self.new_name()
+            self.guards.append('type(%s) is %s and %r == %s' % (name, type_.__name__, pattern, name))
+            return name
+        return self.write_check(pattern, check)
+
+    def write_sequence(self, patterns, check):
+        if len(patterns) > 0 and patterns[-1] is TAIL and self.tail != 'list':
+            return self.write_check(patterns, check)
+        self.iterables = True
+        self.guards.append('(type(value) is list or type(value) is tuple)')
+        items = []
+        for i, pattern in enumerate(patterns):
+            if pattern is HEAD and i == 0:
+                items.append(self.capture())
+            elif pattern is TAIL and i == len(patterns) - 1:
+                items.append('*' + self.capture())
+            else:
+                items.append(self.write(pattern))
+        return '[%s]' % ', '.join(items)
+
+    def write_dict(self, pattern, nested):
+        subject = self.new_name() if nested else 'value'
+        self.guards.append('isinstance(%s, dict)' % subject)
+        items = ', '.join('%r: %s' % (pkey, self.write(pval)) for pkey, pval in pattern.items())
+        return '{%s} as %s' % (items, subject) if nested else '{%s}' % items
+
+    def write_check(self, pattern, check=None):
+        from pampy.matcher import compile_pattern
+
+        if check is None:
+            check = compile_pattern(pattern, self.tail, self.policy)
+        name = self.new_name()
+        extracted = self.new_name('_c')
+        self.guards.append('%s(%s, (%s := []))' % (self.constant(check), name, extracted))
+        self.captures.append('*' + extracted)
+        return name
+
+    def source(self, index, pattern):
+        guard = ' if ' + ' and '.join(self.guards) if self.guards else ''
+        return [
+            '        case %s%s:' % (pattern, guard),
+            '            return %d, [%s]' % (index, ', '.join(self.captures)),
+        ]
+
+
+def write_case(case, namespace, names, tail, policy):
+    """
+    Return the source of the `case` blocks matching `case`, and whether they match any value.
+    """
+    writer = CaseWriter(namespace, names, tail, policy)
+    pattern = writer.write(case.pattern, nested=False, check=case.check)
+    source = writer.source(case.index, pattern)
+    if writer.iterables:
+        # Lists and tuples were handled by the first block, any other iterable is checked here
+        fallback = CaseWriter(namespace, names, tail, policy)
+        fallback.guards.append('type(value) is not list and type(value) is not tuple')
+        source += fallback.source(case.index, fallback.write_check(case.pattern, case.check))
+    return source, not writer.guards and pattern in writer.captures
+
+
+def native_lookup(cases, tail='list', policy='first'):
+    """
+    Generate a function `lookup(value)` returning `(index, extracted values)` for the first of `cases`
+    matching `value`, or None, using the `match` statement.
+    """
+    if not native_available():
+        raise MatchError("backend='native' needs Python 3.10 or later.")
+
+    namespace = {}
+    names = count()
+    lines = ['def lookup(value):', '    match value:']
+    cases = [case for case in cases if case.kind != KIND_NEVER]
+    replaying = False
+    for position, case in enumerate(cases):
+        if case.kind == KIND_SEQUENCE and not replaying and position < len(cases) - 1:
+            condition, call = replay_source(cases[position:], namespace)
+            lines += ['        case _ if %s:' % condition, '            %s' % call]
+            replaying = True
+        source, irrefutable = write_case(case, namespace, names, tail, policy)
+        lines += source
+        if irrefutable:
+            break
+    if len(lines) == 2:
+        lines += ['        case _ if False:', '            pass']
+    lines.append('    return None')
+
+    return build_function(lines, namespace, 'native')
+
+
+def literal_source(pattern):
+    """
+    Return the source of a literal with the same value and type as `pattern`, or None if there isn't one.
+    """
+    type_ = type(pattern)
+    if type_ in (bool, int, str) or (type_ is float and isfinite(pattern)):
+        return repr(pattern)
+    return None
+
+
+class BlockWriter:
+    """
+    Translate a pattern into a block of statements that breaks out of the enclosing `while True:`
+    as soon as a check fails, following the same order as the check built by `compile_pattern`.
+    Objects used by the generated code are stored in `namespace`, and the names of its local variables
+    are numbered with `names`.
+    """
+
+    def __init__(self, namespace, names, tail, policy):
+        self.namespace = namespace
+        self.names = names
+        self.tail = tail
+        self.policy = policy
+        self.lines = []
+        self.captures = []
+        # Extracted values are appended to a `captures` list as soon as they're found when some of them
+        # come from other checks; otherwise the list is built only when the pattern matches
+        self.collect = False
+
+    def new_name(self):
+        return '_v%d' % next(self.names)
+
+    def constant(self, value):
+        name = '_k%d' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def emit(self, line, indent):
+        self.lines.append('    ' * indent + line)
+
+    def fail_unless(self, condition, indent):
+        self.emit('if not (%s): break' % condition, indent)
+
+    def capture(self, expression, indent):
+        if self.collect:
+            self.emit('captures.append(%s)' % expression, indent)
+        else:
+            self.captures.append(expression)
+
+    def write_check(self, pattern, subject, indent, check=None):
+        from pampy.matcher import compile_pattern
+
+        if check is None:
+            check = compile_pattern(pattern, self.tail, self.policy)
+        self.fail_unless('%s(%s, captures)' % (self.constant(check), subject), indent)
+
+    def write(self, pattern, subject, indent):
+        kind = pattern_kind(pattern)
+        if kind == KIND_ANY:
+            self.capture(subject, indent)
+        elif kind == KIND_NONE:
+            self.fail_unless('%s is None' % subject, indent)
+        elif kind == KIND_LITERAL:
+            self.write_literal(pattern, subject, indent)
+        elif kind == KIND_CLASS:
+            self.fail_unless('isinstance(%s, %s)' % (subject, self.constant(pattern)), indent)
+            self.capture(subject, indent)
+        elif kind == KIND_SEQUENCE:
+            # Any other iterable is consumed by the compiled check
+            self.emit('if type(%s) is list or type(%s) is tuple:' % (subject, subject), indent)
+            self.write_sequence(pattern, subject, indent + 1)
+            self.emit('else:', indent)
+            self.write_check(pattern, subject, indent + 1)
+        elif kind == KIND_DICT and all(type(pkey) is str for pkey in pattern):
+            self.fail_unless('isinstance(%s, dict)' % subject, indent)
+            self.write_items(pattern, subject, indent)
+        elif kind == KIND_DATACLASS:
+            self.write_record(pattern, subject, indent)
+        elif kind == KIND_OBJECT:
+            self.write_object(pattern, subject, indent)
+        else:
+            self.write_check(pattern, subject, indent)
+
+    def write_literal(self, pattern, subject, indent):
+        type_ = type(pattern)
+        literal = literal_source(pattern)
+        if type_ is bool:
+            self.fail_unless('%s is %s' % (subject, literal), indent)
+        elif literal is not None:
+            self.fail_unless('type(%s) is %s and %s == %s' % (subject, type_.__name__, literal, subject), indent)
+        else:
+            self.fail_unless('type(%s) is %s and %s == %s'
+                             % (subject, self.constant(type_), self.constant(pattern), subject), indent)
+
+    def write_sequence(self, patterns, subject, indent):
+        size = len(patterns)
+        has_tail = size > 0 and patterns[-1] is TAIL
+        if has_tail:
+            size -= 1
+            self.fail_unless('len(%s) >= %d' % (subject, size), indent)
+        else:
+            self.fail_unless('len(%s) == %d' % (subject, size), indent)
+        for i, pattern in enumerate(patterns[:size]):
+            item = '%s[%d]' % (subject, i)
+            if pattern is HEAD and i == 0 or pattern_kind(pattern) == KIND_ANY:
+                self.capture(item, indent)
+                continue
+            name = self.new_name()
+            self.emit('%s = %s' % (name, item), indent)
+            self.write(pattern, name, indent)
+        if has_tail:
+            if self.tail == 'iter':
+                rest = '%s(%s, %d, None)' % (self.constant(islice), subject, size)
+            elif self.tail == 'view':
+                rest = '%s(%s, %d)' % (self.constant(tail_view), subject, size)
+            else:
+                rest = '%s[%d:] if type(%s) is list else list(%s[%d:])' % (subject, size, subject, subject, size)
+            self.capture(rest, indent)
+
+    def write_items(self, pattern, subject, indent):
+        for pkey, pval in pattern.items():
+            self.fail_unless('%r in %s' % (pkey, subject), indent)
+            if pattern_kind(pval) == KIND_ANY:
+                self.capture('%s[%r]' % (subject, pkey), indent)
+                continue
+            name = self.new_name()
+            self.emit('%s = %s[%r]' % (name, subject, pkey), indent)
+            self.write(pval, name, indent)
+
+    def write_record(self, pattern, subject, indent):
+        self.fail_unless('%s.__class__ == %s' % (subject, self.constant(pattern.__class__)), indent)
+        not_set = self.constant(NotSet)
+        for name, pval in record_items(pattern):
+            field = self.new_name()
+            self.emit('%s = getattr(%s, %r, %s)' % (field, subject, name, not_set), indent)
+            self.fail_unless('%s is not %s' % (field, not_set), indent)
+            self.write(pval, field, indent)
+
+    def write_object(self, pattern, subject, indent):
+        self.fail_unless('isinstance(%s, %s)' % (subject, self.constant(pattern.cls)), indent)
+        if not pattern.patterns:
+            return
+        # Read all the attributes at once, like the compiled check
+        fields = [self.new_name() for _pval in pattern.patterns]
+        self.emit('try:', indent)
+        self.emit('%s = %s(%s)' % (', '.join(fields), self.constant(pattern.getter), subject), indent + 1)
+        self.emit('except AttributeError:', indent)
+        self.emit('break', indent + 1)
+        for pval, field in zip(pattern.patterns, fields):
+            self.write(pval, field, indent)
+
+    def write_case(self, case):
+        """
+        Return the source of the blocks trying `case`, and whether they match any value.
+        """
+        self.collect = needs_collect(case.pattern, nested=False)
+        if case.kind == KIND_ANY:
+            return ['    return %d, [value]' % case.index], True
+
+        sequence = case.kind == KIND_SEQUENCE
+        if sequence:
+            self.fail_unless('type(value) is list or type(value) is tuple', 2)
+            self.write_sequence(case.pattern, 'value', 2)
+        elif case.kind in (KIND_NONE, KIND_LITERAL, KIND_CLASS, KIND_DICT, KIND_DATACLASS, KIND_OBJECT):
+            self.write(case.pattern, 'value', 2)
+        else:
+            self.write_check(case.pattern, 'value', 2, case.check)
+
+        lines = ['    while True:']
+        if self.collect:
+            lines.append('        captures = []')
+        lines += self.lines
+        lines.append('        return %d, %s' % (case.index, 'captures' if self.collect else
+                                                '[%s]' % ', '.join(self.captures)))
+        if sequence:
+            # Lists and tuples were handled by the first block, any other iterable is checked here
+            lines += [
+                '    if type(value) is not list and type(value) is not tuple:',
+                '        captures = []',
+                '        if %s(value, captures):' % self.constant(case.check),
+                '            return %d, captures' % case.index,
+            ]
+        return lines, False
+
+
+def needs_collect(pattern, nested=True):
+    """
+    Return True if translating `pattern` with a `BlockWriter` calls other checks, which append
+    the values they extract to the `captures` list.
+    """
+    kind = pattern_kind(pattern)
+    if kind in (KIND_ANY, KIND_NONE, KIND_LITERAL, KIND_CLASS):
+        return False
+    elif kind == KIND_SEQUENCE:
+        return nested or any(patt is not HEAD and patt is not TAIL and needs_collect(patt) for patt in pattern)
+    elif kind == KIND_DICT and all(type(pkey) is str for pkey in pattern):
+        return any(needs_collect(pval) for pval in pattern.values())
+    elif kind == KIND_DATACLASS:
+        return any(needs_collect(pval) for _name, pval in record_items(pattern))
+    elif kind == KIND_OBJECT:
+        return any(needs_collect(pval) for pval in pattern.patterns)
+    return True
+
+
+def source_lookup(cases, tail='list', policy='first'):
+    """
+    Generate a function `lookup(value)` returning `(index, extracted values)` for the first of `cases`
+    matching `value`, or None, with the checks of each pattern unrolled into plain Python statements.
+    """
+    namespace = {}
+    names = count()
+    lines = ['def lookup(value):']
+    cases = [case for case in cases if case.kind != KIND_NEVER]
+    replaying = False
+    for position, case in enumerate(cases):
+        if case.kind == KIND_SEQUENCE and not replaying and position < len(cases) - 1:
+            condition, call = replay_source(cases[position:], namespace)
+            lines += ['    if %s:' % condition, '        %s' % call]
+            replaying = True
+        source, irrefutable = BlockWriter(namespace, names, tail, policy).write_case(case)
+        lines += source
+        if irrefutable:
+            break
+    else:
+        lines.append('    return None')
+    return build_function(lines, namespace, 'source')
+
+
+def replay_source(cases, namespace):
+    """
+    Return the condition selecting the one-shot iterators, like generators, and the statement matching them
+    against `cases` with `replay_lookup`, so that every pattern reads them from the start.
+    """
+    from pampy.matcher import replay_lookup
+
+    lookup = '_k%d' % len(namespace)
+    namespace[lookup] = partial(replay_lookup, tuple(cases))
+    iterator = '_k%d' % len(namespace)
+    namespace[iterator] = Iterator
+    return ('type(value) is not list and type(value) is not tuple and isinstance(value, %s)' % iterator,
+            'return %s(value)' % lookup)
+
+
+# Counts the generated functions, to give each one a different file name in tracebacks
+generated = count()
+
+
+def build_function(lines, namespace, backend):
+    """
+    Compile the source of the function `lookup` in `namespace`, registering it in `linecache`
+    as long as the function lives, so that tracebacks show the generated lines.
+    """
+    source = '\n'.join(lines) + '\n'
+    filename = '<pampy %s %d>' % (backend, next(generated))
+    exec(compile(source, filename, 'exec'), namespace)
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    lookup = namespace['lookup']
+    lookup.source = source
+    finalize(lookup, linecache.cache.pop, filename, None)
+    return lookup
@@ -0,0 +1,280 @@
+"""
+NumPy engine for `Matcher.map`.
+
+A batch of records with the same shape (tuples or lists of the same length, or dicts) is turned into
+columns, and each pattern is evaluated on whole columns at once as a boolean mask. Every record is
+then assigned the first pattern whose mask is set. Patterns that can't be expressed as masks, like
+callables or regular expressions, are checked record by record in Python, but only on the records
+that are still unassigned. Records with a different shape are matched one at a time.
+
+NumPy is an optional dependency, only needed when using `engine='numpy'`.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pampy.helpers import (
+    BoxedArgs,
+    overrides_class,
+    pattern_kind,
+    KIND_LITERAL,
+    KIND_NONE,
+    KIND_CLASS,
+    KIND_SEQUENCE,
+    KIND_DICT,
+    KIND_ANY,
+    KIND_NEVER,
+)
+from pampy.pampy import HEAD, run
+from pampy.matcher import (
+    NoneType,
+    accepts_type,
+    sequence_size,
+)
+
+
+class AbsentType:
+    """
+    Fills the column of a dict key for the records that don't have it.
+    """
+    def __repr__(self):
+        return 'Absent'
+
+
+Absent = AbsentType()
+
+
+def object_column(values):
+    try:
+        return numpy.fromiter(values, dtype=object, count=len(values))
+    except (TypeError, ValueError):
+        # Older versions of NumPy can't build object arrays with fromiter
+        column = numpy.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            column[i] = value
+        return column
+
+
+def scalar(value):
+    """
+    Wrap `value` so NumPy compares it as a Python object, without trying to turn it into an array.
+    """
+    array = numpy.empty((), dtype=object)
+    array[()] = value
+    return array
+
+
+class Columns:
+    """
+    Columns of a batch of records with the same shape, built the first time they're needed.
+    """
+
+    def __init__(self, rows, keyed):
+        self.rows = rows
+        self.keyed = keyed
+        self.size = len(rows)
+        self._values = {}
+        self._types = {}
+
+    def values(self, position):
+        column = self._values.get(position)
+        if column is None:
+            self._build(position)
+            column = self._values[position]
+        return column
+
+    def types(self, position):
+        column = self._types.get(position)
+        if column is None:
+            self._build(position)
+            column = self._types[position]
+        return column
+
+    def _build(self, position):
+        if self.keyed:
+            values = [row.get(position, Absent) for row in self.rows]
+        else:
+            values = [row[position] for row in self.rows]
+        self._values[position] = object_column(values)
+        self._types[position] = object_column(list(map(type, values)))
+
+    def everything(self):
+        return numpy.ones(self.size, dtype=bool)
+
+    def nothing(self):
+        return numpy.zeros(self.size, dtype=bool)
+
+
+def element_mask(pattern, columns, position):
+    """
+    Return the mask of the records whose element at `position` matches `pattern`,
+    or None if `pattern` can't be evaluated on columns.
+    """
+    if pattern is HEAD:
+        return columns.everything()
+
+    kind = pattern_kind(pattern)
+    if kind == KIND_ANY:
+        return columns.everything()
+    elif kind == KIND_NONE:
+        return columns.types(position) == scalar(NoneType)
+    elif kind == KIND_LITERAL:
+        mask = columns.types(position) == scalar(type(pattern))
+        rows = numpy.flatnonzero(mask)
+        if len(rows) > 0:
+            mask[rows] = columns.values(position)[rows] == scalar(pattern)
+        return mask
+    elif kind == KIND_CLASS and type(pattern) is type:
+        types = columns.types(position)
+        mask = columns.nothing()
+        for type_ in set(types.tolist()):
+            if overrides_class(type_):
+                return None
+            if issubclass(type_, pattern):
+                mask |= types == scalar(type_)
+        return mask
+    return None
+
+
+def case_mask(case, columns, row_type, tail):
+    """
+    Return the mask of the records matched by `case`, or None if it can't be evaluated on columns.
+    """
+    kind, pattern = case.kind, case.pattern
+    if kind == KIND_ANY:
+        return columns.everything()
+    elif kind in (KIND_LITERAL, KIND_NONE, KIND_NEVER):
+        # records are all lists, tuples or dicts
+        return columns.nothing()
+    elif kind == KIND_CLASS and type(pattern) is type:
+        return columns.everything() if issubclass(row_type, pattern) else columns.nothing()
+    elif kind == KIND_SEQUENCE and not columns.keyed:
+        size, has_tail = sequence_size(case)
+        if has_tail and tail != 'list':
+            return None
+        width = len(columns.rows[0])
+        if width < size or (width > size and not has_tail):
+            return columns.nothing()
+        mask = columns.everything()
+        for position in range(size):
+            element = element_mask(pattern[position], columns, position)
+            if element is None:
+                return None
+            mask &= element
+        return mask
+    elif kind == KIND_DICT and columns.keyed:
+        if not all(type(key) is str for key in pattern):
+            return None
+        mask = columns.everything()
+        for key, element_pattern in pattern.items():
+            element = element_mask(element_pattern, columns, key)
+            if element is None:
+                return None
+            mask &= element
+            mask &= columns.types(key) != scalar(AbsentType)
+        return mask
+    elif kind == KIND_DICT:
+        return columns.nothing()
+    return None
+
+
+def captures_getter(case):
+    """
+    Return a function extracting the values captured by `case` from a row whose match was found on columns.
+    """
+    kind, pattern = case.kind, case.pattern
+    if kind == KIND_ANY or kind == KIND_CLASS:
+        return lambda row: [row]
+    elif kind == KIND_SEQUENCE:
+        size, has_tail = sequence_size(case)
+        positions = [position for position in range(size)
+                     if pattern[position] is HEAD or pattern_kind(pattern[position]) in (KIND_ANY, KIND_CLASS)]
+        if has_tail:
+            return lambda row: [row[position] for position in positions] + [list(row[size:])]
+        return lambda row: [row[position] for position in positions]
+    elif kind == KIND_DICT:
+        keys = [key for key, element in pattern.items() if pattern_kind(element) in (KIND_ANY, KIND_CLASS)]
+        return lambda row: [row[key] for key in keys]
+    return lambda row: []
+
+
+def assign_cases(matcher, rows):
+    """
+    Return an array with the index of the first pattern of `matcher` matching each row (-1 if none),
+    and a dict with the captures of the rows that had to be matched in Python.
+    """
+    assigned = numpy.full(len(rows), -1, dtype=numpy.intp)
+    captured = {}
+    if len(rows) == 0:
+        return assigned, captured
+
+    row_type = type(rows[0])
+    if row_type is dict:
+        keyed = True
+        conforming = [type(row) is dict for row in rows]
+    elif row_type is tuple or row_type is list:
+        keyed = False
+        width = len(rows[0])
+        conforming = [type(row) is row_type and len(row) == width for row in rows]
+    else:
+        keyed = False
+        conforming = [False] * len(rows)
+    conforming = numpy.array(conforming, dtype=bool)
+
+    for position in numpy.flatnonzero(~conforming):
+        found = matcher._lookup(rows[position])
+        if found is not None:
+            assigned[position], captured[position] = found
+
+    selected = numpy.flatnonzero(conforming)
+    if len(selected) == 0:
+        return assigned, captured
+
+    columns = Columns([rows[position] for position in selected], keyed)
+    pending = numpy.ones(len(selected), dtype=bool)
+    class_trusted = not overrides_class(row_type)
+    for case in matcher._cases:
+        if not pending.any():
+            break
+        if not accepts_type(case, row_type, class_trusted):
+            continue
+        mask = case_mask(case, columns, row_type, matcher.tail)
+        if mask is None:
+            for local in numpy.flatnonzero(pending):
+                captures = []
+                if case.check(columns.rows[local], captures):
+                    pending[local] = False
+                    assigned[selected[local]] = case.index
+                    captured[selected[local]] = captures
+        else:
+            hits = pending & mask
+            assigned[selected[hits]] = case.index
+            pending &= ~mask
+    return assigned, captured
+
+
+def map_columns(matcher, values, default, index):
+    """
+    Same as `Matcher.map`, but matching all the `values` at once on columns.
+    """
+    if numpy is None:
+        raise ImportError("engine='numpy' needs NumPy: pip install numpy")
+
+    rows = values if isinstance(values, list) else list(values)
+    assigned, captured = assign_cases(matcher, rows)
+    getters = {}
+    for position, row in enumerate(rows):
+        case_index = int(assigned[position])
+        if case_index < 0:
+            yield matcher._not_matched(row, default)
+        elif index:
+            yield case_index
+        else:
+            captures = captured.get(position)
+            if captures is None:
+                getter = getters.get(case_index)
+                if getter is None:
+                    getter = getters[case_index] = captures_getter(matcher._cases[case_index])
+                captures = getter(row)
+            yield run(matcher.actions[case_index], captures if len(captures) > 0 else BoxedArgs(row))
@@ -0,0 +1,136 @@
+"""
+Functions dispatching on the patterns matched by their arguments, created with `dispatch`.
+
+Every implementation registered on a dispatcher is compiled once, like a pattern of a `Matcher`. The dispatcher
+remembers which implementations can match each tuple of argument types it has seen, and registering a new
+implementation only adds it to the entries of the types it accepts: the other entries are left alone.
+"""
+from functools import partial, update_wrapper
+from threading import Lock
+
+from pampy.helpers import overrides_class, pattern_kind, KIND_SEQUENCE
+from pampy.pampy import HEAD, MatchError
+from pampy.matcher import Case, compile_pattern, accepts_type, accepts_length, sequence_size
+
+# When a dispatcher has seen more tuples of argument types than this, its table is emptied
+MAX_CACHED_SIGNATURES = 512
+
+
+def accepts_signature(case, types):
+    """
+    Return False only if the patterns of `case` can't possibly match arguments whose types are `types`.
+    """
+    if not accepts_length(case, len(types)):
+        return False
+    size, _has_tail = sequence_size(case)
+    for position, (pattern, type_) in enumerate(zip(case.pattern[:size], types)):
+        if pattern is HEAD and position == 0:
+            continue
+        element = Case(None, pattern, pattern_kind(pattern), None)
+        if not accepts_type(element, type_, not overrides_class(type_)):
+            return False
+    return True
+
+
+class Dispatcher:
+    """
+    Function calling the first of its implementations whose patterns match its arguments, created by `dispatch`.
+
+    Implementations are tried in the order they were registered. Like the actions of `match`, they're called
+    with the values extracted by their patterns, or with the arguments themselves if nothing was extracted.
+    Keyword arguments don't take part in the dispatch and are passed along unchanged.
+    When no implementation matches, the decorated function is called.
+
+    Like a function, a Dispatcher defined in a class is bound to the instances it's read from: the instance is
+    passed as the first argument, so the patterns of methods start with one for `self`, like `HEAD` or `_`.
+
+    A Dispatcher can be shared between threads.
+    """
+
+    def __init__(self, function):
+        update_wrapper(self, function)
+        self.default = function
+        self.functions = []
+        self._cases = []
+        self._table = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '<Dispatcher %s with %d implementations>' % (self.__qualname__, len(self.functions))
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return partial(self, instance)
+
+    def register(self, *patterns):
+        """
+        Decorator registering the function it decorates for the arguments matching `patterns`, one per argument.
+        `HEAD` and `TAIL` work like in a tuple pattern: `register(str, TAIL)` matches one string followed
+        by any number of arguments, which are extracted as a list.
+        """
+        def decorate(function):
+            if not callable(function):
+                raise MatchError("Only functions can be registered, not %r." % (function,))
+            self._add(patterns, function)
+            return function
+        return decorate
+
+    def _add(self, patterns, function):
+        check = compile_pattern(patterns)
+        step = ((check, function),)
+        with self._lock:
+            case = Case(len(self._cases), patterns, KIND_SEQUENCE, check)
+            self._cases.append(case)
+            self.functions.append(function)
+            for types, plan in list(self._table.items()):
+                if accepts_signature(case, types):
+                    self._table[types] = plan + step
+
+    def __call__(self, *args, **kwargs):
+        plan = self._table.get(tuple(map(type, args)))
+        if plan is None:
+            plan = self._plan(tuple(map(type, args)))
+
+        captures = []
+        for check, function in plan:
+            if check(args, captures):
+                return function(*captures, **kwargs) if len(captures) > 0 else function(*args, **kwargs)
+            if captures:
+                captures = []
+        return self.default(*args, **kwargs)
+
+    def _plan(self, types):
+        """
+        Return the `(check, function)` pairs of the implementations that can match arguments of types `types`.
+        """
+        with self._lock:
+            plan = tuple((case.check, self.functions[case.index])
+                         for case in self._cases if accepts_signature(case, types))
+            if len(self._table) >= MAX_CACHED_SIGNATURES:
+                self._table.clear()
+            self._table[types] = plan
+        return plan
+
+
+def dispatch(function):
+    """
+    Turn `function` into a `Dispatcher`, whose implementations are registered with `register`,
+    each one for the arguments matching some patterns. `function` is called when none of them matches.
+    ```
+    @dispatch
+    def area(shape):
+        raise TypeError("Unknown shape %r" % (shape,))
+
+    @area.register(Obj(Square, side=_))
+    def square_area(side):
+        return side * side
+
+    @area.register(Obj(Circle, radius=_))
+    def circle_area(radius):
+        return pi * radius * radius
+    ```
+    """
+    if not callable(function):
+        raise MatchError("dispatch() decorates functions, not %r." % (function,))
+    return Dispatcher(function)
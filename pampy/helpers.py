@@ -1,41 +1,72 @@
 import inspect
+from array import array
+from collections import namedtuple
+from collections.abc import Sequence
+from enum import Enum
+from functools import partial
+from itertools import islice
+from mmap import mmap
+from operator import attrgetter
+from weakref import WeakKeyDictionary, ref
 from typing import (
     Union,
     Any,
+    Callable,
     Iterable,
     TypeVar,
+    Pattern as RegexPattern,
 )
 
 try:
     from typing import GenericMeta
+    LEGACY_GENERICS = True
 except ImportError:
     from typing import _GenericAlias as GenericMeta
+    LEGACY_GENERICS = False
 
 T = TypeVar("T")
 
 
-class UnderscoreType:
-    def __repr__(self):
-        return '_'
+def marker(name):
+    """
+    Return the marker of pampy called `name`.
+    """
+    from pampy import pampy
+    return getattr(pampy, name)
+
 
+class Marker:
+    """
+    Base class of the markers like `_` and `HEAD`, which are compared by identity.
+    They are pickled by name, so that unpickling gives back the very same object.
+    """
+    name = None
 
-class HeadType:
     def __repr__(self):
-        return 'HEAD'
+        return self.name
 
+    def __reduce__(self):
+        return marker, (self.name,)
 
-class TailType:
-    def __repr__(self):
-        return 'TAIL'
 
+class UnderscoreType(Marker):
+    name = '_'
 
-class PaddedValueType:
-    def __repr__(self):
-        return 'PaddedValue'
 
+class HeadType(Marker):
+    name = 'HEAD'
 
-class NoDefaultType:
-    pass
+
+class TailType(Marker):
+    name = 'TAIL'
+
+
+class PaddedValueType(Marker):
+    name = 'PaddedValue'
+
+
+class NoDefaultType(Marker):
+    name = 'NoDefault'
 
 
 NoDefault = NoDefaultType()
@@ -43,6 +74,12 @@ NoDefault = NoDefaultType()
 PaddedValue = PaddedValueType()
 
 
+class ObjectPattern:
+    """
+    Base class of `Obj`, the patterns matching objects by their class and some of their attributes.
+    """
+
+
 class BoxedArgs:
     def __init__(self, obj):
         self.obj = obj
@@ -51,6 +88,118 @@ class BoxedArgs:
         return self.obj
 
 
+class SequenceView(Sequence):
+    """
+    Read-only view over `sequence[start:]` that doesn't copy any element.
+    Changes to the underlying sequence are visible through the view. Slicing it returns a list.
+    """
+    __slots__ = ('_sequence', '_start')
+
+    def __init__(self, sequence, start=0):
+        if isinstance(sequence, SequenceView):
+            sequence, start = sequence._sequence, sequence._start + start
+        self._sequence = sequence
+        self._start = start
+
+    def __len__(self):
+        return max(len(self._sequence) - self._start, 0)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sequence, offset = self._sequence, self._start
+            return [sequence[offset + i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('SequenceView index out of range')
+        return self._sequence[self._start + index]
+
+    def __iter__(self):
+        return map(self._sequence.__getitem__, range(self._start, len(self._sequence)))
+
+    def __eq__(self, other):
+        if not isinstance(other, (SequenceView, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return 'SequenceView(%r)' % list(self)
+
+
+# Types of the values that regular expressions of bytes can search
+BYTES_LIKE = (bytes, bytearray, memoryview, array, mmap)
+
+
+def regex_subjects(pattern):
+    """
+    Return the types of the values the compiled regular expression `pattern` can search.
+    """
+    return str if isinstance(pattern.pattern, str) else BYTES_LIKE
+
+
+def tail_view(values, start):
+    """
+    Return a view over `values[start:]` without copying, or None if `values` doesn't support views.
+    """
+    if isinstance(values, (list, tuple, SequenceView)):
+        return SequenceView(values, start)
+    elif isinstance(values, (bytes, bytearray, memoryview, array)):
+        return memoryview(values)[start:]
+    return None
+
+
+class Replay:
+    """
+    A one-shot iterator, like a generator, matched against several patterns: every pattern reads it from
+    the start, since the items read by the patterns that didn't match it are kept and read again first.
+    Once a pattern has matched, `stop` stops keeping the items, so the iterators extracted from it
+    don't keep the rest of the values alive.
+    """
+    __slots__ = ('iterator', 'read', 'recording')
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.read = []
+        self.recording = True
+
+    def subject(self, kind):
+        """
+        Return the value a pattern of kind `kind` is matched against: the iterator itself, until a sequence
+        pattern has read some of it, or an iterator starting over from its first item.
+        """
+        if kind != KIND_SEQUENCE and not self.read:
+            return self.iterator
+        return ReplayIterator(self)
+
+    def stop(self):
+        self.recording = False
+
+
+class ReplayIterator:
+    """
+    Iterator over the items of a `Replay`, from the first one.
+    """
+    __slots__ = ('_replay', '_position')
+
+    def __init__(self, replay):
+        self._replay = replay
+        self._position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        replay = self._replay
+        position = self._position
+        self._position = position + 1
+        if position < len(replay.read):
+            return replay.read[position]
+        item = next(replay.iterator)
+        if replay.recording:
+            replay.read.append(item)
+        return item
+
+
 def pairwise(l):
     i = 0
     while i < len(l):
@@ -66,25 +215,227 @@ def get_lambda_args_error_msg(action, var, err):
         return "Error passing arguments %s:\n%s" % (var, err)
 
 
-def is_dataclass(value):
+try:
+    from dataclasses import is_dataclass, fields as dataclass_fields
+except ImportError:
+    # Dataclass support is only enabled in Python 3.7+, or in 3.6 with the `dataclasses` backport installed
+    def is_dataclass(value):
+        return False
+
+    def dataclass_fields(cls):
+        return ()
+
+
+class StrongRef:
     """
-    Dataclass support is only enabled in Python 3.7+, or in 3.6 with the `dataclasses` backport installed
+    Stands for the weak reference of an object that doesn't support them, and keeps it alive.
     """
-    try:
-        from dataclasses import is_dataclass
-        return is_dataclass(value)
-    except ImportError:
-        return False
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+class IdentityCache:
+    """
+    Values computed once per object, like the kinds of patterns, looked up by the identity of the object.
+
+    Objects supporting weak references, like functions, classes and most patterns, are only referenced weakly:
+    their entries go away with them. Any other object is kept alive by its entry, so that its id isn't reused;
+    when there are `maxsize` of those, their entries are all dropped.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        # For each id: the reference to the object, and its value
+        self.entries = {}
+        self.strong_keys = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, obj, default=None):
+        entry = self.entries.get(id(obj))
+        if entry is not None and entry[0]() is obj:
+            return entry[1]
+        return default
+
+    def put(self, obj, value):
+        key = id(obj)
+        try:
+            reference = ref(obj, partial(self._forget, key))
+        except TypeError:
+            if len(self.strong_keys) >= self.maxsize:
+                # Other threads may be dropping the same entries
+                strong_keys, self.strong_keys = self.strong_keys, []
+                for strong_key in strong_keys:
+                    entry = self.entries.get(strong_key)
+                    if entry is not None and type(entry[0]) is StrongRef:
+                        self.entries.pop(strong_key, None)
+            reference = StrongRef(obj)
+            self.strong_keys.append(key)
+        self.entries[key] = (reference, value)
+
+    def _forget(self, key, reference):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is reference:
+            self.entries.pop(key, None)
+
+
+# At most this many patterns without weak references are kept alive by each cache of patterns
+MAX_CACHED_KINDS = 1024
+
+# Fields of the classes seen so far, see `record_fields`
+fields_by_class = IdentityCache(MAX_CACHED_KINDS)
+
+# Returned by getattr for the fields that aren't set
+NotSet = object()
+
+
+def record_fields(cls):
+    """
+    Return the names of the fields compared when matching instances of `cls`, or None if they're not records:
+    the fields of a dataclass or an attrs class that take part in comparisons, or the `__slots__` of a class
+    and its bases. Computed only once per class.
+    """
+    fields = fields_by_class.get(cls, NotSet)
+    if fields is not NotSet:
+        return fields
+
+    fields = find_record_fields(cls)
+    fields_by_class.put(cls, fields)
+    return fields
+
+
+def find_record_fields(cls):
+    if is_dataclass(cls):
+        return tuple(field.name for field in dataclass_fields(cls) if field.compare)
+    attributes = getattr(cls, '__attrs_attrs__', None)
+    if attributes is not None:
+        return tuple(attribute.name for attribute in attributes if getattr(attribute, 'eq', True))
+
+    names = slot_names(cls)
+    return names if names else None
+
+
+def slot_names(cls):
+    """
+    Return the names of the attributes stored in the `__slots__` of `cls` and of its bases.
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_%s%s' % (klass.__name__.lstrip('_'), name)     # private names are mangled
+            if name not in ('__dict__', '__weakref__') and name not in names:
+                names.append(name)
+    return tuple(names)
+
+
+def record_items(record):
+    """
+    Return the `(name, value)` pairs of the fields of the record pattern `record` that are set.
+    Fields that aren't set, like empty slots, don't constrain the values matched by `record`.
+    """
+    items = []
+    for name in record_fields(type(record)):
+        value = getattr(record, name, NotSet)
+        if value is not NotSet:
+            items.append((name, value))
+    return items
+
+
+# Getters of the attributes read by the `Obj` patterns seen so far, by names, see `attributes_getter`
+getters_by_names = {}
+
+
+def attributes_getter(names):
+    """
+    Return the `attrgetter` of the attributes `names`, created only once for the same names:
+    like any `attrgetter`, it returns a tuple if there are several names, the attribute alone otherwise.
+    """
+    getter = getters_by_names.get(names)
+    if getter is None:
+        if len(getters_by_names) >= MAX_CACHED_KINDS:
+            getters_by_names.clear()
+        getter = getters_by_names[names] = attrgetter(*names)
+    return getter
+
+
+# For each function: its code, its annotations, the `Callable` alias of its signature, and the results
+# of `has_signature`, as `(pattern, result)` for the id of each pattern
+signatures = WeakKeyDictionary()
+
+
+def callable_signature(value):
+    """
+    Return `Callable[[argument types], return type]` for the callable `value`, from its annotations.
+    """
+    spec = inspect.getfullargspec(value)
+    annotations = spec.annotations
+    argtypes = [annotations.get(arg, Any) for arg in spec.args]
+    return Callable[argtypes, annotations.get('return', Any)]
+
+
+def has_signature(value, pattern):
+    """
+    Return True if the signature of the callable `value` is the `Callable` alias `pattern`.
+    For functions this is computed only once per pattern, and again if their code or annotations change.
+    """
+    if not inspect.isfunction(value):
+        return pattern == callable_signature(value)
+
+    cached = signatures.get(value)
+    if cached is None or cached[0] is not value.__code__ or cached[1] != value.__annotations__:
+        cached = signatures[value] = (value.__code__, dict(value.__annotations__), callable_signature(value), {})
+    results = cached[3]
+    found = results.get(id(pattern))
+    if found is not None and found[0] is pattern:
+        return found[1]
+    result = pattern == cached[2]
+    if len(results) >= MAX_CACHED_KINDS:
+        results.clear()
+    results[id(pattern)] = (pattern, result)
+    return result
 
 
 def get_extra(pattern):
-    return getattr(pattern, "__extra__", None) or getattr(pattern, "__origin__", None)
+    if LEGACY_GENERICS:
+        return getattr(pattern, "__extra__", None) or getattr(pattern, "__origin__", None)
+    # Since Python 3.7 there's no __extra__, and looking it up goes through the slow __getattr__ of typing
+    return getattr(pattern, "__origin__", None)
 
 
 def peek(iter_: Iterable[T]) -> T:
     return next(iter(iter_))
 
 
+Sample = namedtuple('Sample', ['size'])
+
+
+def sample_elements(values, size):
+    """
+    Return at most `size` elements of `values`: evenly spread if `values` is a sequence, otherwise the first ones.
+    """
+    if isinstance(values, Sequence):
+        length = len(values)
+        if length <= size:
+            return values
+        return [values[i * length // size] for i in range(size)]
+    return islice(values, size)
+
+
+def overrides_class(type_):
+    """
+    Objects can lie about their class (e.g. `unittest.mock`), which changes what `isinstance` returns.
+    """
+    return any('__class__' in vars(klass) for klass in type_.__mro__ if klass is not object)
+
+
 def is_newtype(pattern):
     return inspect.isfunction(pattern) and hasattr(pattern, '__supertype__')
 
@@ -106,3 +457,110 @@ def get_real_type(subtype):
         return get_real_type(subtype.__supertype__)
     else:
         return subtype
+
+
+KIND_TYPING = 'typing'
+KIND_LITERAL = 'literal'
+KIND_NONE = 'none'
+KIND_CLASS = 'class'
+KIND_SEQUENCE = 'sequence'
+KIND_DICT = 'dict'
+KIND_CALLABLE = 'callable'
+KIND_REGEX = 'regex'
+KIND_ANY = 'any'
+KIND_HEAD_TAIL = 'head_tail'
+KIND_DATACLASS = 'dataclass'     # and the other records: attrs classes, classes with __slots__
+KIND_OBJECT = 'object'
+KIND_NEVER = 'never'
+
+
+# Patterns of these exact types always have the same kind
+KINDS_BY_TYPE = {
+    int: KIND_LITERAL,
+    float: KIND_LITERAL,
+    str: KIND_LITERAL,
+    bool: KIND_LITERAL,
+    type(None): KIND_NONE,
+    list: KIND_SEQUENCE,
+    tuple: KIND_SEQUENCE,
+    dict: KIND_DICT,
+}
+
+# Kinds of the other patterns seen so far
+kinds_by_id = IdentityCache(MAX_CACHED_KINDS)
+
+
+def pattern_kind(pattern):
+    """
+    Return the kind of `pattern`, computing it only the first time a pattern is seen.
+    """
+    kind = KINDS_BY_TYPE.get(type(pattern))
+    if kind is not None:
+        return kind
+
+    cached = kinds_by_id.entries.get(id(pattern))
+    if cached is not None and cached[0]() is pattern:
+        return cached[1]
+
+    kind = classify_pattern(pattern)
+    kinds_by_id.put(pattern, kind)
+    return kind
+
+
+# Plans of the Unions seen so far, see `union_plan`
+union_plans = IdentityCache(MAX_CACHED_KINDS)
+
+
+def union_plan(pattern):
+    """
+    Return the members of the Union `pattern` as `(classes, member)` pairs, in order: consecutive members
+    that are classes are grouped in the tuple `classes`, to be checked with a single `isinstance`,
+    while any other member is returned as `member`, with `classes` set to None.
+    """
+    cached = union_plans.get(pattern)
+    if cached is not None:
+        return cached
+
+    plan = []
+    for member in pattern.__args__:
+        if pattern_kind(member) != KIND_CLASS:
+            plan.append((None, member))
+        elif len(plan) > 0 and plan[-1][0] is not None:
+            plan[-1] = (plan[-1][0] + (member,), None)
+        else:
+            plan.append(((member,), None))
+
+    union_plans.put(pattern, plan)
+    return plan
+
+
+def classify_pattern(pattern):
+    """
+    Classify `pattern` following the same order of checks used by `match_value`.
+    """
+    if is_typing_stuff(pattern):
+        return KIND_TYPING
+    elif isinstance(pattern, (int, float, str, bool, Enum)):
+        return KIND_LITERAL
+    elif pattern is None:
+        return KIND_NONE
+    elif isinstance(pattern, type):
+        return KIND_CLASS
+    elif isinstance(pattern, (list, tuple)):
+        return KIND_SEQUENCE
+    elif isinstance(pattern, dict):
+        return KIND_DICT
+    elif callable(pattern):
+        return KIND_CALLABLE
+    elif isinstance(pattern, RegexPattern):
+        return KIND_REGEX
+    elif isinstance(pattern, UnderscoreType):
+        return KIND_ANY
+    elif isinstance(pattern, (HeadType, TailType)):
+        return KIND_HEAD_TAIL
+    elif isinstance(pattern, ObjectPattern):
+        return KIND_OBJECT
+    elif record_fields(type(pattern)) is not None:
+        return KIND_DATACLASS
+    else:
+        return KIND_NEVER
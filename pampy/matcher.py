@@ -0,0 +1,1139 @@
+import inspect
+import re
+from collections import namedtuple
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from functools import partial
+from itertools import islice
+
+try:
+    from re import _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_parse
+
+from pampy.helpers import (
+    BoxedArgs,
+    NoDefault,
+    PaddedValue,
+    Replay,
+    tail_view,
+    regex_subjects,
+    record_items,
+    NotSet,
+    overrides_class,
+    is_union,
+    union_plan,
+    pattern_kind,
+    KIND_TYPING,
+    KIND_LITERAL,
+    KIND_NONE,
+    KIND_CLASS,
+    KIND_SEQUENCE,
+    KIND_DICT,
+    KIND_CALLABLE,
+    KIND_REGEX,
+    KIND_ANY,
+    KIND_HEAD_TAIL,
+    KIND_DATACLASS,
+    KIND_OBJECT,
+    KIND_NEVER,
+)
+from pampy.pampy import (
+    _,
+    HEAD,
+    TAIL,
+    MatchError,
+    run,
+    check_tail_mode,
+    check_policy,
+    _match_typing,
+    await_guard,
+)
+
+
+def compile_pattern(pattern, tail='list', policy='first'):
+    """
+    Turn `pattern` into a function `check(value, captures) -> bool` with the same semantics as
+    `match_value(pattern, value, tail=tail, policy=policy)`. Extracted values are appended to `captures`;
+    when the check fails `captures` may contain garbage, so callers must roll it back themselves.
+    """
+    kind = pattern_kind(pattern)
+    if kind == KIND_TYPING:
+        return _compile_typing(pattern, tail, policy)
+    elif kind == KIND_LITERAL:
+        return _compile_literal(pattern)
+    elif kind == KIND_NONE:
+        return _match_none
+    elif kind == KIND_CLASS:
+        return _compile_class(pattern)
+    elif kind == KIND_SEQUENCE:
+        return _compile_sequence(pattern, tail, policy)
+    elif kind == KIND_DICT:
+        return _compile_dict(pattern, tail, policy)
+    elif kind == KIND_CALLABLE:
+        return _compile_callable(pattern)
+    elif kind == KIND_REGEX:
+        return _compile_regex(pattern)
+    elif kind == KIND_ANY:
+        return _match_any
+    elif kind == KIND_HEAD_TAIL:
+        raise MatchError("HEAD or TAIL should only be used inside an Iterable (list or tuple).")
+    elif kind == KIND_DATACLASS:
+        return _compile_dataclass(pattern, tail, policy)
+    elif kind == KIND_OBJECT:
+        return _compile_object(pattern, tail, policy)
+    else:
+        return _match_never
+
+
+def _match_any(value, captures):
+    captures.append(value)
+    return True
+
+
+def _match_none(value, captures):
+    return value is None
+
+
+def _match_never(value, captures):
+    return False
+
+
+def _compile_typing(pattern, tail, policy):
+    if is_union(pattern):
+        return _compile_union(pattern, tail, policy)
+
+    def check(value, captures):
+        return _match_typing(pattern, value, captures, tail, policy)
+    return check
+
+
+def _compile_union(pattern, tail, policy):
+    plan = tuple((classes, None if classes is not None else compile_pattern(member, tail, policy))
+                 for classes, member in union_plan(pattern))
+
+    def check(value, captures):
+        for classes, check_member in plan:
+            if classes is not None:
+                if isinstance(value, classes):
+                    captures.append(value)
+                    return True
+            else:
+                size = len(captures)
+                if check_member(value, captures):
+                    return True
+                del captures[size:]
+        return False
+    return check
+
+
+def _compile_literal(pattern):
+    type_ = type(pattern)
+
+    def check(value, captures):
+        return type(value) is type_ and pattern == value
+    return check
+
+
+def _compile_class(pattern):
+    def check(value, captures):
+        if isinstance(value, pattern):
+            captures.append(value)
+            return True
+        return False
+    return check
+
+
+def _compile_sequence(patterns, tail, policy):
+    checks = []
+    has_tail = False
+    for i, pattern in enumerate(patterns):
+        if pattern is HEAD:
+            if i != 0:
+                raise MatchError("HEAD can only be in first position of a pattern.")
+            checks.append(_match_any)
+        elif pattern is TAIL:
+            if i != len(patterns) - 1:
+                raise MatchError("TAIL must me in last position of the pattern.")
+            has_tail = True
+        else:
+            checks.append(compile_pattern(pattern, tail, policy))
+    size = len(checks)
+    lazy_tail = tail == 'iter'
+    view_tail = tail == 'view'
+
+    def check_iterator(value, captures):
+        # Any other iterable is consumed lazily, stopping at the first mismatch
+        if not isinstance(value, Iterable):
+            return False
+        values = iter(value)
+        for check_item in checks:
+            item = next(values, PaddedValue)
+            if item is PaddedValue or not check_item(item, captures):
+                return False
+        if has_tail:
+            rest = None
+            if lazy_tail:
+                rest = values
+            elif view_tail:
+                rest = tail_view(value, size)
+            captures.append(list(values) if rest is None else rest)
+            return True
+        return next(values, PaddedValue) is PaddedValue
+
+    def check(value, captures):
+        if type(value) is not list and type(value) is not tuple:
+            return check_iterator(value, captures)
+        if len(value) != size:
+            return False
+        for item, check_item in zip(value, checks):
+            if not check_item(item, captures):
+                return False
+        return True
+
+    def check_with_tail(value, captures):
+        if type(value) is not list and type(value) is not tuple:
+            return check_iterator(value, captures)
+        if len(value) < size:
+            return False
+        for item, check_item in zip(value, checks):
+            if not check_item(item, captures):
+                return False
+        if lazy_tail:
+            captures.append(islice(value, size, None))
+        elif view_tail:
+            captures.append(tail_view(value, size))
+        else:
+            rest = value[size:]
+            captures.append(rest if type(rest) is list else list(rest))
+        return True
+
+    return check_with_tail if has_tail else check
+
+
+def _compile_dict(pattern, tail, policy):
+    # String keys are looked up directly, any other key is scanned for like in `match_dict`
+    items = tuple((pkey, type(pkey) is str, compile_pattern(pkey, tail, policy), compile_pattern(pval, tail, policy))
+                  for pkey, pval in pattern.items())
+
+    def check(value, captures):
+        if not isinstance(value, dict):
+            return False
+        used_keys = set()
+        for pkey, lookup, check_key, check_value in items:
+            if lookup:
+                if pkey in used_keys or pkey not in value or not check_value(value[pkey], captures):
+                    return False
+                used_keys.add(pkey)
+                continue
+            for vkey, vval in value.items():
+                if vkey in used_keys:
+                    continue
+                mark = len(captures)
+                if check_key(vkey, captures) and check_value(vval, captures):
+                    used_keys.add(vkey)
+                    break
+                del captures[mark:]
+            else:
+                return False
+        return True
+    return check
+
+
+def _compile_callable(pattern):
+    def check(value, captures):
+        return_value = pattern(value)
+        if not isinstance(return_value, (bool, tuple)) and inspect.isawaitable(return_value):
+            return_value = await_guard(pattern, return_value)
+        if isinstance(return_value, bool):
+            if return_value:
+                captures.append(value)
+            return return_value
+        elif isinstance(return_value, tuple) and len(return_value) == 2 \
+                and isinstance(return_value[0], bool) and isinstance(return_value[1], list):
+            if return_value[0]:
+                captures.extend(return_value[1])
+            return return_value[0]
+        else:
+            raise MatchError("Warning! pattern function %s is not returning a boolean "
+                             "nor a tuple of (boolean, list), but instead %s" %
+                             (pattern, return_value))
+    return check
+
+
+def _compile_regex(pattern):
+    search = pattern.search
+    subjects = regex_subjects(pattern)
+
+    def check(value, captures):
+        if not isinstance(value, subjects):
+            return False
+        rematch = search(value)
+        if rematch is not None:
+            captures.extend(rematch.groups())
+            return True
+        return False
+    return check
+
+
+def _compile_dataclass(pattern, tail, policy):
+    cls = pattern.__class__
+    plan = tuple((name, compile_pattern(pval, tail, policy)) for name, pval in record_items(pattern))
+
+    def check(value, captures):
+        if value.__class__ != cls:
+            return False
+        for name, check_field in plan:
+            field = getattr(value, name, NotSet)
+            if field is NotSet or not check_field(field, captures):
+                return False
+        return True
+    return check
+
+
+def _compile_object(pattern, tail, policy):
+    cls, getter = pattern.cls, pattern.getter
+    plan = tuple(compile_pattern(pval, tail, policy) for pval in pattern.patterns)
+
+    if len(plan) == 0:
+        def check(value, captures):
+            return isinstance(value, cls)
+    elif len(plan) == 1:
+        check_field, = plan
+
+        def check(value, captures):
+            if not isinstance(value, cls):
+                return False
+            try:
+                field = getter(value)
+            except AttributeError:
+                return False
+            return check_field(field, captures)
+    else:
+        def check(value, captures):
+            if not isinstance(value, cls):
+                return False
+            try:
+                fields = getter(value)
+            except AttributeError:
+                return False
+            for check_field, field in zip(plan, fields):
+                if not check_field(field, captures):
+                    return False
+            return True
+    return check
+
+
+NoneType = type(None)
+
+# Literals of these exact types (and Enum members) can be safely looked up in a dict by (type, value)
+INDEXABLE_LITERAL_TYPES = (int, float, str, bool, NoneType)
+
+# How many discriminators can be stacked on top of each other in a decision tree
+MAX_TREE_DEPTH = 3
+
+# When a Matcher has seen more types than this, its dispatch cache is emptied
+MAX_CACHED_TYPES = 512
+
+# How many lookups an adaptive leaf of a decision tree serves between two reorderings of its patterns,
+# and how often it counts which pattern matched
+REORDER_INTERVAL = 4096
+SAMPLE_INTERVAL = 16
+
+# Engines that Matcher.map can use
+ENGINES = ('python', 'numpy')
+
+# Fewest consecutive regular expressions merged into a single one by a decision tree
+MIN_MERGED_REGEXES = 4
+
+# Ways a Matcher can find the first matching pattern
+BACKENDS = ('tree', 'native', 'source')
+
+Case = namedtuple('Case', ['index', 'pattern', 'kind', 'check'])
+
+_Missing = object()
+
+
+def literal_key(pattern):
+    """
+    Return the `(type, value)` key under which a literal `pattern` can be looked up in a dict,
+    or None if `pattern` is not a literal that can be indexed.
+    """
+    if type(pattern) in INDEXABLE_LITERAL_TYPES or isinstance(pattern, Enum):
+        try:
+            hash(pattern)
+        except TypeError:
+            return None
+        return type(pattern), pattern
+    return None
+
+
+def accepts_type(case, type_, class_trusted=True):
+    """
+    Return False only if `case` can't possibly match a value whose type is `type_`.
+    """
+    kind, pattern = case.kind, case.pattern
+    if kind == KIND_LITERAL:
+        return type_ is type(pattern)
+    elif kind == KIND_NONE:
+        return type_ is NoneType
+    elif kind == KIND_NEVER:
+        return False
+    elif not class_trusted:
+        return True
+    elif kind == KIND_CLASS:
+        return type(pattern) is not type or issubclass(type_, pattern)
+    elif kind == KIND_SEQUENCE:
+        return issubclass(type_, Iterable)
+    elif kind == KIND_DICT:
+        return issubclass(type_, dict)
+    elif kind == KIND_DATACLASS:
+        return type_ == pattern.__class__
+    elif kind == KIND_OBJECT:
+        return type(pattern.cls) is not type or issubclass(type_, pattern.cls)
+    elif kind == KIND_REGEX:
+        return issubclass(type_, regex_subjects(pattern))
+    return True
+
+
+def sequence_size(case):
+    """
+    Return the number of elements required by a sequence pattern and whether it ends with TAIL.
+    """
+    pattern = case.pattern
+    if len(pattern) > 0 and pattern[-1] is TAIL:
+        return len(pattern) - 1, True
+    return len(pattern), False
+
+
+def accepts_length(case, length):
+    if case.kind != KIND_SEQUENCE:
+        return True
+    size, has_tail = sequence_size(case)
+    return length >= size if has_tail else length == size
+
+
+def element_key(case, position):
+    """
+    Return the literal key of the element at `position` in a sequence pattern, if any.
+    """
+    if case.kind != KIND_SEQUENCE:
+        return None
+    size, has_tail = sequence_size(case)
+    if position >= size:
+        return None
+    return literal_key(case.pattern[position])
+
+
+def dict_constraint(case, key):
+    """
+    Describe what a dict pattern requires about `key`, where `key` is the literal key of a pattern key:
+    None if nothing, `_Missing` if only its presence, otherwise the literal key of the required value.
+    """
+    if case.kind != KIND_DICT:
+        return None
+    for pkey, pval in case.pattern.items():
+        if literal_key(pkey) == key:
+            return literal_key(pval) or _Missing
+    return None
+
+
+def to_plan(cases):
+    return tuple((case.index, case.check) for case in cases)
+
+
+def is_pure(pattern, sequences=False):
+    """
+    Return True if checking `pattern` can't have side effects, so that it can be checked before or after
+    other patterns: literals, None, `_`, plain classes, and dicts of pure patterns.
+    Lists and tuples count only if `sequences` is True, i.e. when the values are lists or tuples themselves:
+    any other iterable could be consumed by the check.
+    """
+    kind = pattern_kind(pattern)
+    if kind == KIND_LITERAL:
+        return type(pattern) in INDEXABLE_LITERAL_TYPES or \
+            (isinstance(pattern, Enum) and type(pattern).__eq__ is object.__eq__)
+    elif kind in (KIND_NONE, KIND_ANY, KIND_NEVER):
+        return True
+    elif kind == KIND_CLASS:
+        return type(pattern) is type
+    elif kind == KIND_DICT:
+        return all(is_pure(pkey) and is_pure(pval) for pkey, pval in pattern.items())
+    elif kind == KIND_SEQUENCE and sequences:
+        return all(patt is HEAD or patt is TAIL or is_pure(patt) for patt in pattern)
+    return False
+
+
+def disjoint(first, second):
+    """
+    Return True only if no value can match both `first` and `second`, two pure patterns.
+    """
+    first_kind, second_kind = pattern_kind(first), pattern_kind(second)
+    if KIND_NEVER in (first_kind, second_kind):
+        return True
+    elif KIND_ANY in (first_kind, second_kind):
+        return False
+
+    if second_kind in (KIND_LITERAL, KIND_NONE):
+        first, second, first_kind, second_kind = second, first, second_kind, first_kind
+    if first_kind in (KIND_LITERAL, KIND_NONE):
+        # A pure literal is only matched by values of its own type, which doesn't lie about its class
+        type_ = type(first)
+        if second_kind in (KIND_LITERAL, KIND_NONE):
+            return literal_key(first) != literal_key(second)
+        elif second_kind == KIND_CLASS:
+            return not issubclass(type_, second)
+        elif second_kind == KIND_DICT:
+            return not issubclass(type_, dict)
+        elif second_kind == KIND_SEQUENCE:
+            return not issubclass(type_, Iterable)
+        return False
+
+    if first_kind == KIND_DICT and second_kind == KIND_DICT:
+        return any(type(pkey) is str and pkey in second and disjoint(pval, second[pkey])
+                   for pkey, pval in first.items())
+    if first_kind == KIND_SEQUENCE and second_kind == KIND_SEQUENCE:
+        first_tail = len(first) > 0 and first[-1] is TAIL
+        second_tail = len(second) > 0 and second[-1] is TAIL
+        first_size, second_size = len(first) - first_tail, len(second) - second_tail
+        if first_size != second_size and not (first_tail and second_size > first_size) \
+                and not (second_tail and first_size > second_size):
+            return True
+        return any(disjoint(first[i], second[i]) for i in range(min(first_size, second_size)))
+    # Two classes can always have a common subclass, or be faked through __class__
+    return False
+
+
+def disjoint_groups(cases, sequences=False):
+    """
+    Split `cases` in runs of consecutive cases whose patterns are pure and pairwise disjoint.
+    At most one case of a run can match a value, so the cases of a run can be tried in any order.
+    """
+    groups = []
+    pure_group = False
+    for case in cases:
+        pure = is_pure(case.pattern, sequences)
+        if pure and pure_group and all(disjoint(case.pattern, other.pattern) for other in groups[-1]):
+            groups[-1].append(case)
+        else:
+            groups.append([case])
+            pure_group = pure
+    return groups
+
+
+def counted_check(check, hits, index):
+    def counted(value, captures):
+        if check(value, captures):
+            hits[index] += 1
+            return True
+        return False
+    return counted
+
+
+def adaptive_plan(cases, sequences=False):
+    """
+    Build a leaf of a decision tree for a matcher created with `adaptive=True`: an `AdaptiveNode`
+    if some of the `cases` can be reordered, otherwise a plan like `to_plan`.
+    """
+    groups = disjoint_groups(cases, sequences)
+    if all(len(group) == 1 for group in groups):
+        return to_plan(cases)
+    return AdaptiveNode(groups)
+
+
+# Numbered back references and conditionals, that would refer to other groups once regular expressions are merged
+NUMBERED_REFERENCE = re.compile(r'\\[1-9]|\(\?\(\d')
+
+# Inline flags applying to the whole regular expression, that must stay at its start
+GLOBAL_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+def mergeable_regex(pattern):
+    """
+    Return True if the compiled regular expression `pattern` can only match at the start of a string,
+    so that `pattern.match` finds the same match as `pattern.search`, and it can be merged with others.
+    """
+    source = pattern.pattern
+    if isinstance(source, bytes):
+        source = source.decode('latin-1')
+    if NUMBERED_REFERENCE.search(source) or GLOBAL_FLAGS.search(source):
+        return False
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return False
+    if len(parsed) == 0:
+        return False
+    op, argument = parsed[0]
+    return op == sre_parse.AT and (argument == sre_parse.AT_BEGINNING_STRING or
+                                   argument == sre_parse.AT_BEGINNING and not pattern.flags & re.MULTILINE)
+
+
+def merge_regexes(patterns):
+    """
+    Merge the compiled regular expressions `patterns`, all anchored at the start and with the same flags,
+    into an alternation of one group per pattern. Return it with the numbers of these groups,
+    or None if they can't be merged. The `lastindex` of a match is the group of the first matching pattern.
+    """
+    sources = [pattern.pattern for pattern in patterns]
+    bar, group = ('|', '(%s)') if isinstance(sources[0], str) else (b'|', b'(%s)')
+    if patterns[0].flags & re.VERBOSE:
+        group = group.replace(')', '\n)') if isinstance(group, str) else group.replace(b')', b'\n)')
+    try:
+        merged = re.compile(bar.join(group % source for source in sources), patterns[0].flags)
+    except re.error:
+        return None
+
+    groups, number = [], 1
+    for pattern in patterns:
+        groups.append(number)
+        number += pattern.groups + 1
+    return merged, groups
+
+
+def regex_runs(cases):
+    """
+    Yield `(start, end)` for every run of at least `MIN_MERGED_REGEXES` consecutive cases in `cases`
+    whose regular expressions can be merged.
+    """
+    start = 0
+    while start < len(cases):
+        end = start
+        if cases[start].kind == KIND_REGEX and mergeable_regex(cases[start].pattern):
+            flags, subjects = cases[start].pattern.flags, regex_subjects(cases[start].pattern)
+            end = start + 1
+            while end < len(cases) and cases[end].kind == KIND_REGEX and cases[end].pattern.flags == flags \
+                    and regex_subjects(cases[end].pattern) is subjects and mergeable_regex(cases[end].pattern):
+                end += 1
+            if end - start >= MIN_MERGED_REGEXES:
+                yield start, end
+        start = max(end, start + 1)
+
+
+def regex_plan(cases):
+    """
+    Like `to_plan`, except that the first run of consecutive regular expressions anchored at the start
+    is merged, and tried at once by a `RegexNode` that chooses a plan with only the one that matches.
+    """
+    for start, end in regex_runs(cases):
+        merged = merge_regexes([case.pattern for case in cases[start:end]])
+        if merged is not None:
+            regex, groups = merged
+            before = list(cases[:start])
+            return RegexNode(
+                regex.match,
+                {group: to_plan(before + [case]) for group, case in zip(groups, cases[start:end])},
+                regex_plan(before + list(cases[end:]))
+            )
+    return to_plan(cases)
+
+
+class RegexNode:
+    """
+    Decision tree node matching at once a run of regular expressions anchored at the start of the value,
+    merged into `match`. It chooses the plan with the cases before the run and the first regular expression
+    that matches, whose own check then extracts its groups, or the plan `miss` without any of them.
+    """
+    __slots__ = ('match', 'plans', 'miss')
+
+    def __init__(self, match, plans, miss):
+        self.match = match
+        self.plans = plans
+        self.miss = miss
+
+    def select(self, value):
+        try:
+            found = self.match(value)
+        except TypeError:
+            return self.miss
+        if found is None:
+            return self.miss
+        return self.plans[found.lastindex]
+
+
+class AdaptiveNode:
+    """
+    Decision tree leaf trying the cases of each run of `disjoint_groups` from the one that matched
+    most often to the one that matched least often.
+
+    One lookup every `SAMPLE_INTERVAL` uses checks that count the hits of each case, and every
+    `REORDER_INTERVAL` lookups the plan is rebuilt and the counts are halved, to follow changes
+    in the distribution of the values.
+    """
+    __slots__ = ('groups', 'hits', 'plans', 'countdown')
+
+    def __init__(self, groups):
+        self.hits = {case.index: 0 for group in groups if len(group) > 1 for case in group}
+        self.groups = [[(case.index, case.check, counted_check(case.check, self.hits, case.index)
+                         if case.index in self.hits else case.check) for case in group]
+                       for group in groups]
+        self.countdown = REORDER_INTERVAL
+        self.reorder()
+
+    def select(self, value):
+        self.countdown -= 1
+        if self.countdown % SAMPLE_INTERVAL != 0:
+            return self.plans[0]
+        if self.countdown <= 0:
+            self.reorder()
+        return self.plans[1]
+
+    def reorder(self):
+        self.countdown = REORDER_INTERVAL
+        hits = self.hits
+        entries = [entry for group in self.groups
+                   for entry in sorted(group, key=lambda entry: -hits.get(entry[0], 0))]
+        # Replacing both plans at once keeps lookups running in other threads consistent
+        self.plans = (tuple((index, check) for index, check, counted in entries),
+                      tuple((index, counted) for index, check, counted in entries))
+        for index in hits:
+            hits[index] //= 2
+
+
+class LengthNode:
+    """
+    Decision tree node dispatching lists and tuples on their length.
+    """
+    __slots__ = ('cases', 'limit', 'children', 'leaf')
+
+    def __init__(self, cases, leaf=to_plan):
+        self.cases = cases
+        self.leaf = leaf
+        sizes = [sequence_size(case)[0] for case in cases if case.kind == KIND_SEQUENCE]
+        # Every length >= limit is accepted by the same cases
+        self.limit = max(sizes, default=0) + 1
+        self.children = {}
+
+    def select(self, value):
+        length = min(len(value), self.limit)
+        child = self.children.get(length)
+        if child is None:
+            cases = [case for case in self.cases if accepts_length(case, length)]
+            child = self.children[length] = build_sequence_node(cases, range(length), MAX_TREE_DEPTH, self.leaf)
+        return child
+
+
+class IndexNode:
+    """
+    Decision tree node dispatching on the literal found at `position` in a list or tuple,
+    or under `key` in a dict.
+    """
+    __slots__ = ('position', 'key', 'table', 'default', 'missing')
+
+    def __init__(self, table, default, position=None, key=None, missing=None):
+        self.position = position
+        self.key = key
+        self.table = table
+        self.default = default
+        self.missing = missing
+
+    def select(self, value):
+        if self.key is None:
+            item = value[self.position]
+        else:
+            item = value.get(self.key, _Missing)
+            if item is _Missing:
+                return self.missing
+        try:
+            return self.table.get((type(item), item), self.default)
+        except TypeError:
+            return self.default
+
+
+class LiteralNode:
+    """
+    Decision tree node looking up a scalar value in a table of the literal patterns of its type.
+    Every literal in `table` has the same type as the values reaching this node, so the values
+    themselves can be used as keys without losing the strict type equality of `match_value`.
+    """
+    __slots__ = ('table', 'default')
+
+    def __init__(self, table, default):
+        self.table = table
+        self.default = default
+
+    def select(self, value):
+        try:
+            return self.table.get(value, self.default)
+        except TypeError:
+            return self.default
+
+
+class ReplayNode:
+    """
+    Decision tree node of the one-shot iterators, like generators, choosing the plan of `node` with checks
+    that read the value from the start even after another check has read some of it, see `Replay`.
+    """
+    __slots__ = ('node', 'kinds')
+
+    def __init__(self, node, kinds):
+        self.node = node
+        self.kinds = kinds
+
+    def select(self, value):
+        node = self.node
+        while type(node) is not tuple:
+            node = node.select(value)
+        replay = Replay(value)
+        return tuple((index, replay_check(replay, check, self.kinds[index])) for index, check in node)
+
+
+def replay_check(replay, check, kind):
+    """
+    Return `check` for a pattern of kind `kind`, matching the value of `replay` from the start.
+    """
+    def check_replayed(value, captures):
+        if check(replay.subject(kind), captures):
+            replay.stop()
+            return True
+        return False
+    return check_replayed
+
+
+def replay_lookup(cases, value):
+    """
+    Return `(index, captures)` for the first of `cases` matching the one-shot iterator `value`, or None.
+    Used by the generated lookups, see `ReplayNode`.
+    """
+    replay = Replay(value)
+    captures = []
+    for case in cases:
+        if case.check(replay.subject(case.kind), captures):
+            replay.stop()
+            return case.index, captures
+        if captures:
+            captures = []
+    return None
+
+
+def split_cases(cases, constraint_of):
+    """
+    Group `cases` by the literal each of them requires, keeping the original order in every group.
+    Cases without a requirement end up in every group, and in the returned list of unconstrained cases.
+    """
+    table = {}
+    unconstrained = []
+    for case in cases:
+        constraint = constraint_of(case)
+        if constraint is None:
+            unconstrained.append(case)
+            for group in table.values():
+                group.append(case)
+        else:
+            group = table.get(constraint)
+            if group is None:
+                group = table[constraint] = list(unconstrained)
+            group.append(case)
+    return table, unconstrained
+
+
+def build_sequence_node(cases, positions, depth, leaf=to_plan):
+    best, best_count = None, 1
+    if depth > 0:
+        for position in positions:
+            count = sum(1 for case in cases if element_key(case, position) is not None)
+            if count > best_count:
+                best, best_count = position, count
+    if best is None:
+        return leaf(cases)
+
+    table, unconstrained = split_cases(cases, lambda case: element_key(case, best))
+    positions = [position for position in positions if position != best]
+    return IndexNode(
+        {key: build_sequence_node(group, positions, depth - 1, leaf) for key, group in table.items()},
+        build_sequence_node(unconstrained, positions, depth - 1, leaf),
+        position=best
+    )
+
+
+def build_literal_node(cases, leaf=to_plan):
+    literal_count = sum(1 for case in cases if literal_key(case.pattern) is not None)
+    if literal_count < 2:
+        return leaf(cases)
+
+    table, unconstrained = split_cases(cases, lambda case: literal_key(case.pattern))
+    return LiteralNode(
+        {key[1]: leaf(group) for key, group in table.items()},
+        leaf(unconstrained)
+    )
+
+
+def build_dict_node(cases, used_keys, depth, leaf=to_plan):
+    counts = {}
+    if depth > 0:
+        for case in cases:
+            if case.kind == KIND_DICT:
+                for pkey in case.pattern:
+                    key = literal_key(pkey)
+                    if key is not None and key not in used_keys:
+                        counts[key] = counts.get(key, 0) + 1
+    best = max(counts, key=counts.get, default=None)
+    if best is None or counts[best] < 2:
+        return leaf(cases)
+
+    used_keys = used_keys | {best}
+    constraints = {case.index: dict_constraint(case, best) for case in cases}
+
+    def value_constraint(case):
+        # Cases requiring `best` only to be present have no constraint on the value found there
+        constraint = constraints[case.index]
+        return None if constraint is _Missing else constraint
+
+    table, present = split_cases(cases, value_constraint)
+    missing = [case for case in cases if constraints[case.index] is None]
+    return IndexNode(
+        {key: build_dict_node(group, used_keys, depth - 1, leaf) for key, group in table.items()},
+        build_dict_node(present, used_keys, depth - 1, leaf),
+        key=best[1],
+        missing=build_dict_node(missing, used_keys, depth - 1, leaf)
+    )
+
+
+class Matcher:
+    """
+    A set of patterns and actions analysed once, that can be applied to many values.
+
+    Calling the matcher has the same semantics as calling `match` with the same arguments:
+    ```
+    what_is = Matcher(
+        3,          "the number 3",
+        int,        "any integer",
+        [1, _],     lambda x: "a list starting with 1",
+        _,          "anything else"
+    )
+    what_is(5)      # => "any integer"
+    ```
+    Instead of trying every pattern in order, the matcher builds a decision tree that first looks
+    at the type of the value, then at the length of lists and tuples, and then at literals in
+    fixed positions or under literal dict keys. Scalar values are looked up directly in a table
+    of the literal patterns of their type. Only the patterns that can still match are tried,
+    in their original order. The tree is built lazily, the first time a type is seen.
+
+    `default`, `strict`, `tail` and `policy` work like the arguments of `match`.
+
+    With `adaptive=True`, runs of consecutive patterns that can't match the same value, like
+    `{'kind': 'a'}` and `{'kind': 'b'}`, are tried starting from the one that matched most often
+    so far. The first matching pattern, and so the action that runs, doesn't change;
+    guards are never reordered.
+
+    With `backend='native'` (Python >= 3.10), the patterns are translated into a function using
+    the `match` statement instead of a decision tree, which is faster when there are few patterns,
+    or when they mostly contain literals, classes, lists, tuples and dicts with string keys.
+    With `backend='source'`, each pattern is translated into unrolled Python checks instead, on any version.
+    The source of the generated function is in `matcher.source`.
+
+    With `cache=size`, the matcher remembers the pattern matched by the last `size` values it has seen,
+    and what it extracted from them, as long as they can't change: strings, numbers, tuples of them and the like.
+    Every pattern function must be marked with `pure`. With `cache_results=True` the results of the actions
+    are remembered too, and actions run only the first time a value is seen. Hits and misses are counted
+    in `matcher.cache`.
+
+    With `profile=True`, the matcher records how many times each pattern is tried and matched,
+    and how long its matching and its action take, in `matcher.profile`:
+    ```
+    print(what_is.profile.report(sort_by='match_time'))
+    ```
+
+    A Matcher can be shared between threads.
+    """
+
+    def __new__(cls, *args, profile=False, cache=None, **kwargs):
+        if profile and cls is Matcher:
+            from pampy.profiling import ProfiledMatcher
+            cls = ProfiledMatcher
+        elif cache is not None and cls is Matcher:
+            from pampy.caching import CachedMatcher
+            cls = CachedMatcher
+        return super().__new__(cls)
+
+    def __init__(self, *args, default=NoDefault, strict=True, tail='list', policy='first', adaptive=False,
+                 profile=False, backend='tree', cache=None, cache_results=False):
+        if len(args) % 2 != 0:
+            raise MatchError("Every guard must have an action.")
+
+        check_tail_mode(tail)
+        check_policy(policy)
+        if backend not in BACKENDS:
+            raise MatchError("backend must be one of %s, not %r." % (', '.join(map(repr, BACKENDS)), backend))
+        if backend != 'tree' and (adaptive or profile):
+            raise MatchError("adaptive=True and profile=True need backend='tree'.")
+        if cache is not None and (type(cache) is not int or cache < 1):
+            raise MatchError("The size of a cache must be a positive integer, not %r." % (cache,))
+        if cache is not None and profile:
+            raise MatchError("A matcher can't be both cached and profiled.")
+        if cache_results and cache is None:
+            raise MatchError("cache_results=True needs the size of the cache, e.g. cache=1024.")
+
+        if default is NoDefault and strict is False:
+            default = False
+
+        self.patterns = args[0::2]
+        self.actions = args[1::2]
+        self.default = default
+        self.tail = tail
+        self.policy = policy
+        self.adaptive = adaptive
+        self.backend = backend
+        self.profile = None
+        self.cache = None
+        self.cache_results = cache_results
+        self.source = None
+        self._underscore_provided = _ in self.patterns
+        self._cases = tuple(Case(index, patt, pattern_kind(patt), compile_pattern(patt, tail, policy))
+                            for index, patt in enumerate(self.patterns))
+        self._dispatch = {}
+        if backend != 'tree':
+            from pampy.codegen import native_lookup, source_lookup
+            generate = native_lookup if backend == 'native' else source_lookup
+            self._lookup = generate(self._cases, tail, policy)
+            self.source = self._lookup.source
+
+    def __repr__(self):
+        return '<Matcher with %d patterns>' % len(self.patterns)
+
+    def __reduce__(self):
+        args = [item for case in zip(self.patterns, self.actions) for item in case]
+        options = dict(default=self.default, tail=self.tail, policy=self.policy, adaptive=self.adaptive,
+                       profile=self.profile is not None, backend=self.backend,
+                       cache=self.cache.maxsize if self.cache is not None else None, cache_results=self.cache_results)
+        return partial(Matcher, **options), tuple(args)
+
+    def __call__(self, var):
+        found = self._lookup(var)
+        if found is not None:
+            index, captures = found
+            return run(self.actions[index], captures if len(captures) > 0 else BoxedArgs(var))
+        return self._not_matched(var, self.default)
+
+    def map(self, values, default=NoDefault, index=False, engine='python',
+            workers=None, executor='process', ordered=True, chunksize=1000):
+        """
+        Match every element of `values`, yielding the results in the same order.
+
+        :param default: Overrides the default of the matcher for this batch.
+        :param index: If True, yield the index of the first matching pattern instead of running its action.
+        :param engine: 'python' matches the values lazily, one at a time.
+                       'numpy' reads the whole batch and matches records with the same shape column by column.
+                       It needs NumPy to be installed.
+        :param workers: If set, match chunks of `chunksize` values in parallel, in a pool of `workers`
+                        processes or threads depending on `executor`. Patterns, actions, values and results
+                        must be picklable to use processes; lambdas can be pickled if cloudpickle is installed.
+        :param ordered: If False, yield `(position, result)` pairs as soon as they're ready.
+        """
+        if engine not in ENGINES:
+            raise MatchError("engine must be one of %s, not %r." % (', '.join(map(repr, ENGINES)), engine))
+        if default is NoDefault:
+            default = self.default
+        if workers is not None:
+            from pampy.parallel import map_parallel
+            return map_parallel(self, values, default, index, engine, workers, executor, ordered, chunksize)
+        if engine == 'numpy':
+            from pampy.columnar import map_columns
+            results = map_columns(self, values, default, index)
+        else:
+            results = self._map(values, default, index)
+        return results if ordered else enumerate(results)
+
+    def _map(self, values, default, index):
+        lookup = self._lookup
+        actions = self.actions
+        for var in values:
+            found = lookup(var)
+            if found is None:
+                yield self._not_matched(var, default)
+            elif index:
+                yield found[0]
+            else:
+                captures = found[1]
+                yield run(actions[found[0]], captures if len(captures) > 0 else BoxedArgs(var))
+
+    def _not_matched(self, var, default):
+        if default is NoDefault:
+            if not self._underscore_provided:
+                raise MatchError("'_' not provided. This case is not handled:\n%s" % str(var))
+        else:
+            return default
+
+    def _lookup(self, var):
+        """
+        Return `(index, captures)` for the first pattern matching `var`, or None.
+        """
+        node = self._dispatch.get(type(var))
+        if node is None:
+            node = self._dispatch_type(type(var))
+        while type(node) is not tuple:
+            node = node.select(var)
+
+        captures = []
+        for index, check in node:
+            if check(var, captures):
+                return index, captures
+            if captures:
+                captures = []
+        return None
+
+    def _dispatch_type(self, type_):
+        class_trusted = not overrides_class(type_)
+        cases = [case for case in self._cases if accepts_type(case, type_, class_trusted)]
+        leaf = to_plan
+        if self.adaptive:
+            leaf = partial(adaptive_plan, sequences=type_ is list or type_ is tuple)
+        if type_ is list or type_ is tuple:
+            node = LengthNode(cases, leaf)
+        elif type_ is dict:
+            node = build_dict_node(cases, frozenset(), MAX_TREE_DEPTH, leaf)
+        else:
+            node = build_literal_node(cases, leaf if self.adaptive else regex_plan)
+        if issubclass(type_, Iterator) and any(case.kind == KIND_SEQUENCE for case in cases[:-1]):
+            node = ReplayNode(node, {case.index: case.kind for case in cases})
+
+        if len(self._dispatch) >= MAX_CACHED_TYPES:
+            self._dispatch.clear()
+        self._dispatch[type_] = node
+        return node
+
+
+def compile(*args, default=NoDefault, strict=True, tail='list', policy='first', adaptive=False, profile=False,
+            backend='tree', cache=None, cache_results=False):
+    """
+    Build a `Matcher` from alternating patterns and actions, exactly like the ones passed to `match`.
+
+    Use it when the same `match` runs many times: patterns are analysed only once.
+    ```
+    parse = compile(
+        int,        lambda x: x,
+        str,        lambda x: int(x),
+    )
+    parse("42")     # => 42
+    ```
+    """
+    return Matcher(*args, default=default, strict=strict, tail=tail, policy=policy, adaptive=adaptive,
+                   profile=profile, backend=backend, cache=cache, cache_results=cache_results)
+
+
+def match_many(values, *args, default=NoDefault, strict=True, tail='list', policy='first', index=False,
+               adaptive=False, backend='tree', cache=None, engine='python', workers=None, executor='process',
+               ordered=True, chunksize=1000):
+    """
+    Match every element of `values` against the same patterns, which are analysed only once.
+    Results are yielded lazily, in the same order as `values`.
+    ```
+    list(match_many([1, 'a', 2.5],
+        int,    'int',
+        str,    'str',
+        _,      'other'
+    ))              # => ['int', 'str', 'other']
+    ```
+    The other arguments work like the ones of `Matcher.map`, e.g. `workers=4` matches the values in 4 processes.
+
+    :param index: If True, yield the index of the first matching pattern instead of running its action.
+    :param adaptive: Like the argument of `Matcher`, reorders disjoint patterns by how often they match.
+    :param backend: Like the argument of `Matcher`, 'native' uses the `match` statement of Python >= 3.10,
+                    'source' generates unrolled checks.
+    :param cache: Like the argument of `Matcher`, remembers the patterns matched by the last `cache` values,
+                  useful when the same values come up again and again.
+    """
+    matcher = Matcher(*args, default=default, strict=strict, tail=tail, policy=policy, adaptive=adaptive,
+                      backend=backend, cache=cache)
+    return matcher.map(values, index=index, engine=engine,
+                       workers=workers, executor=executor, ordered=ordered, chunksize=chunksize)
@@ -1,20 +1,19 @@
 from collections.abc import (
     Iterable,
+    Iterator,
     Mapping,
     Callable as ACallable,
 )
-from itertools import zip_longest
-from enum import Enum
 from typing import (
     Any,
     Generic,
     TypeVar,
     Tuple,
     List,
-    Pattern as RegexPattern,
-    Callable,
 )
 import inspect
+from functools import partial
+from threading import local
 
 from pampy.helpers import (
     UnderscoreType,
@@ -24,8 +23,7 @@ from pampy.helpers import (
     BoxedArgs,
     PaddedValue,
     NoDefault,
-    is_typing_stuff,
-    is_dataclass,
+    Replay,
     is_generic,
     is_newtype,
     is_union,
@@ -33,6 +31,30 @@ from pampy.helpers import (
     peek,
     get_real_type,
     get_extra,
+    tail_view,
+    regex_subjects,
+    record_fields,
+    NotSet,
+    ObjectPattern,
+    attributes_getter,
+    has_signature,
+    overrides_class,
+    sample_elements,
+    Sample,
+    union_plan,
+    pattern_kind,
+    KIND_TYPING,
+    KIND_LITERAL,
+    KIND_NONE,
+    KIND_CLASS,
+    KIND_SEQUENCE,
+    KIND_DICT,
+    KIND_CALLABLE,
+    KIND_REGEX,
+    KIND_ANY,
+    KIND_HEAD_TAIL,
+    KIND_DATACLASS,
+    KIND_OBJECT,
 )
 
 T = TypeVar('T')
@@ -41,6 +63,70 @@ HEAD = HeadType()
 REST = TAIL = TailType()
 
 
+TAIL_MODES = ('list', 'iter', 'view')
+POLICIES = ('first', 'all', 'all-with-early-exit')
+
+
+def check_tail_mode(tail):
+    if tail not in TAIL_MODES:
+        raise MatchError("tail must be one of %s, not %r." % (', '.join(map(repr, TAIL_MODES)), tail))
+
+
+def sample(size):
+    """
+    Policy checking `size` elements of the containers matched by `List[T]`, `Dict[K, V]` and the like.
+    """
+    if type(size) is not int or size < 1:
+        raise MatchError("The size of a sample must be a positive integer, not %r." % (size,))
+    return Sample(size)
+
+
+def pure(function):
+    """
+    Mark the pattern function `function` as pure: its result only depends on its argument, and calling it
+    has no side effect. Matchers created with `cache=size` accept only pure pattern functions.
+    Can be used as a decorator.
+    """
+    try:
+        function.pampy_pure = True
+    except (AttributeError, TypeError):     # builtins don't accept attributes
+        function = partial(function)
+        function.pampy_pure = True
+    return function
+
+
+def is_pure_function(function):
+    return getattr(function, 'pampy_pure', False) is True
+
+
+class Obj(ObjectPattern):
+    """
+    Pattern matching the instances of `cls` whose attributes match the patterns given as keywords,
+    like the class patterns of the `match` statement: `Obj(User, name=_, admin=True)` matches the users
+    who are admins and extracts their names. The other attributes can have any value, and objects
+    missing one of the given attributes don't match.
+    """
+
+    def __init__(self, cls, **attributes):
+        if not isinstance(cls, type):
+            raise MatchError("Obj() needs a class, not %r." % (cls,))
+        self.cls = cls
+        self.names = tuple(attributes)
+        self.patterns = tuple(attributes.values())
+        # Reads all the attributes at once, see `_match_object`
+        self.getter = attributes_getter(self.names) if attributes else None
+
+    def __repr__(self):
+        attributes = ''.join(', %s=%r' % item for item in zip(self.names, self.patterns))
+        return 'Obj(%s%s)' % (self.cls.__qualname__, attributes)
+
+
+def check_policy(policy):
+    if policy not in POLICIES and not isinstance(policy, Sample):
+        raise MatchError("policy must be one of %s or sample(size), not %r."
+                         % (', '.join(map(repr, POLICIES)), policy))
+
+
 def run(action, var):
     if callable(action):
         if isinstance(var, Iterable):
@@ -56,208 +142,383 @@ def run(action, var):
         return action
 
 
-def match_value(pattern, value) -> Tuple[bool, List]:
+# Results of the async guards already awaited by `amatch` for the pattern it's matching
+guard_replay = local()
+
+
+class AwaitGuard(Exception):
+    """
+    Raised to stop matching when an async guard returns an awaitable whose result isn't known yet.
+    """
+    def __init__(self, awaitable):
+        super().__init__(awaitable)
+        self.awaitable = awaitable
+
+
+def await_guard(pattern, awaitable):
+    """
+    Return the result of the awaitable returned by the async guard `pattern`.
+
+    `match_value` can't await, so `amatch` catches `AwaitGuard`, awaits the result, and matches the
+    pattern again: this time the result is taken from `guard_replay`, in the order the guards are called.
+    """
+    results = getattr(guard_replay, 'results', None)
+    if results is None:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise MatchError("Pattern function %s is async, use amatch() instead." % pattern)
+
+    position = guard_replay.position
+    if position < len(results):
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        guard_replay.position += 1
+        return results[position]
+    raise AwaitGuard(awaitable)
+
+
+class NoCaptures(list):
+    """
+    The empty list of captures returned by every failed match. It's shared, so it can't be modified.
+    """
+    def _read_only(self, *args):
+        raise TypeError("The captures of a failed match can't be modified.")
+
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+
+# Returned by match_value, match_iterable and match_dict when there's no match, instead of a new (False, [])
+NO_MATCH = (False, NoCaptures())
+
+
+def match_value(pattern, value, tail='list', policy='first') -> Tuple[bool, List]:
+    captures = []
+    if _match_value(pattern, value, captures, tail, policy):
+        return True, captures
+    return NO_MATCH
+
+
+def match_dict(pattern, value, tail='list', policy='first') -> Tuple[bool, List]:
+    """
+    Match the dict `value` against the dict `pattern`. Every pattern key must match a different key of `value`.
+
+    String pattern keys are looked up in `value` instead of being matched against each of its keys, so unlike
+    other string patterns they also find the keys of `str` subclasses equal to them, like the members of a
+    `class Color(str, Enum)`.
+    """
+    captures = []
+    if _match_dict(pattern, value, captures, tail, policy):
+        return True, captures
+    return NO_MATCH
+
+
+def match_iterable(patterns, values, tail='list', policy='first') -> Tuple[bool, List]:
+    """
+    Match `values` element by element, consuming it lazily and stopping at the first mismatch.
+    What `TAIL` captures depends on `tail`: a list of the remaining values with 'list',
+    the iterator over them, left untouched, with 'iter', or with 'view' a view that doesn't copy them
+    (a `SequenceView` for lists and tuples, a `memoryview` for bytes-like objects and arrays).
+    """
+    captures = []
+    if _match_iterable(patterns, values, captures, tail, policy):
+        return True, captures
+    return NO_MATCH
+
+
+def match_typing_stuff(pattern, value, tail='list', policy='first') -> Tuple[bool, List]:
+    captures = []
+    if _match_typing(pattern, value, captures, tail, policy):
+        return True, captures
+    return NO_MATCH
+
+
+def match_generic(pattern: Generic[T], value, tail='list', policy='first') -> Tuple[bool, List]:
+    captures = []
+    if _match_generic(pattern, value, captures, tail, policy):
+        return True, captures
+    return NO_MATCH
+
+
+def _match_value(pattern, value, captures, tail='list', policy='first') -> bool:
+    """
+    Match `value` against `pattern`, appending the extracted values to `captures` instead of returning them,
+    so that nested patterns all share one list. When the match fails `captures` may contain garbage,
+    so callers trying something else must roll it back themselves.
+    """
     if value is PaddedValue:
-        return False, []
-    elif is_typing_stuff(pattern):
-        return match_typing_stuff(pattern, value)
-    elif isinstance(pattern, (int, float, str, bool, Enum)):
-        eq = pattern == value
-        type_eq = type(pattern) == type(value)
-        return eq and type_eq, []
-    elif pattern is None:
-        return value is None, []
-    elif isinstance(pattern, type):
+        return False
+
+    kind = pattern_kind(pattern)
+    if kind == KIND_LITERAL:
+        return type(pattern) == type(value) and pattern == value
+    elif kind == KIND_CLASS:
         if isinstance(value, pattern):
-            return True, [value]
-    elif isinstance(pattern, (list, tuple)):
-        return match_iterable(pattern, value)
-    elif isinstance(pattern, dict):
-        return match_dict(pattern, value)
-    elif callable(pattern):
+            captures.append(value)
+            return True
+    elif kind == KIND_ANY:
+        captures.append(value)
+        return True
+    elif kind == KIND_SEQUENCE:
+        return _match_iterable(pattern, value, captures, tail, policy)
+    elif kind == KIND_DICT:
+        return _match_dict(pattern, value, captures, tail, policy)
+    elif kind == KIND_NONE:
+        return value is None
+    elif kind == KIND_CALLABLE:
         return_value = pattern(value)
+        if inspect.isawaitable(return_value):
+            return_value = await_guard(pattern, return_value)
 
         if isinstance(return_value, bool):
-            return return_value, [value]
+            if return_value:
+                captures.append(value)
+            return return_value
         elif isinstance(return_value, tuple) and len(return_value) == 2 \
                 and isinstance(return_value[0], bool) and isinstance(return_value[1], list):
-            return return_value
+            if return_value[0]:
+                captures.extend(return_value[1])
+            return return_value[0]
         else:
             raise MatchError("Warning! pattern function %s is not returning a boolean "
                              "nor a tuple of (boolean, list), but instead %s" %
                              (pattern, return_value))
-    elif isinstance(pattern, RegexPattern):
+    elif kind == KIND_TYPING:
+        return _match_typing(pattern, value, captures, tail, policy)
+    elif kind == KIND_REGEX:
+        if not isinstance(value, regex_subjects(pattern)):
+            return False
         rematch = pattern.search(value)
         if rematch is not None:
-            return True, list(rematch.groups())
-    elif pattern is _:
-        return True, [value]
-    elif pattern is HEAD or pattern is TAIL:
+            captures.extend(rematch.groups())
+            return True
+    elif kind == KIND_HEAD_TAIL:
         raise MatchError("HEAD or TAIL should only be used inside an Iterable (list or tuple).")
-    elif is_dataclass(pattern) and pattern.__class__ == value.__class__:
-        return match_dict(pattern.__dict__, value.__dict__)
-    return False, []
+    elif kind == KIND_DATACLASS and pattern.__class__ == value.__class__:
+        return _match_record(pattern, value, captures, tail, policy)
+    elif kind == KIND_OBJECT:
+        return _match_object(pattern, value, captures, tail, policy)
+    return False
+
+
+def _match_object(pattern, value, captures, tail='list', policy='first') -> bool:
+    """
+    Match the attributes of `value` with the patterns of `pattern`, an `Obj`.
+    """
+    if not isinstance(value, pattern.cls):
+        return False
+    patterns = pattern.patterns
+    if not patterns:
+        return True
+    try:
+        fields = pattern.getter(value)
+    except AttributeError:
+        return False
+    if len(patterns) == 1:
+        return _match_value(patterns[0], fields, captures, tail, policy)
+    for pval, field in zip(patterns, fields):
+        if not _match_value(pval, field, captures, tail, policy):
+            return False
+    return True
+
+
+def _match_record(pattern, value, captures, tail='list', policy='first') -> bool:
+    """
+    Match the fields of the record `value` with the ones of `pattern`, an instance of the same class.
+    Fields that aren't set in `pattern` can have any value, fields that aren't set in `value` match nothing.
+    """
+    for name in record_fields(pattern.__class__):
+        pval = getattr(pattern, name, NotSet)
+        if pval is NotSet:
+            continue
+        field = getattr(value, name, NotSet)
+        if field is NotSet or not _match_value(pval, field, captures, tail, policy):
+            return False
+    return True
 
 
-def match_dict(pattern, value) -> Tuple[bool, List]:
+def _match_dict(pattern, value, captures, tail='list', policy='first') -> bool:
     if not isinstance(value, dict) or not isinstance(pattern, dict):
-        return False, []
+        return False
 
-    total_extracted = []
-    still_usable_value_keys = set(value.keys())
-    still_usable_pattern_keys = set(pattern.keys())
+    used_value_keys = set()
     for pkey, pval in pattern.items():
-        if pkey not in still_usable_pattern_keys:
+        if type(pkey) is str:
+            # A string key can only match the value key equal to it: look it up instead of scanning
+            if pkey in used_value_keys or pkey not in value \
+                    or not _match_value(pval, value[pkey], captures, tail, policy):
+                return False
+            used_value_keys.add(pkey)
             continue
-        matched_left_and_right = False
+
         for vkey, vval in value.items():
-            if vkey not in still_usable_value_keys:
-                continue
-            if pkey not in still_usable_pattern_keys:
+            if vkey in used_value_keys:
                 continue
-            key_matched, key_extracted = match_value(pkey, vkey)
-            if key_matched:
-                value_matched, value_extracted = match_value(pval, vval)
-                if value_matched:
-                    total_extracted += key_extracted + value_extracted
-                    matched_left_and_right = True
-                    still_usable_pattern_keys.remove(pkey)
-                    still_usable_value_keys.remove(vkey)
-                    break
-        if not matched_left_and_right:
-            return False, []
-    return True, total_extracted
-
-
-def only_padded_values_follow(padded_pairs, i):
-    i += 1
-    while i < len(padded_pairs):
-        pattern, value = padded_pairs[i]
-        if pattern is not PaddedValue:
+            mark = len(captures)
+            if _match_value(pkey, vkey, captures) and _match_value(pval, vval, captures, tail, policy):
+                used_value_keys.add(vkey)
+                break
+            del captures[mark:]
+        else:
             return False
-        i += 1
     return True
 
 
-def match_iterable(patterns, values) -> Tuple[bool, List]:
+def _match_iterable(patterns, values, captures, tail='list', policy='first') -> bool:
     if not isinstance(patterns, Iterable) or not isinstance(values, Iterable):
-        return False, []
+        return False
+
+    if not isinstance(patterns, (list, tuple)):
+        patterns = tuple(patterns)
 
-    total_extracted = []
-    padded_pairs = list(zip_longest(patterns, values, fillvalue=PaddedValue))
+    sequence = values
+    values = iter(values)
+    last = len(patterns) - 1
 
-    for i, (pattern, value) in enumerate(padded_pairs):
+    for i, pattern in enumerate(patterns):
+        if pattern is TAIL:
+            if i != last:
+                raise MatchError("TAIL must me in last position of the pattern.")
+            rest = None
+            if tail == 'iter':
+                rest = values
+            elif tail == 'view':
+                rest = tail_view(sequence, i)
+            captures.append(list(values) if rest is None else rest)
+            return True
+
+        value = next(values, PaddedValue)
         if pattern is HEAD:
             if i != 0:
                 raise MatchError("HEAD can only be in first position of a pattern.")
-            else:
-                if value is PaddedValue:
-                    return False, []
-                else:
-                    total_extracted += [value]
-        elif pattern is TAIL:
-            if not only_padded_values_follow(padded_pairs, i):
-                raise MatchError("TAIL must me in last position of the pattern.")
-            else:
-                tail = [value for (pattern, value) in padded_pairs[i:] if value is not PaddedValue]
-                total_extracted.append(tail)
-                break
-        else:
-            matched, extracted = match_value(pattern, value)
-            if not matched:
-                return False, []
-            else:
-                total_extracted += extracted
-    return True, total_extracted
+            elif value is PaddedValue:
+                return False
+            captures.append(value)
+        elif not _match_value(pattern, value, captures, tail, policy):
+            return False
+
+    return next(values, PaddedValue) is PaddedValue
 
 
-def match_typing_stuff(pattern, value) -> Tuple[bool, List]:
+def _match_typing(pattern, value, captures, tail='list', policy='first') -> bool:
     if pattern == Any:
-        return match_value(ANY, value)
+        return _match_value(ANY, value, captures)
     elif is_union(pattern):
-        for subpattern in pattern.__args__:
-            is_matched, extracted = match_value(subpattern, value)
-            if is_matched:
-                return True, extracted
-        else:
-            return False, []
+        for classes, subpattern in union_plan(pattern):
+            if classes is not None:
+                if isinstance(value, classes):
+                    captures.append(value)
+                    return True
+            else:
+                mark = len(captures)
+                if _match_value(subpattern, value, captures, tail, policy):
+                    return True
+                del captures[mark:]
+        return False
     elif is_newtype(pattern):
-        return match_value(pattern.__supertype__, value)
+        return _match_value(pattern.__supertype__, value, captures, tail, policy)
     elif is_generic(pattern):
-        return match_generic(pattern, value)
+        return _match_generic(pattern, value, captures, tail, policy)
     else:
-        return False, []
+        return False
 
 
-def match_generic(pattern: Generic[T], value) -> Tuple[bool, List]:
-    if get_extra(pattern) == type:       # Type[int] for example
+def _match_generic(pattern: Generic[T], value, captures, tail='list', policy='first') -> bool:
+    extra = get_extra(pattern)
+    if extra == type:       # Type[int] for example
         real_value = None
         if is_newtype(value):
             real_value = value
             value = get_real_type(value)
         if not inspect.isclass(value):
-            return False, []
+            return False
 
         type_ = pattern.__args__[0]
         if type_ == Any:
-            return True, [real_value or value]
+            captures.append(real_value or value)
+            return True
         if is_newtype(type_):   # NewType case
             type_ = get_real_type(type_)
 
         if issubclass(value, type_):
-            return True, [real_value or value]
-        else:
-            return False, []
-
-    elif get_extra(pattern) == ACallable:
-        if callable(value):
-            spec = inspect.getfullargspec(value)
-            annotations = spec.annotations
-            artgtypes = [annotations.get(arg, Any) for arg in spec.args]
-            ret_type = annotations.get('return', Any)
-            if pattern == Callable[[*artgtypes], ret_type]:
-                return True, [value]
-            else:
-                return False, []
-        else:
-            return False, []
+            captures.append(real_value or value)
+            return True
+        return False
 
-    elif get_extra(pattern) == tuple:
-        return match_value(pattern.__args__, value)
+    elif extra == ACallable:
+        if callable(value) and has_signature(value, pattern):
+            captures.append(value)
+            return True
+        return False
 
-    elif issubclass(get_extra(pattern), Mapping):
-        type_matched, _captured = match_value(get_extra(pattern), value)
-        if not type_matched:
-            return False, []
-        k_type, v_type = pattern.__args__
+    elif extra == tuple:
+        return _match_value(pattern.__args__, value, captures, tail, policy)
 
-        key_example = peek(value)
-        key_matched, _captured = match_value(k_type, key_example)
-        if not key_matched:
-            return False, []
+    elif issubclass(extra, Mapping):
+        if not _match_value(extra, value, []):
+            return False
+        k_type, v_type = pattern.__args__
 
-        value_matched, _captured = match_value(v_type, value[key_example])
-        if not value_matched:
-            return False, []
-        else:
-            return True, [value]
+        if policy == 'first':
+            key_example = peek(value)
+            if not _match_value(k_type, key_example, []) or not _match_value(v_type, value[key_example], []):
+                return False
+        elif not match_elements(k_type, value.keys(), policy) or not match_elements(v_type, value.values(), policy):
+            return False
+        captures.append(value)
+        return True
 
-    elif issubclass(get_extra(pattern), Iterable):
-        type_matched, _captured = match_value(get_extra(pattern), value)
-        if not type_matched:
-            return False, []
+    elif issubclass(extra, Iterable):
+        if not _match_value(extra, value, []):
+            return False
         v_type, = pattern.__args__
-        v = peek(value)
-        value_matched, _captured = match_value(v_type, v)
-        if not value_matched:
-            return False, []
-        else:
-            return True, [value]
+        if not match_elements(v_type, value, policy):
+            return False
+        captures.append(value)
+        return True
     else:
-        return False, []
+        return False
 
 
-def match(var, *args, default=NoDefault, strict=True):
+def match_elements(pattern, values, policy) -> bool:
+    """
+    Check the elements of the container `values` against the type `pattern`, following `policy`:
+    'first' only checks the first element, `sample(k)` checks k elements evenly spread over the container,
+    'all' checks all of them, using the set of their types when `pattern` is a class, and
+    'all-with-early-exit' checks them one by one until one doesn't match.
+    Iterators can be read only once, so only their first element is checked.
+    """
+    if policy == 'first' or iter(values) is values:
+        return _match_value(pattern, peek(values), [], policy=policy)
+
+    if pattern == Any:
+        return True
+    if isinstance(policy, Sample):
+        values = sample_elements(values, policy.size)
+
+    # A class, or a Union of classes, is just an isinstance check
+    if pattern_kind(pattern) == KIND_CLASS:
+        classes = (pattern,)
+    elif is_union(pattern) and all(pattern_kind(arg) == KIND_CLASS for arg in pattern.__args__):
+        classes = pattern.__args__
+    else:
+        captures = []
+        for value in values:
+            if not _match_value(pattern, value, captures, policy=policy):
+                return False
+            del captures[:]
+        return True
+
+    if policy == 'all' and all(type(class_) is type for class_ in classes):
+        types = set(map(type, values))
+        if all(issubclass(type_, classes) for type_ in types):
+            return True
+        if not any(overrides_class(type_) for type_ in types):
+            return False
+    return all(isinstance(value, classes) for value in values)
+
+
+def match(var, *args, default=NoDefault, strict=True, tail='list', policy='first'):
     """
     Match `var` against a number of potential patterns.
 
@@ -280,23 +541,40 @@ def match(var, *args, default=NoDefault, strict=True):
                     matched in corresponding pattern.
     :param default: If `default` is specified then it will be returned if none of the patterns match.
                     If `default` is unspecified then a `MatchError` will be thrown instead.
+    :param tail: What `TAIL` captures: 'list' for a list of the remaining values, 'iter' for a lazy
+                 iterator over them, useful when matching generators or very long sequences, or 'view'
+                 for a view over the remaining values of lists, tuples and bytes-like objects
+                 that doesn't copy them.
+    :param policy: How many elements of the containers matched by `List[T]`, `Dict[K, V]`, `Iterable[T]`
+                   and the like are checked: 'first' (the default) only checks the first one, `sample(k)`
+                   checks k of them, 'all' and 'all-with-early-exit' check all of them; the first finds
+                   the set of their types at once, the second stops at the first element not matching.
     :return: The result of the action which corresponds to the first matching pattern.
     """
     if len(args) % 2 != 0:
         raise MatchError("Every guard must have an action.")
 
+    check_tail_mode(tail)
+    check_policy(policy)
+
     if default is NoDefault and strict is False:
         default = False
 
     pairs = list(pairwise(args))
     patterns = [patt for (patt, action) in pairs]
 
-    for patt, action in pairs:
-        matched_as_value, args = match_value(patt, var)
+    # Every pattern reads a generator from the start, even after another one has read some of it
+    replay = Replay(var) if len(pairs) > 1 and isinstance(var, Iterator) else None
 
-        if matched_as_value:
-            lambda_args = args if len(args) > 0 else BoxedArgs(var)
+    captures = []
+    for patt, action in pairs:
+        value = var if replay is None else replay.subject(pattern_kind(patt))
+        if _match_value(patt, value, captures, tail, policy):
+            if replay is not None:
+                replay.stop()
+            lambda_args = captures if len(captures) > 0 else BoxedArgs(value)
             return run(action, lambda_args)
+        del captures[:]
 
     if default is NoDefault:
         if _ not in patterns:
@@ -0,0 +1,138 @@
+"""
+Parallel engine for `Matcher.map`.
+
+The values are split into chunks, which are matched by a pool of worker processes or threads.
+Worker processes receive the matcher only once, when they start, and then only chunks of values
+and their results travel between processes. A few chunks per worker are submitted ahead of time,
+so the values are still read lazily and the memory used doesn't grow with the size of the input.
+
+Matchers are sent to processes with pickle. Patterns and actions containing lambdas or local
+functions can't be pickled, so in that case cloudpickle is used, if it's installed.
+"""
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from itertools import count, islice
+
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+from pampy.pampy import MatchError
+
+EXECUTORS = ('process', 'thread')
+
+# How many chunks each worker has queued ahead of the ones being yielded
+CHUNKS_AHEAD = 2
+
+# The matcher used by the current worker process, set when the process starts
+worker_matcher = None
+
+
+def dump_matcher(matcher):
+    try:
+        return pickle.dumps(matcher)
+    except (pickle.PicklingError, AttributeError, TypeError) as err:
+        if cloudpickle is None:
+            raise MatchError("The patterns can't be sent to worker processes: %s\n"
+                             "Lambdas and local functions can be sent if cloudpickle is installed "
+                             "(pip install cloudpickle), otherwise use executor='thread'." % err)
+    try:
+        return cloudpickle.dumps(matcher)
+    except Exception as err:
+        raise MatchError("The patterns can't be sent to worker processes: %s\n"
+                         "Use executor='thread' instead." % err)
+
+
+def init_worker(payload):
+    global worker_matcher
+    worker_matcher = pickle.loads(payload)
+
+
+def match_chunk(matcher, chunk, default, index, engine):
+    """
+    Return the results for the values in `chunk`, and the exception that interrupted them, if any.
+    """
+    results = []
+    try:
+        for result in matcher.map(chunk, default=default, index=index, engine=engine):
+            results.append(result)
+    except Exception as err:
+        return results, err
+    return results, None
+
+
+def match_chunk_in_worker(chunk, default, index, engine):
+    return match_chunk(worker_matcher, chunk, default, index, engine)
+
+
+def split(values, chunksize):
+    """
+    Lazily yield `(start, chunk)` for consecutive chunks of `values`, where `start` is the position of
+    the first value of the chunk.
+    """
+    values = iter(values)
+    for start in count(0, chunksize):
+        chunk = list(islice(values, chunksize))
+        if len(chunk) == 0:
+            return
+        yield start, chunk
+
+
+def map_parallel(matcher, values, default, index, engine, workers, executor, ordered, chunksize):
+    """
+    Same as `Matcher.map`, but matching chunks of `values` in a pool of `workers` processes or threads.
+    """
+    if executor not in EXECUTORS:
+        raise MatchError("executor must be one of %s, not %r." % (', '.join(map(repr, EXECUTORS)), executor))
+    if type(workers) is not int or workers < 1:
+        raise MatchError("workers must be a positive integer, not %r." % (workers,))
+    if type(chunksize) is not int or chunksize < 1:
+        raise MatchError("chunksize must be a positive integer, not %r." % (chunksize,))
+
+    if executor == 'process':
+        payload = dump_matcher(matcher)
+        make_pool = partial(ProcessPoolExecutor, workers, initializer=init_worker, initargs=(payload,))
+        task = partial(match_chunk_in_worker, default=default, index=index, engine=engine)
+    else:
+        make_pool = partial(ThreadPoolExecutor, workers)
+        task = partial(match_chunk, matcher, default=default, index=index, engine=engine)
+
+    collect = collect_ordered if ordered else collect_unordered
+    return collect(make_pool, task, split(values, chunksize), workers * CHUNKS_AHEAD)
+
+
+def collect_ordered(make_pool, task, chunks, ahead):
+    with make_pool() as pool:
+        pending = deque(pool.submit(task, chunk) for _start, chunk in islice(chunks, ahead))
+        try:
+            while pending:
+                results, error = pending.popleft().result()
+                for _start, chunk in islice(chunks, 1):
+                    pending.append(pool.submit(task, chunk))
+                yield from results
+                if error is not None:
+                    raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def collect_unordered(make_pool, task, chunks, ahead):
+    with make_pool() as pool:
+        pending = {pool.submit(task, chunk): start for start, chunk in islice(chunks, ahead)}
+        try:
+            while pending:
+                for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                    start = pending.pop(future)
+                    results, error = future.result()
+                    for next_start, chunk in islice(chunks, 1):
+                        pending[pool.submit(task, chunk)] = next_start
+                    yield from enumerate(results, start)
+                    if error is not None:
+                        raise error
+        finally:
+            for future in pending:
+                future.cancel()
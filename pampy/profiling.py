@@ -0,0 +1,129 @@
+"""
+Profiling of matchers created with `profile=True`.
+
+Every pattern of a profiled matcher is wrapped in a check that counts how many times it's tried and
+how many times it matches, and measures the time spent matching it; the time spent in its action is
+measured too. Matchers created without `profile=True` don't run any of this code.
+"""
+from time import perf_counter
+
+from pampy.helpers import BoxedArgs
+from pampy.pampy import MatchError, run
+from pampy.matcher import Matcher
+
+
+class PatternStats:
+    """
+    What happened to a pattern of a profiled matcher.
+
+    `tried` counts the times the pattern was actually checked: patterns ruled out by the decision tree
+    of the matcher, e.g. because of the type of the value, aren't tried at all.
+    Times are in seconds.
+    """
+    __slots__ = ('index', 'pattern', 'tried', 'matched', 'match_time', 'action_time')
+
+    def __init__(self, index, pattern):
+        self.index = index
+        self.pattern = pattern
+        self.reset()
+
+    def reset(self):
+        self.tried = 0
+        self.matched = 0
+        self.match_time = 0.0
+        self.action_time = 0.0
+
+    def __repr__(self):
+        return '<PatternStats %d: tried %d, matched %d>' % (self.index, self.tried, self.matched)
+
+
+class MatchProfile:
+    """
+    Statistics collected by a matcher created with `profile=True`, available as `matcher.profile`.
+
+    `patterns` holds a `PatternStats` for every pattern, in order, and `unmatched` counts the values
+    no pattern matched. When the matcher is shared between threads, counts are approximate.
+    """
+    SORT_KEYS = ('index', 'tried', 'matched', 'match_time', 'action_time')
+
+    def __init__(self, patterns):
+        self.patterns = [PatternStats(index, pattern) for index, pattern in enumerate(patterns)]
+        self.unmatched = 0
+
+    def reset(self):
+        for stats in self.patterns:
+            stats.reset()
+        self.unmatched = 0
+
+    def report(self, sort_by='index'):
+        """
+        Return a table with the statistics of every pattern, sorted by `sort_by`,
+        in decreasing order unless it's 'index'.
+        """
+        if sort_by not in self.SORT_KEYS:
+            raise MatchError("sort_by must be one of %s, not %r."
+                             % (', '.join(map(repr, self.SORT_KEYS)), sort_by))
+        rows = sorted(self.patterns, key=lambda stats: getattr(stats, sort_by), reverse=sort_by != 'index')
+
+        row_format = '%5s  %-30s %10s %10s %12s %12s'
+        lines = [row_format % ('index', 'pattern', 'tried', 'matched', 'match ms', 'action ms')]
+        for stats in rows:
+            pattern = repr(stats.pattern)
+            if len(pattern) > 30:
+                pattern = pattern[:27] + '...'
+            lines.append(row_format % (stats.index, pattern, stats.tried, stats.matched,
+                                       '%.3f' % (stats.match_time * 1e3), '%.3f' % (stats.action_time * 1e3)))
+        lines.append('unmatched values: %d' % self.unmatched)
+        return '\n'.join(lines)
+
+
+def profiled_check(check, stats):
+    def profiled(value, captures):
+        start = perf_counter()
+        matched = check(value, captures)
+        stats.match_time += perf_counter() - start
+        stats.tried += 1
+        if matched:
+            stats.matched += 1
+        return matched
+    return profiled
+
+
+class ProfiledMatcher(Matcher):
+    """
+    Matcher collecting a `MatchProfile`, created by `Matcher(..., profile=True)`.
+    Only values matched in this process, with the 'python' engine, are profiled.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profile = MatchProfile(self.patterns)
+        stats = self.profile.patterns
+        self._cases = tuple(case._replace(check=profiled_check(case.check, stats[case.index])) for case in self._cases)
+
+    def __call__(self, var):
+        found = self._lookup(var)
+        if found is not None:
+            index, captures = found
+            return self._run(index, captures if len(captures) > 0 else BoxedArgs(var))
+        self.profile.unmatched += 1
+        return self._not_matched(var, self.default)
+
+    def _map(self, values, default, index):
+        for var in values:
+            found = self._lookup(var)
+            if found is None:
+                self.profile.unmatched += 1
+                yield self._not_matched(var, default)
+            elif index:
+                yield found[0]
+            else:
+                captures = found[1]
+                yield self._run(found[0], captures if len(captures) > 0 else BoxedArgs(var))
+
+    def _run(self, index, args):
+        start = perf_counter()
+        try:
+            return run(self.actions[index], args)
+        finally:
+            self.profile.patterns[index].action_time += perf_counter() - start
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+
+from pampy import amatch, amatch_many, match, compile, _, MatchError
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def is_even(x):
+    await asyncio.sleep(0)
+    return x % 2 == 0
+
+
+async def double(x):
+    await asyncio.sleep(0)
+    return x * 2
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+class AsyncTests(unittest.TestCase):
+
+    def test_amatch_like_match(self):
+        self.assertEqual(run(amatch(3, int, lambda x: x + 1)), 4)
+        self.assertEqual(run(amatch([1, 2], [1, _], lambda x: x)), 2)
+        self.assertEqual(run(amatch('x', int, 1, default='default')), 'default')
+        with self.assertRaises(MatchError):
+            run(amatch('x', int, 1))
+
+    def test_async_actions(self):
+        self.assertEqual(run(amatch(3, int, double)), 6)
+        self.assertEqual(run(amatch((1, 2), (int, int), lambda a, b: double(a + b))), 6)
+
+    def test_async_guards(self):
+        self.assertEqual(run(amatch(4, is_even, double, _, 'odd')), 8)
+        self.assertEqual(run(amatch(3, is_even, double, _, 'odd')), 'odd')
+
+    def test_nested_async_guards(self):
+        calls = []
+
+        def spy(x):
+            calls.append(x)
+            return True
+
+        def f(value):
+            return run(amatch(value,
+                              {'a': is_even, 'b': spy, 'c': is_even},   lambda a, b, c: 'evens',
+                              {'a': _, 'b': _},                         lambda a, b: 'other'))
+
+        self.assertEqual(f({'a': 2, 'b': 3, 'c': 4}), 'evens')
+        self.assertEqual(f({'a': 2, 'b': 3, 'c': 5}), 'other')
+        self.assertEqual(f({'a': 1, 'b': 3, 'c': 4}), 'other')
+        self.assertEqual(calls, [3, 3, 3, 3])
+
+    def test_async_guards_need_amatch(self):
+        with self.assertRaises(MatchError):
+            match(2, is_even, True)
+        with self.assertRaises(MatchError):
+            compile(is_even, True)(2)
+        with self.assertRaises(MatchError):
+            run(amatch(iter([2]), [is_even], True))
+
+    def test_amatch_generator(self):
+        values = (x for x in [1, 2, 3])
+        self.assertEqual(run(amatch(values, [9, _, _], 'first', [2, 3], 'second', _, list)), [1, 2, 3])
+
+    def test_amatch_many(self):
+        self.assertEqual(run(collect(amatch_many(range(6), is_even, double, _, 'odd', concurrency=4))),
+                         [0, 'odd', 4, 'odd', 8, 'odd'])
+
+    def test_amatch_many_with_async_iterable(self):
+        async def values():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield i
+
+        self.assertEqual(run(collect(amatch_many(values(), int, double))), [0, 2, 4])
+
+    def test_amatch_many_bounded_concurrency(self):
+        running = []
+        peak = []
+
+        async def slow(x):
+            running.append(x)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(x)
+            return x
+
+        results = run(collect(amatch_many(range(10), int, slow, concurrency=3)))
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(max(peak), 3)
+
+    def test_amatch_many_errors(self):
+        with self.assertRaises(MatchError):
+            run(collect(amatch_many([1, 'x', 2], int, double, concurrency=2)))
+        with self.assertRaises(MatchError):
+            run(collect(amatch_many([1], int, double, concurrency=0)))
@@ -1,8 +1,14 @@
+import gc
 import unittest
+import weakref
 from enum import Enum
 import re
+import sys
+from threading import Thread
 
 from pampy import match_value, match, HEAD, TAIL, _, MatchError
+from pampy import helpers
+from pampy.helpers import pattern_kind, KIND_LITERAL, KIND_CLASS, KIND_SEQUENCE, KIND_ANY, KIND_CALLABLE, KIND_NEVER
 
 
 class PampyBasicTests(unittest.TestCase):
@@ -48,6 +54,17 @@ class PampyBasicTests(unittest.TestCase):
         self.assertEqual(match_value(_, 3), (True, [3]))
         self.assertEqual(match_value(_, 'ok'), (True, ['ok']))
 
+    def test_match_value_failures_share_their_result(self):
+        self.assertIs(match_value(1, 2), match_value([_, {'a': 1}], [0, {'a': 2}]))
+        matched, captures = match_value([_, 1], [0, 2])
+        self.assertEqual(captures, [])
+        with self.assertRaises(TypeError):
+            captures.append(0)
+
+    def test_match_value_rolls_back_partial_captures(self):
+        self.assertEqual(match_value({int: [_, 1]}, {1: [5, 2], 3: [6, 1]}), (True, [3, 6]))
+        self.assertEqual(match_value([[_, 1], _], [[0, 1], 2]), (True, [0, 2]))
+
     def test_match_value_callable_pattern(self):
         self.assertEqual(match_value(3, lambda: True), (False, []))
 
@@ -143,6 +160,20 @@ class PampyBasicTests(unittest.TestCase):
 
         self.assertEqual(what_is('my-fuffy-cat'), 'fuffy-cat')
 
+    def test_regex_only_matches_strings(self):
+        def what_is(x):
+            return match(x,
+                re.compile('4'),        'text',
+                re.compile(b'4'),       'binary',
+                _,                      'other'
+            )
+
+        self.assertEqual(what_is('42'), 'text')
+        self.assertEqual(what_is(b'42'), 'binary')
+        self.assertEqual(what_is(bytearray(b'42')), 'binary')
+        self.assertEqual(what_is(42), 'other')
+        self.assertEqual(what_is(['42']), 'other')
+
     def test_match_enum(self):
         class Color(Enum):
             RED = 1
@@ -152,3 +183,71 @@ class PampyBasicTests(unittest.TestCase):
         self.assertEqual(match(Color.RED, Color.BLUE, "blue", Color.RED, "red", _, "else"), "red")
         self.assertEqual(match(Color.RED, Color.BLUE, "blue", Color.GREEN, "green", _, "else"), "else")
         self.assertEqual(match(1, Color.BLUE, "blue", Color.GREEN, "green", _, "else"), "else")
+
+
+class PatternKindTests(unittest.TestCase):
+
+    def test_kinds(self):
+        self.assertEqual(pattern_kind(1), KIND_LITERAL)
+        self.assertEqual(pattern_kind(int), KIND_CLASS)
+        self.assertEqual(pattern_kind([1, _]), KIND_SEQUENCE)
+        self.assertEqual(pattern_kind(_), KIND_ANY)
+        self.assertEqual(pattern_kind(lambda x: True), KIND_CALLABLE)
+        self.assertEqual(pattern_kind(object()), KIND_NEVER)
+
+    def test_unhashable_patterns(self):
+        class Unhashable:
+            __hash__ = None
+
+            def __call__(self, value):
+                return value == 1
+
+        pattern = Unhashable()
+        for _i in range(3):
+            self.assertEqual(pattern_kind(pattern), KIND_CALLABLE)
+            self.assertEqual(match(1, pattern, 'one', _, 'other'), 'one')
+
+    def test_cache_is_bounded(self):
+        for i in range(helpers.MAX_CACHED_KINDS * 3):
+            self.assertEqual(match(i, lambda x: x == i, 'same', _, 'other'), 'same')
+        self.assertLessEqual(len(helpers.kinds_by_id), helpers.MAX_CACHED_KINDS)
+
+    def test_cache_does_not_keep_patterns_alive(self):
+        class Big:
+            pass
+
+        big = Big()
+        pattern = lambda x: x is big
+        self.assertEqual(match(big, pattern, 'big', _, 'other'), 'big')
+        self.assertEqual(pattern_kind(pattern), KIND_CALLABLE)
+
+        reference = weakref.ref(big)
+        del big, pattern
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_cache_of_patterns_without_weak_references_is_bounded(self):
+        for i in range(helpers.MAX_CACHED_KINDS * 3):
+            self.assertEqual(pattern_kind(object()), KIND_NEVER)
+        self.assertLessEqual(len(helpers.kinds_by_id.strong_keys), helpers.MAX_CACHED_KINDS)
+
+    def test_cache_of_patterns_without_weak_references_is_thread_safe(self):
+        cache = helpers.IdentityCache(64)
+        errors = []
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        def fill():
+            try:
+                for i in range(10000):
+                    cache.put(object(), i)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [Thread(target=fill) for _i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
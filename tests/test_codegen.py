@@ -0,0 +1,155 @@
+import gc
+import linecache
+import re
+import traceback
+import unittest
+
+from pampy import compile, Matcher, HEAD, TAIL, _, MatchError
+from pampy.codegen import native_available
+from tests import test_basic, test_dict, test_dataclass, test_elaborate
+from tests.test_matcher import with_match
+
+needs_native = unittest.skipUnless(native_available(), "the match statement needs Python 3.10")
+
+
+def native_match(var, *args, **kwargs):
+    return compile(*args, backend='native', **kwargs)(var)
+
+
+def source_match(var, *args, **kwargs):
+    return compile(*args, backend='source', **kwargs)(var)
+
+
+NativeBasicTests = needs_native(with_match(test_basic.PampyBasicTests, test_basic, native_match, 'Native'))
+NativeDictTests = needs_native(with_match(test_dict.IterableTests, test_dict, native_match, 'Native'))
+NativeDataClassTests = needs_native(
+    with_match(test_dataclass.PampyDataClassesTests, test_dataclass, native_match, 'Native'))
+NativeElaborateTests = needs_native(
+    with_match(test_elaborate.PampyElaborateTests, test_elaborate, native_match, 'Native'))
+
+SourceBasicTests = with_match(test_basic.PampyBasicTests, test_basic, source_match, 'Source')
+SourceDictTests = with_match(test_dict.IterableTests, test_dict, source_match, 'Source')
+SourceDataClassTests = with_match(test_dataclass.PampyDataClassesTests, test_dataclass, source_match, 'Source')
+SourceElaborateTests = with_match(test_elaborate.PampyElaborateTests, test_elaborate, source_match, 'Source')
+
+
+@needs_native
+class NativeBackendTests(unittest.TestCase):
+
+    def test_source(self):
+        m = compile(
+            1,                  'one',
+            [HEAD, TAIL],       lambda head, tail: tail,
+            {'a': {'b': str}},  lambda b: b,
+            _,                  'other',
+            backend='native'
+        )
+        self.assertIn('match value:', m.source)
+        self.assertIn('*', m.source)
+        self.assertIsNone(compile(1, 'one').source)
+
+    def test_literals_keep_their_type(self):
+        m = compile(1, 'int', 1.0, 'float', True, 'bool', 'a', 'str', default=None, backend='native')
+        self.assertEqual([m(v) for v in [1, 1.0, True, 'a', 0]], ['int', 'float', 'bool', 'str', None])
+
+    def test_sequences(self):
+        m = compile(
+            [1, TAIL],      lambda tail: tail,
+            (str, int),     lambda s, i: (s, i),
+            [HEAD],         lambda head: head,
+            default=None, backend='native'
+        )
+        self.assertEqual(m([1, 2, 3]), [2, 3])
+        self.assertEqual(m((1,)), [])
+        self.assertEqual(m(['a', 2]), ('a', 2))
+        self.assertEqual(m(iter([1, 2])), [2])
+        self.assertEqual(m('x'), 'x')
+        self.assertEqual(m([2, 3]), None)
+
+    def test_dicts_and_fallbacks(self):
+        m = compile(
+            {'type': 'user', 'name': re.compile('^(\\w+)!$')},     lambda name: name,
+            {'type': 'user', 'tags': [str]},                        lambda tag: tag,
+            {1: int},                                               lambda i: i,
+            lambda x: x == 'guard',                                 lambda x: x,
+            default=None, backend='native'
+        )
+        self.assertEqual(m({'type': 'user', 'name': 'bob!'}), 'bob')
+        self.assertEqual(m({'type': 'user', 'tags': ('admin',)}), 'admin')
+        self.assertEqual(m({1: 5}), 5)
+        self.assertEqual(m('guard'), 'guard')
+        self.assertEqual(m({'type': 'user'}), None)
+
+    def test_same_results_as_tree(self):
+        args = (
+            0,                  'zero',
+            int,                lambda x: x,
+            [_, [_, 2]],        lambda a, b: (a, b),
+            {'k': [HEAD]},      lambda h: h,
+            str,                'str',
+        )
+        tree, native = Matcher(*args, default=None), Matcher(*args, default=None, backend='native')
+        for value in [0, 5, False, [1, [3, 2]], [1, (3, 2)], [1, [3, 3]], {'k': [9]}, {'k': 9}, 'a', None]:
+            self.assertEqual(tree(value), native(value))
+
+    def test_unsupported_options(self):
+        with self.assertRaises(MatchError):
+            compile(1, 'one', backend='native', adaptive=True)
+        with self.assertRaises(MatchError):
+            compile(1, 'one', backend='native', profile=True)
+        with self.assertRaises(MatchError):
+            compile(1, 'one', backend='bytecode')
+
+
+class SourceBackendTests(unittest.TestCase):
+
+    def test_source(self):
+        m = compile(
+            ('add', int, int),  lambda a, b: a + b,
+            {'user': {'name': str}},  lambda name: name,
+            _,                  'other',
+            backend='source'
+        )
+        self.assertIn("type(value) is list or type(value) is tuple", m.source)
+        self.assertIn("'name' in", m.source)
+        self.assertEqual(m(('add', 1, 2)), 3)
+        self.assertEqual(m({'user': {'name': 'bob'}}), 'bob')
+        self.assertEqual(m({'user': {}}), 'other')
+
+    def test_captures_keep_their_order(self):
+        m = compile(
+            [_, [int, TAIL], re.compile('(.)-(.)'), int],      lambda *args: args,
+            [HEAD, TAIL],                                      lambda head, tail: (head, tail),
+            backend='source'
+        )
+        self.assertEqual(m([0, [1, 2], 'a-b', 3]), (0, 1, [2], 'a', 'b', 3))
+        self.assertEqual(m([0, iter([1, 2]), 'a-b', 3]), (0, 1, [2], 'a', 'b', 3))
+        self.assertEqual(m((1, 2)), (1, [2]))
+        self.assertEqual(m('xyz'), ('x', ['y', 'z']))
+
+    def test_tail_modes(self):
+        self.assertEqual(list(compile([1, TAIL], list, backend='source', tail='iter')([1, 2, 3])), [2, 3])
+        self.assertEqual(list(compile([1, TAIL], list, backend='source', tail='view')((1, 2, 3))), [2, 3])
+
+    def test_literals_keep_their_type(self):
+        m = compile(1, 'int', 1.0, 'float', True, 'bool', 'a', 'str', default=None, backend='source')
+        self.assertEqual([m(v) for v in [1, 1.0, True, 'a', 0]], ['int', 'float', 'bool', 'str', None])
+
+    def test_tracebacks_show_generated_source(self):
+        def fail(x):
+            raise ValueError(x)
+
+        m = compile((1, fail), True, backend='source')
+        try:
+            m((1, 2))
+        except ValueError as e:
+            frames = traceback.extract_tb(e.__traceback__)
+        self.assertTrue(any(frame.filename.startswith('<pampy source') and frame.line for frame in frames))
+
+    def test_generated_source_is_forgotten_with_the_matcher(self):
+        m = compile((1, _), True, backend='source')
+        filename = m._lookup.__code__.co_filename
+        self.assertIn(filename, linecache.cache)
+        del m
+        gc.collect()
+        self.assertNotIn(filename, linecache.cache)
@@ -0,0 +1,91 @@
+import unittest
+import re
+
+from pampy import compile, match_many, _, HEAD, TAIL, MatchError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class ColumnarTests(unittest.TestCase):
+
+    def assertSameAsPython(self, m, values, **kwargs):
+        expected = list(m.map(values, **kwargs))
+        self.assertEqual(list(m.map(values, engine='numpy', **kwargs)), expected)
+        return expected
+
+    def test_tuples(self):
+        m = compile(
+            ('buy', int, float),    lambda qty, price: ('buy', qty * price),
+            ('sell', 0, _),         lambda price: 'nothing to sell',
+            ('sell', int, float),   lambda qty, price: ('sell', qty * price),
+            (str, None, _),         lambda action, x: action + ' without qty',
+            default='invalid'
+        )
+        rows = [('buy', 2, 1.5), ('sell', 0, 3.0), ('sell', 3, 2.0), ('hold', None, 1),
+                ('buy', 2.0, 1.5), ('buy', True, 1.5), ('sell', 1, 2)]
+        self.assertEqual(self.assertSameAsPython(m, rows), [
+            ('buy', 3.0), 'nothing to sell', ('sell', 6.0), 'hold without qty', 'invalid', ('buy', 1.5), 'invalid'])
+
+    def test_dicts(self):
+        m = compile(
+            {'type': 'dog', 'name': _},     lambda name: 'dog ' + name,
+            {'type': str, 'name': str},     lambda t, name: t + ' ' + name,
+            {'name': _},                    lambda name: 'unknown ' + name,
+            {_: 'cat'},                     lambda key: 'cat as ' + key,
+            _,                              'other'
+        )
+        rows = [{'type': 'dog', 'name': 'rex'}, {'type': 'cat', 'name': 'tom'}, {'name': 'tom'},
+                {'kind': 'cat'}, {'type': 1, 'name': 'x'}, {}]
+        self.assertEqual(self.assertSameAsPython(m, rows), [
+            'dog rex', 'cat tom', 'unknown tom', 'cat as kind', 'unknown x', 'other'])
+
+    def test_rows_with_another_shape_are_matched_one_by_one(self):
+        m = compile((int, int), lambda a, b: a + b, [1, TAIL], lambda t: t, int, 'int', _, 'other')
+        rows = [(1, 2), (2, 2, 3), [1, 2, 3], 5, (3, 4), 'x', {'a': 1}]
+        self.assertEqual(self.assertSameAsPython(m, rows), [3, 'other', [2, 3], 'int', 7, 'other', 'other'])
+
+    def test_callables_and_regexes_run_only_on_unassigned_rows(self):
+        tried = []
+
+        def positive(x):
+            tried.append(x)
+            return x > 0
+
+        m = compile(
+            (0, _),                       lambda x: 'zero',
+            (positive, re.compile('(a+)')), lambda x, a: 'positive ' + a,
+            (HEAD, str),                  lambda h, s: s,
+            default=None
+        )
+        rows = [(0, 'a'), (1, 'aa'), (-1, 'b'), (0, 'c'), (2, 'x')]
+        self.assertEqual(list(m.map(rows, engine='numpy')), ['zero', 'positive aa', 'b', 'zero', 'x'])
+        self.assertEqual(tried, [1, -1, 2])
+
+    def test_index_and_default(self):
+        m = compile((str, int), 'pair', (str, _), 'anything')
+        rows = [('a', 1), ('a', 'b'), ('a', 1.0, 2)]
+        self.assertEqual(self.assertSameAsPython(m, rows, index=True, default=-1), [0, 1, -1])
+        with self.assertRaises(MatchError):
+            list(m.map(rows, engine='numpy'))
+
+    def test_tail_modes(self):
+        for tail in ('list', 'iter', 'view'):
+            m = compile([1, TAIL], lambda t: list(t), [_, _, _], lambda a, b, c: c, tail=tail)
+            self.assertSameAsPython(m, [[1, 2, 3], [2, 3, 4]])
+
+    def test_match_many(self):
+        rows = [(1, 'a'), (2, 'b'), (3, 'c')]
+        results = match_many(rows, (1, _), lambda s: s, (int, 'b'), 'b', _, 'other', engine='numpy')
+        self.assertEqual(list(results), ['a', 'b', 'other'])
+        self.assertEqual(list(match_many([], _, None, engine='numpy')), [])
+
+
+class EngineTests(unittest.TestCase):
+
+    def test_unknown_engine(self):
+        with self.assertRaises(MatchError):
+            compile(_, None).map([1], engine='pandas')
@@ -1,7 +1,12 @@
 import unittest
 import sys
 
-from pampy import match, _
+from pampy import match, _, Obj, MatchError
+
+try:
+    import attr
+except ImportError:
+    attr = None
 
 
 class PampyDataClassesTests(unittest.TestCase):
@@ -57,3 +62,132 @@ class PampyDataClassesTests(unittest.TestCase):
         self.assertEqual(what_is(Cat("cat", 1)), 'a cat')
         self.assertEqual(what_is(Dog("", 0)), 'good boy')
         self.assertEqual(what_is(Dog("", 1)), 'doggy!')
+
+    def test_ignored_fields(self):
+        try:
+            from dataclasses import dataclass, field
+        except ImportError:
+            return
+
+        @dataclass
+        class Request:
+            path: str
+            attempts: int = field(default=0, compare=False)
+
+        request = Request('/index', attempts=3)
+        request.started = 12.5
+
+        self.assertEqual(match(request, Request('/index'), 'index', _, 'other'), 'index')
+        self.assertEqual(match(request, Request(_), lambda path: path), '/index')
+
+    def test_slotted_dataclasses(self):
+        try:
+            from dataclasses import dataclass
+        except ImportError:
+            return
+
+        @dataclass(frozen=True)
+        class Point:
+            __slots__ = ('x', 'y')
+            x: int
+            y: int
+
+        def f(x):
+            return match(x,
+                         Point(0, 0), 'origin',
+                         Point(_, 0), lambda x: 'x=%d' % x,
+                         Point(_, _), lambda x, y: 'x=%d y=%d' % (x, y),
+                         )
+
+        self.assertEqual(f(Point(0, 0)), 'origin')
+        self.assertEqual(f(Point(3, 0)), 'x=3')
+        self.assertEqual(f(Point(3, 4)), 'x=3 y=4')
+
+    def test_slots(self):
+        class Shape:
+            __slots__ = ('name',)
+
+        class Circle(Shape):
+            __slots__ = ('radius', '__id')
+
+            def __init__(self, name=None, radius=None):
+                if name is not None:
+                    self.name = name
+                if radius is not None:
+                    self.radius = radius
+
+        def what_is(x):
+            return match(x,
+                         Circle('unit', 1), 'unit circle',
+                         Circle(radius=_), lambda radius: 'circle of radius %d' % radius,
+                         Circle(), 'circle without radius',
+                         _, 'something else'
+                         )
+
+        self.assertEqual(what_is(Circle('unit', 1)), 'unit circle')
+        self.assertEqual(what_is(Circle('big', 10)), 'circle of radius 10')
+        self.assertEqual(what_is(Circle('dot')), 'circle without radius')
+        self.assertEqual(what_is(Shape()), 'something else')
+
+    def test_obj(self):
+        class User:
+            def __init__(self, name, admin=False, groups=()):
+                self.name = name
+                self.admin = admin
+                self.groups = list(groups)
+
+        class Guest(User):
+            pass
+
+        def what_is(x):
+            return match(x,
+                         Obj(Guest),                            'guest',
+                         Obj(User, name=_, admin=True),         lambda name: 'admin ' + name,
+                         Obj(User, groups=['staff', _]),        lambda group: 'staff of ' + group,
+                         Obj(User, name='root'),                'root',
+                         _,                                     'something else'
+                         )
+
+        self.assertEqual(what_is(Guest('anonymous', admin=True)), 'guest')
+        self.assertEqual(what_is(User('alice', admin=True)), 'admin alice')
+        self.assertEqual(what_is(User('bob', groups=['staff', 'sales'])), 'staff of sales')
+        self.assertEqual(what_is(User('root')), 'root')
+        self.assertEqual(what_is(User('carol')), 'something else')
+        self.assertEqual(what_is({'name': 'root'}), 'something else')
+
+    def test_obj_missing_attributes(self):
+        class Row:
+            def __init__(self, **columns):
+                self.__dict__.update(columns)
+
+        def what_is(x):
+            return match(x,
+                         Obj(Row, id=int, deleted=True),    'deleted',
+                         Obj(Row, id=_),                    lambda id: id,
+                         _,                                 'no id'
+                         )
+
+        self.assertEqual(what_is(Row(id=1, deleted=True)), 'deleted')
+        self.assertEqual(what_is(Row(id=2)), 2)
+        self.assertEqual(what_is(Row(name='x')), 'no id')
+
+    def test_obj_needs_a_class(self):
+        with self.assertRaises(MatchError):
+            Obj('User', name=_)
+        self.assertEqual(repr(Obj(int, real=_, imag=0)), 'Obj(int, real=_, imag=0)')
+
+    @unittest.skipIf(attr is None, 'attrs is not installed')
+    def test_attrs(self):
+        @attr.s
+        class Cat:
+            name = attr.ib()
+            lives = attr.ib(default=9, eq=False)
+
+        def what_is(x):
+            return match(x,
+                         Cat('tom'), 'tom',
+                         Cat(_), lambda name: name,
+                         )
+
+        self.assertEqual(what_is(Cat('tom', lives=1)), 'tom')
+        self.assertEqual(what_is(Cat('felix')), 'felix')
@@ -1,4 +1,5 @@
 import unittest
+from enum import Enum
 
 from pampy import match_dict, _, match
 
@@ -56,3 +57,23 @@ class IterableTests(unittest.TestCase):
         # I want al the names, but data is inconsistent!
         names = [match(row, {"type": _, _: str}, lambda type, name_field, name: name) for row in data]
         self.assertEqual(names, ['fuffy', 'puffy', 'buffy'])
+
+    def test_string_keys_are_consumed_once(self):
+        self.assertEqual(match_dict({_: 1, 'a': 1}, {'a': 1, 'b': 1}), (False, []))
+        self.assertEqual(match_dict({'a': 1, _: 1}, {'a': 1, 'b': 1}), (True, ['b']))
+
+    def test_string_keys_keep_strict_types(self):
+        self.assertEqual(match_dict({'a': 1}, {'a': True}), (False, []))
+        self.assertEqual(match_dict({1: _}, {True: 'x'}), (False, []))
+
+    def test_string_keys_find_str_subclass_keys(self):
+        class Color(str, Enum):
+            RED = 'red'
+
+        self.assertEqual(match({Color.RED: 1}, {'red': _}, lambda x: x, _, 'other'), 1)
+        self.assertEqual(match(Color.RED, 'red', 'red', _, 'other'), 'other')
+
+    def test_wide_dict(self):
+        value = {'key%d' % i: i for i in range(1000)}
+        self.assertEqual(match_dict({'key999': _, 'key0': int, 'key1': 1}, value), (True, [999, 0]))
+        self.assertEqual(match_dict({'key999': _, 'missing': _}, value), (False, []))
@@ -0,0 +1,172 @@
+import unittest
+from threading import Thread
+
+import pampy.dispatching
+from pampy import dispatch, Obj, HEAD, TAIL, _, MatchError
+
+
+class Square:
+    def __init__(self, side):
+        self.side = side
+
+
+class Circle:
+    def __init__(self, radius):
+        self.radius = radius
+
+
+class DispatchTests(unittest.TestCase):
+
+    def test_dispatch(self):
+        @dispatch
+        def area(shape):
+            return 'unknown'
+
+        @area.register(Obj(Square, side=_))
+        def square_area(side):
+            return side * side
+
+        @area.register(Obj(Circle, radius=_))
+        def circle_area(radius):
+            return 3 * radius * radius
+
+        self.assertEqual(area(Square(2)), 4)
+        self.assertEqual(area(Circle(1)), 3)
+        self.assertEqual(area('square'), 'unknown')
+        self.assertEqual(area.__name__, 'area')
+        self.assertEqual(area.functions, [square_area, circle_area])
+
+    def test_implementations_are_tried_in_order(self):
+        @dispatch
+        def fib(n):
+            raise ValueError(n)
+
+        @fib.register(0)
+        def fib_0(n):
+            return 0
+
+        @fib.register(1)
+        def fib_1(n):
+            return 1
+
+        @fib.register(int)
+        def fib_n(n):
+            return fib(n - 1) + fib(n - 2)
+
+        self.assertEqual([fib(n) for n in range(8)], [0, 1, 1, 2, 3, 5, 8, 13])
+        with self.assertRaises(ValueError):
+            fib(1.0)
+
+    def test_arguments(self):
+        @dispatch
+        def describe(*args, **kwargs):
+            return 'other'
+
+        @describe.register(str, int)
+        def describe_pair(name, count, unit=''):
+            return '%d %s%s' % (count, name, unit)
+
+        @describe.register(str, TAIL)
+        def describe_words(first, rest):
+            return '%s and %d more' % (first, len(rest))
+
+        @describe.register(HEAD, 'x')
+        def describe_x(head):
+            return 'x after %r' % (head,)
+
+        self.assertEqual(describe('apple', 3), '3 apple')
+        self.assertEqual(describe('apple', 3, unit='s'), '3 apples')
+        self.assertEqual(describe('apple', 'pear', 'plum'), 'apple and 2 more')
+        self.assertEqual(describe(1, 'x'), 'x after 1')
+        self.assertEqual(describe(1, 'y'), 'other')
+        self.assertEqual(describe(), 'other')
+
+    def test_registration_updates_the_table(self):
+        @dispatch
+        def kind(x):
+            return 'other'
+
+        self.assertEqual([kind(1), kind('a'), kind(True)], ['other', 'other', 'other'])
+
+        @kind.register(int)
+        def kind_int(x):
+            return 'int'
+
+        self.assertEqual([kind(1), kind('a'), kind(True)], ['int', 'other', 'int'])
+        self.assertEqual(len(kind._table[(str,)]), 0)
+        self.assertEqual(len(kind._table[(bool,)]), 1)
+
+    def test_table_is_bounded(self):
+        @dispatch
+        def identity(x):
+            return x
+
+        for i in range(pampy.dispatching.MAX_CACHED_SIGNATURES * 2):
+            value = type('Type%d' % i, (), {})()
+            self.assertIs(identity(value), value)
+        self.assertLessEqual(len(identity._table), pampy.dispatching.MAX_CACHED_SIGNATURES)
+
+    def test_registration_while_dispatching(self):
+        @dispatch
+        def size(x):
+            return None
+
+        def call():
+            for _i in range(1000):
+                size([1, 2])
+
+        threads = [Thread(target=call) for _i in range(4)]
+        for thread in threads:
+            thread.start()
+
+        @size.register([HEAD, TAIL])
+        def list_size(head, tail):
+            return 1 + len(tail)
+
+        for thread in threads:
+            thread.join()
+        self.assertEqual(size([1, 2]), 2)
+
+    def test_methods(self):
+        class Shapes:
+            unit = 10
+
+            @dispatch
+            def area(self, shape):
+                return None
+
+            @area.register(HEAD, Obj(Square, side=_))
+            def square_area(self, side):
+                return side * side * self.unit
+
+        shapes = Shapes()
+        self.assertEqual(shapes.area(Square(2)), 40)
+        self.assertIsNone(shapes.area(Circle(1)))
+        self.assertEqual(Shapes.area(shapes, Square(1)), 10)
+
+    def test_concurrent_registrations(self):
+        @dispatch
+        def which(x):
+            return None
+
+        def register(n):
+            which.register(n)(lambda x, n=n: n)
+
+        threads = [Thread(target=register, args=(n,)) for n in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([case.index for case in which._cases], list(range(50)))
+        self.assertEqual([which(n) for n in range(50)], list(range(50)))
+
+    def test_only_functions_are_dispatched(self):
+        with self.assertRaises(MatchError):
+            dispatch(3)
+
+        @dispatch
+        def f(x):
+            return x
+
+        with self.assertRaises(MatchError):
+            f.register(int)('not a function')
@@ -1,7 +1,8 @@
 import unittest
-from collections import Iterable
+from collections.abc import Iterable
 
 from pampy import HEAD, TAIL, _, MatchError
+from pampy.codegen import native_available
 import pampy
 
 
@@ -90,3 +91,107 @@ class IterableTests(unittest.TestCase):
             getattr(self, method)()
 
         self.mi = pampy.match_iterable
+
+    def test_match_iterable_generators(self):
+        def numbers():
+            yield 1
+            yield 2
+            yield 3
+
+        self.assertEqual(pampy.match_iterable([1, TAIL], numbers()), (True, [[2, 3]]))
+        self.assertEqual(pampy.match_iterable([1, _, _], numbers()), (True, [2, 3]))
+        self.assertEqual(pampy.match_iterable([1, _], numbers()), (False, []))
+
+    def test_match_iterable_stops_at_first_mismatch(self):
+        consumed = []
+
+        def numbers():
+            for i in range(1000000):
+                consumed.append(i)
+                yield i
+
+        self.assertEqual(pampy.match_iterable([0, 2, TAIL], numbers()), (False, []))
+        self.assertEqual(consumed, [0, 1])
+
+    def test_generator_matched_by_several_patterns(self):
+        def numbers():
+            yield 1
+            yield 2
+            yield 3
+
+        patterns = ([9, _, _], 'first', [2, 3], 'second', [1, TAIL], lambda rest: list(rest), _, 'other')
+        self.assertEqual(pampy.match(numbers(), *patterns, tail='iter'), [2, 3])
+        self.assertEqual(pampy.match(numbers(), *patterns[:4], _, list), [1, 2, 3])
+        matchers = [pampy.compile(*patterns, tail='iter', backend='source'),
+                    pampy.compile(*patterns, tail='iter', adaptive=True)]
+        if native_available():
+            matchers.append(pampy.compile(*patterns, tail='iter', backend='native'))
+        for matcher in [pampy.compile(*patterns, tail='iter')] + matchers:
+            self.assertEqual(matcher(numbers()), [2, 3])
+            self.assertEqual(matcher(iter([2, 3])), 'second')
+            self.assertEqual(matcher(iter([2, 4])), 'other')
+
+    def test_match_iterable_lazy_TAIL(self):
+        values = iter(range(10 ** 9))
+        matched, (head, tail) = pampy.match_iterable([HEAD, TAIL], values, tail='iter')
+        self.assertTrue(matched)
+        self.assertEqual(head, 0)
+        self.assertEqual(next(tail), 1)
+
+        self.assertEqual(pampy.match([1, 2, 3], [1, TAIL], list, tail='iter'), [2, 3])
+        self.assertEqual(pampy.compile([1, TAIL], list, tail='iter')([1, 2, 3]), [2, 3])
+        self.assertEqual(pampy.compile([1, TAIL], list, tail='iter')(iter([1, 2, 3])), [2, 3])
+
+    def test_match_iterable_unknown_tail_mode(self):
+        with self.assertRaises(MatchError):
+            pampy.match([1], [1], True, tail='tuple')
+
+    def test_match_iterable_TAIL_view(self):
+        values = [1, 2, 3, 4]
+        matched, (head, tail) = pampy.match_iterable([HEAD, TAIL], values, tail='view')
+        self.assertEqual(tail, [2, 3, 4])
+        self.assertEqual(len(tail), 3)
+        self.assertEqual(tail[0], 2)
+        self.assertEqual(tail[-1], 4)
+        self.assertEqual(tail[1:], [3, 4])
+        self.assertEqual(tail[::-1], [4, 3, 2])
+        self.assertEqual(tail[1::-1], [3, 2])
+        self.assertEqual(tail[:0:-1], [4, 3])
+        self.assertEqual(pampy.helpers.SequenceView([1, 2, 3])[::-1], [3, 2, 1])
+        self.assertEqual(pampy.helpers.SequenceView((1, 2, 3))[2::-1], [3, 2, 1])
+        self.assertEqual(pampy.match([1, 2, 3], [TAIL], lambda rest: rest[::-1], tail='view'), [3, 2, 1])
+        self.assertNotIsInstance(tail, list)
+
+        values[3] = 5
+        self.assertEqual(list(tail), [2, 3, 5])
+
+    def test_match_iterable_TAIL_view_of_views(self):
+        def mysum(values):
+            total = 0
+            while True:
+                found = pampy.match(values,
+                                    [HEAD, TAIL], lambda head, tail: (head, tail),
+                                    [], None, tail='view')
+                if found is None:
+                    return total
+                head, values = found
+                total += head
+
+        self.assertEqual(mysum(list(range(1000))), sum(range(1000)))
+        self.assertEqual(mysum(tuple(range(1000))), sum(range(1000)))
+
+    def test_match_iterable_TAIL_view_bytes_like(self):
+        from array import array
+
+        for values in (b'abc', bytearray(b'abc'), memoryview(b'abc')):
+            matched, (tail,) = pampy.match_iterable([97, TAIL], values, tail='view')
+            self.assertIsInstance(tail, memoryview)
+            self.assertEqual(tail, b'bc')
+
+        matched, (tail,) = pampy.match_iterable([1.5, TAIL], array('d', [1.5, 2.5]), tail='view')
+        self.assertEqual(tail.tolist(), [2.5])
+
+    def test_match_iterable_TAIL_view_fallback(self):
+        self.assertEqual(pampy.match_iterable(['a', TAIL], 'abc', tail='view'), (True, [['b', 'c']]))
+        self.assertEqual(pampy.compile(['a', TAIL], list, tail='view')('abc'), ['b', 'c'])
+        self.assertEqual(pampy.compile([1, TAIL], tuple, tail='view')((1, 2, 3)), (2, 3))
@@ -0,0 +1,611 @@
+import pickle
+import re
+import unittest
+from unittest import mock
+from threading import Thread
+from collections import namedtuple
+from dataclasses import dataclass, field
+from enum import Enum
+
+import pampy.matcher
+import pampy.parallel
+from pampy import compile, Matcher, match, match_many, HEAD, TAIL, _, MatchError, pure, Obj
+from pampy.helpers import pattern_kind
+from pampy.matcher import Case, disjoint_groups
+from tests import test_basic, test_dict, test_dataclass, test_elaborate
+
+
+def compiled_match(var, *args, **kwargs):
+    return compile(*args, **kwargs)(var)
+
+
+def with_match(test_case, module, match_function, prefix):
+    """
+    Subclass `test_case` so that its tests run with `module.match` replaced by `match_function`.
+    """
+    class PatchedTests(test_case):
+        def setUp(self):
+            super().setUp()
+            patcher = mock.patch.object(module, 'match', match_function)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    PatchedTests.__name__ = PatchedTests.__qualname__ = prefix + test_case.__name__
+    return PatchedTests
+
+
+CompiledBasicTests = with_match(test_basic.PampyBasicTests, test_basic, compiled_match, 'Compiled')
+CompiledDictTests = with_match(test_dict.IterableTests, test_dict, compiled_match, 'Compiled')
+CompiledDataClassTests = with_match(test_dataclass.PampyDataClassesTests, test_dataclass, compiled_match, 'Compiled')
+CompiledElaborateTests = with_match(test_elaborate.PampyElaborateTests, test_elaborate, compiled_match, 'Compiled')
+
+
+class MatcherTests(unittest.TestCase):
+
+    def test_compile_returns_matcher(self):
+        m = compile(1, 'one', _, 'other')
+        self.assertIsInstance(m, Matcher)
+        self.assertEqual(m(1), 'one')
+        self.assertEqual(m(2), 'other')
+
+    def test_matcher_is_reusable(self):
+        m = Matcher(
+            int,            lambda x: x * 2,
+            [1, _],         lambda x: x,
+            {'a': _},       lambda a: a,
+            _,              'else'
+        )
+        for _i in range(3):
+            self.assertEqual(m(21), 42)
+            self.assertEqual(m([1, 'x']), 'x')
+            self.assertEqual(m({'a': 3, 'b': 4}), 3)
+            self.assertEqual(m('?'), 'else')
+
+    def test_same_results_as_match(self):
+        args = (
+            3,              "the integer 3",
+            float,          "any float number",
+            "ciao",         "the string ciao",
+            (int, int),     lambda a, b: a + b,
+            [1, TAIL],      lambda t: t,
+            [HEAD, 2],      lambda h: h,
+            {'x': [_, _]},  lambda a, b: (a, b),
+            None,           "None",
+        )
+        values = [3, 3.0, True, "ciao", (1, 2), [1, 2, 3], (1,), [5, 2], {'x': (1, 2)}, None, 'nothing']
+        m = compile(*args, default='default')
+        for value in values:
+            self.assertEqual(m(value), match(value, *args, default='default'))
+
+    def test_iterables_are_matched_like_match(self):
+        m = compile([1, 2, TAIL], lambda t: t, ('a', 'b'), 'ab', _, None)
+        self.assertEqual(m(iter([1, 2, 3, 4])), [3, 4])
+        self.assertEqual(m((1, 2, 3)), [3])
+        self.assertEqual(m('ab'), 'ab')
+
+    def test_strictness_and_default(self):
+        with self.assertRaises(MatchError):
+            compile(2, True)(3)
+        self.assertFalse(compile(2, True, strict=False)(3))
+        self.assertEqual(compile(2, True, default=6)(3), 6)
+
+    def test_every_guard_must_have_an_action(self):
+        with self.assertRaises(MatchError):
+            compile(1, 'one', 2)
+
+    def test_misplaced_head_and_tail_fail_when_compiling(self):
+        with self.assertRaises(MatchError):
+            compile([1, HEAD], True)
+        with self.assertRaises(MatchError):
+            compile([TAIL, 2], True)
+        with self.assertRaises(MatchError):
+            compile(HEAD, True)
+
+    def test_captures_are_rolled_back(self):
+        m = compile({_: 1, 'b': _}, lambda k, b: (k, b))
+        self.assertEqual(m({'a': 2, 'c': 1, 'b': 3}), ('c', 3))
+
+    def test_shared_between_threads(self):
+        m = compile((int, _), lambda a, b: a + b, _, None)
+        results = []
+
+        def worker(n):
+            results.append(all(m((n, i)) == n + i for i in range(1000)))
+
+        threads = [Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True] * 8)
+
+
+class DecisionTreeTests(unittest.TestCase):
+
+    def test_first_match_wins_across_kinds(self):
+        m = compile(
+            (1, _),         lambda x: 'one %s' % x,
+            (int, 2),       lambda x: 'int two %s' % x,
+            (_, _),         lambda a, b: 'pair',
+            [1, TAIL],      lambda t: 'tail %s' % t,
+        )
+        self.assertEqual(m((1, 2)), 'one 2')
+        self.assertEqual(m((3, 2)), 'int two 3')
+        self.assertEqual(m((3, 3)), 'pair')
+        self.assertEqual(m([1, 2, 3]), 'tail [2, 3]')
+        self.assertEqual(m([1]), 'tail []')
+
+    def test_literals_keep_strict_types(self):
+        m = compile((1, _), 'int', (True, _), 'bool', (1.0, _), 'float', default='none')
+        self.assertEqual(m((1, 0)), 'int')
+        self.assertEqual(m((True, 0)), 'bool')
+        self.assertEqual(m((1.0, 0)), 'float')
+        self.assertEqual(m(([], 0)), 'none')
+
+    def test_pruned_patterns_are_not_tried(self):
+        tried = []
+
+        def spy(x):
+            tried.append(x)
+            return True
+
+        m = compile(
+            ('add', spy),       'add',
+            ('sub', spy),       'sub',
+            {'type': 'a', 'x': spy},  'a',
+            {'type': 'b', 'x': spy},  'b',
+        )
+        self.assertEqual(m(('sub', 1)), 'sub')
+        self.assertEqual(m({'type': 'b', 'x': 2}), 'b')
+        self.assertEqual(tried, [1, 2])
+
+    def test_dict_keys(self):
+        m = compile(
+            {'type': 'dog', 'name': _},     lambda name: 'dog ' + name,
+            {'type': _, 'name': _},         lambda t, name: t + ' ' + name,
+            {'name': _},                    lambda name: 'unknown ' + name,
+            {_: 'cat'},                     lambda key: 'cat as ' + key,
+        )
+        self.assertEqual(m({'type': 'dog', 'name': 'rex'}), 'dog rex')
+        self.assertEqual(m({'type': 'cat', 'name': 'tom'}), 'cat tom')
+        self.assertEqual(m({'name': 'tom'}), 'unknown tom')
+        self.assertEqual(m({'kind': 'cat'}), 'cat as kind')
+
+    def test_unhashable_values_at_indexed_positions(self):
+        m = compile(('a', _), 'a', ('b', _), 'b', ([1], _), 'list', (_, _), 'other')
+        self.assertEqual(m(([1], 0)), 'list')
+        self.assertEqual(m(({}, 0)), 'other')
+
+    def test_objects_lying_about_their_class(self):
+        class Pet:
+            pass
+
+        fake = mock.Mock(spec=Pet)
+        m = compile(Pet, 'pet', _, 'other')
+        self.assertEqual(m(fake), 'pet')
+        self.assertEqual(m(Pet()), 'pet')
+        self.assertEqual(m(3), 'other')
+
+
+class LiteralTableTests(unittest.TestCase):
+
+    def test_large_literal_table(self):
+        args = []
+        for code in range(100, 600):
+            args += [code, 'status %d' % code]
+        m = compile(*args, str, lambda s: 'text ' + s, _, 'unknown')
+        self.assertEqual(m(404), 'status 404')
+        self.assertEqual(m(599), 'status 599')
+        self.assertEqual(m(600), 'unknown')
+        self.assertEqual(m('404'), 'text 404')
+        self.assertEqual(m(404.0), 'unknown')
+
+    def test_literals_keep_strict_types(self):
+        m = compile(1, 'int one', 0, 'int zero', True, 'true', 1.0, 'float one', _, 'other')
+        self.assertEqual(m(1), 'int one')
+        self.assertEqual(m(True), 'true')
+        self.assertEqual(m(False), 'other')
+        self.assertEqual(m(1.0), 'float one')
+        self.assertEqual(m(0.0), 'other')
+
+    def test_order_is_kept_between_literals_and_other_patterns(self):
+        m = compile(1, 'one', lambda x: x < 10, 'small', 2, 'two', 20, 'twenty', _, 'other')
+        self.assertEqual(m(1), 'one')
+        self.assertEqual(m(2), 'small')
+        self.assertEqual(m(20), 'twenty')
+        self.assertEqual(m(30), 'other')
+
+    def test_enums(self):
+        class Color(Enum):
+            RED = 1
+            GREEN = 2
+            BLUE = 3
+
+        m = compile(Color.BLUE, 'blue', Color.RED, 'red', 1, 'one', _, 'else')
+        self.assertEqual(m(Color.RED), 'red')
+        self.assertEqual(m(Color.GREEN), 'else')
+        self.assertEqual(m(1), 'one')
+
+
+class RegexTests(unittest.TestCase):
+
+    def test_merged_regexes(self):
+        m = compile(
+            re.compile(r'^GET /users/(\d+)'),           lambda user: ('user', user),
+            re.compile(r'^GET /users/(\w+)'),           lambda name: ('name', name),
+            re.compile(r'^(?P<verb>POST|PUT) /(\w+)'),  lambda verb, path: (verb, path),
+            re.compile(r'\AGET /(\w+)(?:/(\d+))?'),     lambda path, id: (path, id),
+            _,                                          None
+        )
+        self.assertEqual(m('GET /users/42'), ('user', '42'))
+        self.assertEqual(m('GET /users/bob'), ('name', 'bob'))
+        self.assertEqual(m('PUT /items'), ('PUT', 'items'))
+        self.assertEqual(m('GET /items'), ('items', None))
+        self.assertEqual(m('GET /items/3'), ('items', '3'))
+        self.assertEqual(m('HEAD /items'), None)
+        self.assertEqual(m(b'GET /users/42'), None)
+        self.assertIsInstance(m._dispatch[str], pampy.matcher.RegexNode)
+
+    def test_order_is_kept_around_merged_regexes(self):
+        m = compile(
+            re.compile('^a(b)'),    lambda b: 'ab',
+            lambda s: s == 'ac',    'guard',
+            re.compile('^a(c)'),    lambda c: 'ac',
+            re.compile('^a(.)'),    lambda x: 'a.',
+            re.compile('^(.)'),     lambda x: '.',
+            re.compile('^a()'),     lambda x: 'a',
+            re.compile('^'),        'empty',
+            re.compile('b'),        'b',
+        )
+        self.assertEqual([m(s) for s in ['ab', 'ac', 'ad', 'b', '', 'xb']], ['ab', 'guard', 'a.', '.', 'empty', '.'])
+
+    def test_mergeable_regexes(self):
+        mergeable = pampy.matcher.mergeable_regex
+        self.assertTrue(mergeable(re.compile('^a')))
+        self.assertTrue(mergeable(re.compile(r'\Aa', re.MULTILINE)))
+        self.assertTrue(mergeable(re.compile(b'^a')))
+        self.assertFalse(mergeable(re.compile('a')))
+        self.assertFalse(mergeable(re.compile('^a', re.MULTILINE)))
+        self.assertFalse(mergeable(re.compile('^a|b')))
+        self.assertFalse(mergeable(re.compile(r'^(a)\1')))
+        self.assertFalse(mergeable(re.compile('(?i)^a')))
+
+
+class BatchTests(unittest.TestCase):
+
+    def test_match_many(self):
+        results = match_many([1, 'a', 2.5, [1, 2]],
+                             int,       lambda x: x + 1,
+                             str,       'str',
+                             [1, _],    lambda x: x,
+                             _,         'other')
+        self.assertEqual(list(results), [2, 'str', 'other', 2])
+
+    def test_match_many_is_lazy(self):
+        def values():
+            yield 1
+            raise AssertionError('consumed too much')
+
+        results = match_many(values(), int, 'int')
+        self.assertEqual(next(results), 'int')
+
+    def test_match_many_default(self):
+        self.assertEqual(list(match_many([1, 'a'], int, 'int', default=None)), ['int', None])
+        with self.assertRaises(MatchError):
+            list(match_many([1, 'a'], int, 'int'))
+
+    def test_map_default_overrides_matcher_default(self):
+        m = compile(int, 'int', default='nope')
+        self.assertEqual(list(m.map([1, 'a'])), ['int', 'nope'])
+        self.assertEqual(list(m.map([1, 'a'], default=None)), ['int', None])
+
+    def test_map_index(self):
+        m = compile(str, 'str', int, 'int', (int, int), 'pair')
+        self.assertEqual(list(m.map([1, (1, 2), 'a', 2.0], index=True, default=-1)), [1, 2, 0, -1])
+        self.assertEqual(list(match_many(['a'], str, lambda s: 1 / 0, index=True)), [0])
+
+
+def double(x):
+    return x * 2
+
+
+def pair(a, b):
+    return a, b
+
+
+class ParallelTests(unittest.TestCase):
+
+    def test_processes(self):
+        m = compile(int, double, str, str.upper, _, None)
+        values = [1, 'a', 2.5, 3] * 50
+        self.assertEqual(list(m.map(values, workers=2, chunksize=7)), list(m.map(values)))
+
+    def test_threads(self):
+        results = match_many(range(100), int, lambda x: x + 1, workers=3, executor='thread', chunksize=9)
+        self.assertEqual(list(results), list(range(1, 101)))
+
+    def test_unordered(self):
+        results = match_many(range(100), int, double, workers=2, chunksize=9, ordered=False)
+        self.assertEqual(sorted(results), [(i, i * 2) for i in range(100)])
+        self.assertEqual(list(compile(int, double).map([1, 2], ordered=False)), [(0, 2), (1, 4)])
+
+    def test_results_before_an_error_are_yielded(self):
+        results = match_many([1, 2, 'x', 3], int, double, workers=2, chunksize=3)
+        self.assertEqual([next(results), next(results)], [2, 4])
+        with self.assertRaises(MatchError):
+            next(results)
+
+    @unittest.skipUnless(pampy.parallel.cloudpickle, "cloudpickle is not installed")
+    def test_lambdas_are_sent_with_cloudpickle(self):
+        results = match_many([(1, 2), 'x'], (int, int), lambda a, b: a + b, _, lambda x: x, workers=2)
+        self.assertEqual(list(results), [3, 'x'])
+
+    def test_lambdas_without_cloudpickle(self):
+        with mock.patch.object(pampy.parallel, 'cloudpickle', None):
+            with self.assertRaises(MatchError):
+                match_many([1], int, lambda x: x, workers=2)
+
+    def test_markers_survive_pickling(self):
+        m = pickle.loads(pickle.dumps(compile([HEAD, TAIL], pair, _, 'other', default='none')))
+        self.assertEqual(m([1, 2]), (1, [2]))
+        self.assertEqual(m(5), 'other')
+
+    def test_wrong_arguments(self):
+        m = compile(_, None)
+        with self.assertRaises(MatchError):
+            m.map([1], workers=2, executor='cluster')
+        with self.assertRaises(MatchError):
+            m.map([1], workers=0)
+
+
+class ProfileTests(unittest.TestCase):
+
+    def test_counts(self):
+        m = compile(
+            'a',        'letter a',
+            str,        lambda s: s.upper(),
+            (int, _),   lambda a, b: a,
+            default=None, profile=True
+        )
+        for value in ['a', 'b', 'c', (1, 2), 3.0]:
+            m(value)
+        list(m.map(['a', (2, 3)]))
+
+        stats = m.profile.patterns
+        self.assertEqual([s.tried for s in stats], [4, 2, 2])
+        self.assertEqual([s.matched for s in stats], [2, 2, 2])
+        self.assertEqual(m.profile.unmatched, 1)
+        self.assertTrue(all(s.match_time > 0 for s in stats))
+        self.assertTrue(all(s.action_time > 0 for s in stats))
+
+    def test_report_and_reset(self):
+        m = compile(int, double, _, None, profile=True)
+        m(1)
+        report = m.profile.report(sort_by='tried')
+        self.assertIn("<class 'int'>", report)
+        self.assertIn('unmatched values: 0', report)
+        with self.assertRaises(MatchError):
+            m.profile.report(sort_by='name')
+        m.profile.reset()
+        self.assertEqual(m.profile.patterns[0].tried, 0)
+
+    def test_not_profiled_by_default(self):
+        m = compile(int, double)
+        self.assertIs(type(m), Matcher)
+        self.assertIsNone(m.profile)
+
+    def test_pickled_profiled_matchers_are_profiled(self):
+        m = pickle.loads(pickle.dumps(compile(int, double, profile=True)))
+        self.assertEqual(m(2), 4)
+        self.assertEqual(m.profile.patterns[0].matched, 1)
+
+
+class CacheTests(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        m = compile(1, 'one', (str, int), lambda s, i: s * i, [HEAD, TAIL], lambda h, t: t, _, 'other', cache=2)
+        self.assertEqual([m(v) for v in [1, ('a', 2), 1, ('a', 2), [1, 2]]], ['one', 'aa', 'one', 'aa', [2]])
+        self.assertEqual((m.cache.hits, m.cache.misses, m.cache.skipped), (2, 2, 1))
+        self.assertEqual(m(2.0), 'other')
+        self.assertEqual(m.cache.currsize, 2)
+        m.cache.clear()
+        self.assertEqual((m.cache.hits, m.cache.misses, m.cache.currsize), (0, 0, 0))
+
+    def test_equal_values_of_other_types_are_not_mixed_up(self):
+        m = compile(1, 'int', True, 'bool', 1.0, 'float', (1, _), 'int pair', (True, _), 'bool pair',
+                    _, lambda x: x, cache=16)
+        values = [1, True, 1.0, (1, 0), (True, 0), (1.0, 0), -0.0, 0.0]
+        self.assertEqual([m(v) for v in values], ['int', 'bool', 'float', 'int pair', 'bool pair', (1.0, 0), -0.0, 0.0])
+        self.assertEqual([m(v) for v in values], ['int', 'bool', 'float', 'int pair', 'bool pair', (1.0, 0), -0.0, 0.0])
+        self.assertEqual(str(m(-0.0)), '-0.0')
+
+    def test_actions_run_every_time(self):
+        calls = []
+        m = compile(int, calls.append, cache=8)
+        m(1)
+        m(1)
+        self.assertEqual(calls, [1, 1])
+
+        calls = []
+        m = compile(int, lambda x: calls.append(x) or x * 2, cache=8, cache_results=True)
+        self.assertEqual([m(1), m(1), m(2)], [2, 2, 4])
+        self.assertEqual(calls, [1, 2])
+
+    def test_tail_is_extracted_every_time(self):
+        m = compile((1, TAIL), lambda tail: tail, cache=8)
+        m((1, 2, 3)).append(4)
+        self.assertEqual(m((1, 2, 3)), [2, 3])
+
+    def test_least_recently_used_values_are_dropped(self):
+        m = compile(int, lambda x: x, cache=2)
+        for value in [1, 2, 1, 3, 1, 2]:
+            m(value)
+        self.assertEqual((m.cache.hits, m.cache.misses), (2, 4))
+
+    def test_pure_functions(self):
+        with self.assertRaises(MatchError):
+            compile(lambda x: x > 0, 'positive', cache=8)
+        with self.assertRaises(MatchError):
+            compile(1, 'one', profile=True, cache=8)
+        with self.assertRaises(MatchError):
+            compile(1, 'one', cache_results=True)
+        with self.assertRaises(MatchError):
+            compile(1, 'one', cache=0)
+
+        positive = pure(lambda x: x > 0)
+        m = compile([positive], 'positive', pure(callable), 'callable', _, 'other', cache=8)
+        self.assertEqual([m((1,)), m((-1,)), m((1,)), m(len)], ['positive', 'other', 'positive', 'callable'])
+
+    def test_tuple_subclasses_with_attributes_are_not_cached(self):
+        class Tagged(tuple):
+            pass
+
+        first, second = Tagged((1,)), Tagged((1,))
+        first.tag, second.tag = 'x', 'y'
+        m = compile(Tagged, lambda t: t.tag, _, 'other', cache=8)
+        self.assertEqual([m(first), m(second)], ['x', 'y'])
+        self.assertEqual(m.cache.skipped, 2)
+
+    def test_equal_values_share_their_captures(self):
+        first, second = (1, 'abc'), (1, 'ABC'.lower())
+        self.assertIsNot(first[1], second[1])
+        m = compile((1, str), lambda s: s, _, lambda x: x, cache=8)
+        self.assertIs(m(first), first[1])
+        self.assertIs(m(second), first[1])
+        self.assertIs(m(frozenset(first)), m(frozenset(second)))
+
+    def test_frozen_dataclasses_are_keyed_on_all_their_fields(self):
+        @dataclass(frozen=True)
+        class Event:
+            kind: str
+            time: float = field(compare=False)
+
+        m = compile(Event, lambda event: event.time, cache=8)
+        self.assertEqual([m(Event('a', 1.0)), m(Event('a', 2.0)), m(Event('a', 1.0))], [1.0, 2.0, 1.0])
+        self.assertEqual((m.cache.hits, m.cache.misses), (1, 2))
+
+        noted = Event('a', 1.0)
+        object.__setattr__(noted, 'note', 'late')
+        self.assertEqual(m(noted), 1.0)
+        self.assertEqual(m.cache.skipped, 1)
+
+    def test_obj_only_reads_the_fields_in_the_key(self):
+        Pair = namedtuple('Pair', ['left', 'right'])
+
+        @dataclass(frozen=True)
+        class Event:
+            kind: str
+            time: float = field(compare=False)
+
+            @property
+            def late(self):
+                return self.time > 10
+
+        class Tagged(tuple):
+            __slots__ = ()
+            tag = 'x'
+
+        m = compile(Obj(Event, time=1.0), 'one', Obj(Pair, left=_), lambda left: left, Obj(Tagged), 'tagged',
+                    _, 'other', cache=8)
+        self.assertEqual([m(Event('a', 1.0)), m(Event('a', 2.0)), m(Pair(3, 4)), m(Tagged())],
+                         ['one', 'other', 3, 'tagged'])
+        for pattern in (Obj(Event, late=True), Obj(Tagged, tag=_), Obj(int, real=_)):
+            with self.assertRaises(MatchError):
+                compile(pattern, 'late', cache=8)
+
+    def test_unchangeable_values(self):
+        @dataclass(frozen=True)
+        class Point:
+            x: int
+            y: int
+
+        @dataclass(frozen=True)
+        class Size:
+            __slots__ = ('width', 'height')
+            width: int
+            height: int
+
+        class Color(Enum):
+            RED = 1
+
+        m = compile(Point(0, _), lambda y: y, Size(_, 1), lambda w: w, frozenset, 'set', Color.RED, 'red',
+                    _, 'other', cache=8)
+        self.assertEqual([m(v) for v in [Point(0, 1), Point(0, 1), Size(2, 1), Size(2, 1), frozenset([1]), Color.RED]],
+                         [1, 1, 2, 2, 'set', 'red'])
+        self.assertEqual((m.cache.hits, m.cache.misses, m.cache.skipped), (2, 4, 0))
+
+    def test_map(self):
+        m = compile(int, lambda x: -x, _, None, cache=8)
+        self.assertEqual(list(m.map([1, 1, [1]])), [-1, -1, None])
+        self.assertEqual(list(m.map([1, 'a'], index=True)), [0, 1])
+        self.assertEqual(list(match_many([2, 2], int, lambda x: x * 10, cache=1)), [20, 20])
+
+    def test_pickled_cached_matchers_are_cached(self):
+        m = pickle.loads(pickle.dumps(compile(int, double, cache=8, cache_results=True)))
+        self.assertEqual([m(2), m(2)], [4, 4])
+        self.assertEqual((m.cache.hits, m.cache.maxsize), (1, 8))
+
+
+class AdaptiveTests(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in [('REORDER_INTERVAL', 8), ('SAMPLE_INTERVAL', 1)]:
+            patcher = mock.patch.object(pampy.matcher, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def groups(self, *patterns, sequences=False):
+        cases = [Case(i, patt, pattern_kind(patt), None) for i, patt in enumerate(patterns)]
+        return [[case.index for case in group] for group in disjoint_groups(cases, sequences)]
+
+    def test_disjoint_groups(self):
+        self.assertEqual(self.groups(1, 2, 'a', None, 3), [[0, 1, 2, 3, 4]])
+        self.assertEqual(self.groups(1, int, 2), [[0], [1], [2]])
+        self.assertEqual(self.groups('a', int, 2.5, float), [[0, 1, 2], [3]])
+        self.assertEqual(self.groups({'k': 1}, {'k': 2, 'x': int}, {'x': 3}), [[0, 1], [2]])
+        self.assertEqual(self.groups({'k': {'n': 1}}, {'k': {'n': 2}}), [[0, 1]])
+        self.assertEqual(self.groups((1, _), (2, _), (_, 3)), [[0], [1], [2]])
+        self.assertEqual(self.groups((1, _), (2, _), (_, 3), sequences=True), [[0, 1], [2]])
+        self.assertEqual(self.groups((1, TAIL), (2, 3), (1, 2, 3), sequences=True), [[0, 1], [2]])
+        self.assertEqual(self.groups([[1]], [[2]], sequences=True), [[0], [1]])
+        self.assertEqual(self.groups(1, lambda x: True, 2), [[0], [1], [2]])
+
+    def test_hot_pattern_is_tried_first(self):
+        m = compile(
+            {'event': {'kind': 'open'}},    'open',
+            {'event': {'kind': 'close'}},   'close',
+            {'event': {'kind': 'click'}},   'click',
+            adaptive=True, profile=True
+        )
+        for _i in range(20):
+            self.assertEqual(m({'event': {'kind': 'click'}}), 'click')
+        m.profile.reset()
+        for _i in range(10):
+            self.assertEqual(m({'event': {'kind': 'click'}}), 'click')
+        self.assertEqual([s.tried for s in m.profile.patterns], [0, 0, 10])
+        self.assertEqual(m({'event': {'kind': 'open'}}), 'open')
+
+    def test_overlapping_patterns_keep_their_order(self):
+        m = compile(
+            {'k': 1},       'one',
+            {'k': int},     'int',
+            {'k': 2},       'two',
+            {'k': 'a'},     'a',
+            adaptive=True
+        )
+        for _i in range(50):
+            self.assertEqual(m({'k': 2}), 'int')
+            self.assertEqual(m({'k': 'a'}), 'a')
+        self.assertEqual(m({'k': 1}), 'one')
+
+    def test_iterators_are_not_reordered(self):
+        m = compile([1, 2], 'short', [1, 2, 3], 'long', adaptive=True, default=None)
+        for _i in range(50):
+            self.assertEqual(m(iter([1, 2, 3])), 'long')
+            self.assertEqual(m(iter([1, 2])), 'short')
+            self.assertEqual(m([1, 2, 3]), 'long')
+
+    def test_pickled_adaptive_matchers_are_adaptive(self):
+        m = pickle.loads(pickle.dumps(compile(1, 'one', 2, 'two', adaptive=True)))
+        self.assertTrue(m.adaptive)
+        self.assertEqual(m(2), 'two')
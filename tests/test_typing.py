@@ -18,7 +18,12 @@ from typing import (
 from pampy import (
     match,
     match_value,
+    compile,
+    sample,
+    _,
+    MatchError,
 )
+from pampy.helpers import signatures
 
 
 class A:
@@ -74,6 +79,25 @@ class PampyTypingTests(unittest.TestCase):
         self.assertEqual(match_value(Optional[int], 1), (True, [1]))
         self.assertEqual(match_value(Optional[int], 1.0), (False, []))
 
+    def test_match_union_of_classes_and_other_members(self):
+        pattern = Union[int, Tuple[str, int], List[str], float, A]
+        self.assertEqual(match_value(pattern, 3), (True, [3]))
+        self.assertEqual(match_value(pattern, ('a', 1)), (True, ['a', 1]))
+        self.assertEqual(match_value(pattern, ['a']), (True, [['a']]))
+        self.assertEqual(match_value(pattern, 2.5), (True, [2.5]))
+        self.assertEqual(match_value(pattern, B())[0], True)
+        self.assertEqual(match_value(pattern, ('a', 'b')), (False, []))
+
+    def test_match_union_in_compiled_matchers(self):
+        m = compile((Union[Tuple[int, str], Tuple[int, int]], _), lambda a, b, c: (a, b, c),
+                    Union[str, bytes, None], lambda x: x,
+                    _, 'other')
+        self.assertEqual(m(((1, 2), 3)), (1, 2, 3))
+        self.assertEqual(m(((1, 'a'), 3)), (1, 'a', 3))
+        self.assertEqual(m(b'x'), b'x')
+        self.assertEqual(m(None), None)
+        self.assertEqual(m(1.0), 'other')
+
     def test_match_newtype(self):
         self.assertEqual(match_value(lol, 3), (True, [3]))
         self.assertEqual(match_value(kek, 3), (True, [3]))
@@ -114,6 +138,29 @@ class PampyTypingTests(unittest.TestCase):
         self.assertEqual(match_value(Callable[[Any], Any], not_annotated), (True, [not_annotated]))
         self.assertEqual(match_value(Callable[[int], float], wrong_annotated), (False, []))
 
+    def test_match_callable_after_changing_annotations(self):
+        def f(x: int) -> float:
+            return x / 2
+
+        self.assertEqual(match_value(Callable[[int], float], f), (True, [f]))
+        f.__annotations__['x'] = str
+        self.assertEqual(match_value(Callable[[int], float], f), (False, []))
+        self.assertEqual(match_value(Callable[[str], float], f), (True, [f]))
+        f.__annotations__ = {}
+        self.assertEqual(match_value(Callable[[Any], Any], f), (True, [f]))
+
+    def test_callable_checks_are_cached(self):
+        def f(x: int) -> float:
+            return x / 2
+
+        pattern = Callable[[int], float]
+        self.assertEqual(match_value(pattern, f), (True, [f]))
+        self.assertEqual(signatures[f][3][id(pattern)], (pattern, True))
+        self.assertEqual(match_value(pattern, f), (True, [f]))
+        f.__code__ = (lambda y: y / 2).__code__
+        self.assertEqual(match_value(pattern, f), (False, []))
+        self.assertEqual(match_value(Callable[[Any], float], f), (True, [f]))
+
     def test_match_tuple(self):
         self.assertEqual(
             match_value(Tuple[int, str], (1, "a")),
@@ -209,3 +256,44 @@ class PampyTypingTests(unittest.TestCase):
         self.assertEqual(match_value(List[int], {1, 2, 3}), (False, []))
         self.assertEqual(match_value(Set[int], {1, 2, 3}), (True, [{1, 2, 3}]))
         self.assertEqual(match_value(FrozenSet[int], frozenset([1, 2, 3])), (True, [frozenset([1, 2, 3])]))
+
+    def test_policies(self):
+        mixed = [1, 2, 3, 'four', 5]
+        self.assertEqual(match_value(List[int], mixed), (True, [mixed]))
+        self.assertEqual(match_value(List[int], mixed, policy='all'), (False, []))
+        self.assertEqual(match_value(List[int], mixed, policy='all-with-early-exit'), (False, []))
+        self.assertEqual(match_value(List[int], mixed, policy=sample(2)), (True, [mixed]))
+        self.assertEqual(match_value(List[int], mixed, policy=sample(3)), (False, []))
+        self.assertEqual(match_value(List[Union[int, str]], mixed, policy='all'), (True, [mixed]))
+        a_vals = [B(), C(), A()]
+        self.assertEqual(match_value(List[A], a_vals, policy='all'), (True, [a_vals]))
+        self.assertEqual(match_value(List[B], a_vals, policy='all'), (False, []))
+
+    def test_policies_on_dicts_and_nested_containers(self):
+        scores = {'a': 1, 'b': 2, 'c': 'three'}
+        self.assertTrue(match(scores, Dict[str, int], True, _, False))
+        self.assertFalse(match(scores, Dict[str, int], True, _, False, policy='all'))
+        self.assertTrue(match(scores, Dict[str, Union[int, str]], True, _, False, policy='all'))
+        nested = [[1, 2], [3, 'four']]
+        self.assertTrue(match(nested, List[List[int]], True, _, False))
+        self.assertFalse(match(nested, List[List[int]], True, _, False, policy='all-with-early-exit'))
+        self.assertTrue(match([], List[int], True, policy='all'))
+
+    def test_policies_only_check_the_first_element_of_iterators(self):
+        values = iter([1, 'two'])
+        self.assertEqual(match_value(Iterable[int], values, policy='all')[0], True)
+        self.assertEqual(next(values), 'two')
+
+    def test_policies_in_compiled_matchers(self):
+        m = compile(List[int], 'ints', _, 'other', policy='all')
+        self.assertEqual(m([1, 2]), 'ints')
+        self.assertEqual(m([1, 'x']), 'other')
+        self.assertEqual(list(m.map([[1], [1, 'x']])), ['ints', 'other'])
+
+    def test_wrong_policies(self):
+        with self.assertRaises(MatchError):
+            match(1, int, True, policy='some')
+        with self.assertRaises(MatchError):
+            compile(int, True, policy='some')
+        with self.assertRaises(MatchError):
+            sample(0)